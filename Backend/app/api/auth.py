@@ -7,6 +7,7 @@ from ..models.user import User
 from ..schemas.user import UserCreate, User as UserSchema  
 from ..schemas.token import Token
 from ..services.auth import AuthService
+from ..services.executors import run_cpu
 from ..database import get_db
 from ..config import settings
 from ..utils.logger import log_info, log_error, log_api_request, log_warning
@@ -44,7 +45,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
             )
 
         # Create new user
-        hashed_password = AuthService.get_password_hash(user_data.password)
+        hashed_password = await run_cpu(AuthService.get_password_hash, user_data.password)
         new_user = User(
             username=user_data.username,
             email=user_data.email,
@@ -76,7 +77,9 @@ async def login(
         log_api_request("POST", "/api/login")
         
         # Authenticate with email (form_data.username contains email)
-        user = AuthService.authenticate_user(
+        # bcrypt verification is deliberately slow, keep it off the event loop
+        user = await run_cpu(
+            AuthService.authenticate_user,
             db, 
             email=form_data.username,
             password=form_data.password
@@ -1,39 +1,67 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from ..database import get_db
+from ..database import get_db, SessionLocal
 from ..models.chat import ChatHistory
-from ..schemas.chat import ChatMessage, ChatMessageCreate, ChatHistoryResponse
-from ..services.rag import RAGService
+from ..schemas.chat import (
+    ChatMessage, ChatMessageCreate, ChatHistoryResponse, MultiDocumentChatCreate, MultiDocumentChatMessage
+)
+from ..services.document import DocumentService
+from ..services.registry import get_rag_service, get_tabular_service
 from ..services.auth import AuthService
+from ..services.executors import run_io
+from ..services.coalesce import coalesced, coalesce_key
 from ..models.user import User
 from datetime import datetime
 from sqlalchemy import desc
 from ..utils.logger import log_info, log_error, log_api_request, log_warning
+from ..utils.sse import format_sse
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
-# Initialize RAG service
-rag_service = RAGService()
+document_service = DocumentService()
+
+def _answer_service(document_id: int, rag_service, tabular_service):
+    """Spreadsheets loaded into SQLite are answered with SQL, everything else with RAG"""
+    if tabular_service.has_document(document_id):
+        return tabular_service
+    return rag_service
+
+def _searchable_document_ids(db: Session, user_id: int, document_ids: Optional[List[int]], tabular_service) -> List[int]:
+    """The user's embedded documents to search, all of them when none are given"""
+    owned = {document.id for document in document_service.get_user_documents(db, user_id)}
+    if document_ids is not None:
+        missing = set(document_ids) - owned
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Documents not found: {sorted(missing)}")
+        owned = set(document_ids)
+    # Spreadsheets answered with SQL have no embeddings to search
+    searchable = sorted(document_id for document_id in owned if not tabular_service.has_document(document_id))
+    if not searchable:
+        raise HTTPException(status_code=400, detail="No documents available for retrieval")
+    return searchable
 
 @router.post("/", response_model=ChatMessage)
 async def create_chat_message(
     message: ChatMessageCreate,
     current_user: User = Depends(AuthService.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    rag_service=Depends(get_rag_service),
+    tabular_service=Depends(get_tabular_service)
 ):
     try:
         log_api_request("POST", "/chat", current_user.id)
         
         # Get recent chat history for context
-        chat_history = (
+        chat_history = await run_io(
             db.query(ChatHistory)
             .filter(
                 ChatHistory.user_id == current_user.id,
                 ChatHistory.document_id == message.document_id
             )
             .order_by(desc(ChatHistory.timestamp))
-            .all()  
+            .all
         )
         
         # Format chat history for RAG
@@ -41,11 +69,16 @@ async def create_chat_message(
             (chat.message, chat.response) for chat in reversed(chat_history)
         ]
         
-        # Get response from RAG
-        response = rag_service.get_response(
-            document_id=message.document_id,
-            query=message.message,
-            #chat_history=formatted_history
+        # Get response from RAG; identical questions in flight on this document share one answer
+        service = _answer_service(message.document_id, rag_service, tabular_service)
+        result = await coalesced(
+            coalesce_key(f"doc_{message.document_id}", message.message, service.PROMPT_VERSION),
+            lambda: run_io(
+                service.get_response,
+                document_id=message.document_id,
+                query=message.message,
+                #chat_history=formatted_history
+            )
         )
         
         # Save to database
@@ -53,12 +86,12 @@ async def create_chat_message(
             user_id=current_user.id,
             document_id=message.document_id,
             message=message.message,
-            response=response,
+            response=result.answer,
             timestamp=datetime.utcnow()
         )
         db.add(chat_message)
-        db.commit()
-        db.refresh(chat_message)
+        await run_io(db.commit)
+        await run_io(db.refresh, chat_message)
         
         log_info(f"Chat message created for user {current_user.id} on document {message.document_id}")
         
@@ -68,14 +101,198 @@ async def create_chat_message(
             document_id=chat_message.document_id,
             message=chat_message.message,
             response=chat_message.response,
-            timestamp=chat_message.timestamp
+            timestamp=chat_message.timestamp,
+            cached=result.cached
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         log_error(e, f"Error creating chat message for user {current_user.id}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/stream")
+async def stream_chat_message(
+    message: ChatMessageCreate,
+    current_user: User = Depends(AuthService.get_current_user),
+    rag_service=Depends(get_rag_service),
+    tabular_service=Depends(get_tabular_service)
+):
+    """Stream the answer as Server-Sent Events: `token` events, then `done` with the saved message"""
+    log_api_request("POST", "/chat/stream", current_user.id)
+    user_id = current_user.id
+    
+    try:
+        stream = await run_io(
+            _answer_service(message.document_id, rag_service, tabular_service).stream_response,
+            document_id=message.document_id,
+            query=message.message
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error(e, f"Error starting chat stream for user {user_id}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    def event_stream():
+        try:
+            for token in stream:
+                yield format_sse("token", {"content": token})
+            
+            # Save to database once the answer is complete
+            db = SessionLocal()
+            try:
+                chat_message = ChatHistory(
+                    user_id=user_id,
+                    document_id=message.document_id,
+                    message=message.message,
+                    response=stream.answer,
+                    timestamp=datetime.utcnow()
+                )
+                db.add(chat_message)
+                db.commit()
+                db.refresh(chat_message)
+                saved = ChatMessage(
+                    id=chat_message.id,
+                    user_id=chat_message.user_id,
+                    document_id=chat_message.document_id,
+                    message=chat_message.message,
+                    response=chat_message.response,
+                    timestamp=chat_message.timestamp,
+                    cached=stream.cached
+                )
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+            
+            log_info(f"Streamed chat message for user {user_id} on document {message.document_id}")
+            yield format_sse("done", saved.model_dump(mode="json"))
+        except Exception as e:
+            log_error(e, f"Error streaming chat message for user {user_id}")
+            yield format_sse("error", {"detail": str(e)})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/documents", response_model=MultiDocumentChatMessage)
+async def create_multi_document_chat_message(
+    message: MultiDocumentChatCreate,
+    current_user: User = Depends(AuthService.get_current_user),
+    db: Session = Depends(get_db),
+    rag_service=Depends(get_rag_service),
+    tabular_service=Depends(get_tabular_service)
+):
+    """Ask one question across several documents, or the whole library when document_ids is omitted"""
+    try:
+        log_api_request("POST", "/chat/documents", current_user.id)
+        
+        document_ids = await run_io(_searchable_document_ids, db, current_user.id, message.document_ids, tabular_service)
+        result = await run_io(rag_service.get_multi_document_response, document_ids=document_ids, query=message.message)
+        
+        # Not tied to a single document, so saved without document_id
+        chat_message = ChatHistory(
+            user_id=current_user.id,
+            document_id=None,
+            message=message.message,
+            response=result.answer,
+            timestamp=datetime.utcnow()
+        )
+        db.add(chat_message)
+        await run_io(db.commit)
+        await run_io(db.refresh, chat_message)
+        
+        log_info(f"Multi-document chat message created for user {current_user.id} over {len(document_ids)} documents")
+        
+        return MultiDocumentChatMessage(
+            id=chat_message.id,
+            user_id=chat_message.user_id,
+            message=chat_message.message,
+            response=chat_message.response,
+            document_ids=document_ids,
+            sources=result.sources,
+            timestamp=chat_message.timestamp,
+            cached=result.cached
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        log_error(e, f"Error creating multi-document chat message for user {current_user.id}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/documents/stream")
+async def stream_multi_document_chat_message(
+    message: MultiDocumentChatCreate,
+    current_user: User = Depends(AuthService.get_current_user),
+    db: Session = Depends(get_db),
+    rag_service=Depends(get_rag_service),
+    tabular_service=Depends(get_tabular_service)
+):
+    """Stream a multi-document answer as Server-Sent Events: `token` events, then `done` with the saved message"""
+    log_api_request("POST", "/chat/documents/stream", current_user.id)
+    user_id = current_user.id
+    
+    try:
+        document_ids = await run_io(_searchable_document_ids, db, user_id, message.document_ids, tabular_service)
+        stream = await run_io(rag_service.stream_multi_document_response, document_ids=document_ids, query=message.message)
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error(e, f"Error starting multi-document chat stream for user {user_id}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    def event_stream():
+        try:
+            for token in stream:
+                yield format_sse("token", {"content": token})
+            
+            db = SessionLocal()
+            try:
+                chat_message = ChatHistory(
+                    user_id=user_id,
+                    document_id=None,
+                    message=message.message,
+                    response=stream.answer,
+                    timestamp=datetime.utcnow()
+                )
+                db.add(chat_message)
+                db.commit()
+                db.refresh(chat_message)
+                saved = MultiDocumentChatMessage(
+                    id=chat_message.id,
+                    user_id=chat_message.user_id,
+                    message=chat_message.message,
+                    response=chat_message.response,
+                    document_ids=document_ids,
+                    sources=stream.response.sources,
+                    timestamp=chat_message.timestamp,
+                    cached=stream.cached
+                )
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+            
+            log_info(f"Streamed multi-document chat message for user {user_id}")
+            yield format_sse("done", saved.model_dump(mode="json"))
+        except Exception as e:
+            log_error(e, f"Error streaming multi-document chat message for user {user_id}")
+            yield format_sse("error", {"detail": str(e)})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/history/{document_id}", response_model=List[ChatMessage])
 async def get_document_chat_history(
     document_id: int,
@@ -88,7 +305,7 @@ async def get_document_chat_history(
     try:
         log_api_request("GET", f"/chat/history/{document_id}", current_user.id)
         
-        chat_history = (
+        chat_history = await run_io(
             db.query(ChatHistory)
             .filter(
                 ChatHistory.user_id == current_user.id,
@@ -97,11 +314,13 @@ async def get_document_chat_history(
             .order_by(desc(ChatHistory.timestamp))
             .offset(offset)
             .limit(limit)
-            .all()
+            .all
         )
         
         log_info(f"Retrieved chat history for document {document_id}")
         return chat_history
+    except HTTPException:
+        raise
     except Exception as e:
         log_error(e, f"Error fetching document chat history for user {current_user.id}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -123,14 +342,14 @@ async def get_all_chat_history(
         if document_id is not None:
             query = query.filter(ChatHistory.document_id == document_id)
         
-        total_count = query.count()
+        total_count = await run_io(query.count)
         
-        chat_history = (
+        chat_history = await run_io(
             query
             .order_by(desc(ChatHistory.timestamp))
             .offset(offset)
             .limit(limit)
-            .all()
+            .all
         )
         
         log_info(f"Retrieved {len(chat_history)} chat history entries for user {current_user.id}")
@@ -146,6 +365,8 @@ async def get_all_chat_history(
             )
             for chat in chat_history
         ]
+    except HTTPException:
+        raise
     except Exception as e:
         log_error(e, f"Error fetching all chat history for user {current_user.id}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -160,19 +381,22 @@ async def clear_document_chat_history(
     try:
         log_api_request("DELETE", f"/chat/history/{document_id}", current_user.id)
         
-        deleted_count = (
+        deleted_count = await run_io(
             db.query(ChatHistory)
             .filter(
                 ChatHistory.user_id == current_user.id,
                 ChatHistory.document_id == document_id
             )
-            .delete(synchronize_session=False)
+            .delete,
+            synchronize_session=False
         )
-        db.commit()
+        await run_io(db.commit)
         
         log_info(f"Cleared chat history for document {document_id} for user {current_user.id}")
         
         return {"message": f"Successfully deleted {deleted_count} chat messages"}
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         log_error(e, f"Error clearing document chat history for user {current_user.id}")
@@ -187,16 +411,19 @@ async def clear_all_chat_history(
     try:
         log_api_request("DELETE", "/chat/history", current_user.id)
         
-        deleted_count = (
+        deleted_count = await run_io(
             db.query(ChatHistory)
             .filter(ChatHistory.user_id == current_user.id)
-            .delete(synchronize_session=False)
+            .delete,
+            synchronize_session=False
         )
-        db.commit()
+        await run_io(db.commit)
         
         log_info(f"Cleared all chat history for user {current_user.id}")
         
         return {"message": f"Successfully deleted {deleted_count} chat messages"}
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         log_error(e, f"Error clearing all chat history for user {current_user.id}")
@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 import os
 from ..database import get_db
-from ..schemas.document import Document as DocumentSchema
+from ..schemas.document import Document as DocumentSchema, DocumentUpload, IngestionStatus
 from ..services.document import DocumentService
-from ..services.rag import RAGService
+from ..services.ingestion import IngestionService, ACTIVE_STATUSES
+from ..services.registry import get_rag_service, get_tabular_service
 from ..services.auth import AuthService
+from ..services.executors import run_io
 from ..models.user import User
 from ..utils.logger import log_info, log_error, log_api_request, log_warning
 
@@ -14,16 +17,22 @@ router = APIRouter(prefix="/documents", tags=["documents"])
 
 # Initialize services
 document_service = DocumentService()
-rag_service = RAGService()
+ingestion_service = IngestionService()
 
-@router.post("/upload", response_model=DocumentSchema)
+def _seconds_between(start: Optional[datetime], end: Optional[datetime]) -> Optional[float]:
+    # Timestamps are stored as UTC; SQLite hands them back without tzinfo
+    if not start or not end:
+        return None
+    return (end.replace(tzinfo=None) - start.replace(tzinfo=None)).total_seconds()
+
+@router.post("/upload", response_model=DocumentUpload)
 async def upload_document(
     file: UploadFile = File(...),
     current_user: User = Depends(AuthService.get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Upload a new document and process it for RAG
+    Upload a new document and queue it for RAG processing
     """
     try:
         log_api_request("POST", "/documents/upload", current_user.id)
@@ -45,7 +54,8 @@ async def upload_document(
         log_info(f"File saved at: {file_path}")
         
         # Create document record
-        document = document_service.create_document(
+        document = await run_io(
+            document_service.create_document,
             db=db,
             user_id=current_user.id,
             file_path=file_path,
@@ -54,26 +64,32 @@ async def upload_document(
         )
         log_info(f"Document created in database with ID: {document.id}")
         
-        # Process document for RAG
+        # Queue document for RAG processing in the background
         try:
-            log_info(f"Processing document {document.id} for RAG...")
-            rag_service.process_document(
-                document_id=document.id,
-                file_path=file_path,
-                file_type=file_extension
-            )
-            log_info(f"Document {document.id} processed successfully for RAG.")
+            job = await run_io(ingestion_service.enqueue, db, document.id)
+            log_info(f"Document {document.id} queued for RAG processing as job {job.id}")
         except Exception as e:
-            log_error(e, f"Failed to process document {document.id} for RAG")
-            # If RAG processing fails, delete the document and raise error
-            document_service.delete_document(db, document.id, current_user.id)
+            log_error(e, f"Failed to queue document {document.id} for RAG")
+            # If the job cannot be queued, delete the document and raise error
+            await run_io(document_service.delete_document, db, document.id, current_user.id)
             raise HTTPException(
                 status_code=500,
-                detail=f"Failed to process document: {str(e)}"
+                detail=f"Failed to queue document for processing: {str(e)}"
             )
         
-        return document
+        return DocumentUpload(
+            id=document.id,
+            user_id=document.user_id,
+            file_name=document.file_name,
+            file_type=document.file_type,
+            file_path=document.file_path,
+            uploaded_at=document.uploaded_at,
+            job_id=job.id,
+            status=job.status
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         log_error(e, f"Error uploading document for user {current_user.id}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -90,10 +106,12 @@ async def get_documents(
     try:
         log_api_request("GET", "/documents", current_user.id)
         
-        documents = document_service.get_user_documents(db, current_user.id)
+        documents = await run_io(document_service.get_user_documents, db, current_user.id)
         log_info(f"Retrieved {len(documents)} documents for user {current_user.id}")
         
         return documents
+    except HTTPException:
+        raise
     except Exception as e:
         log_error(e, f"Error retrieving documents for user {current_user.id}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -110,7 +128,7 @@ async def get_document(
     try:
         log_api_request("GET", f"/documents/{document_id}", current_user.id)
         
-        document = document_service.get_document(db, document_id, current_user.id)
+        document = await run_io(document_service.get_document, db, document_id, current_user.id)
         if not document:
             log_warning(f"Document {document_id} not found for user {current_user.id}")
             raise HTTPException(status_code=404, detail="Document not found")
@@ -123,11 +141,117 @@ async def get_document(
         log_error(e, f"Error retrieving document {document_id} for user {current_user.id}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.put("/{document_id}", response_model=DocumentUpload)
+async def replace_document(
+    document_id: int,
+    file: UploadFile = File(...),
+    current_user: User = Depends(AuthService.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload a new version of a document and re-ingest it.
+
+    Chunks whose content did not change keep their embeddings; only new or
+    edited chunks are embedded again.
+    """
+    try:
+        log_api_request("PUT", f"/documents/{document_id}", current_user.id)
+        
+        document = await run_io(document_service.get_document, db, document_id, current_user.id)
+        
+        file_extension = os.path.splitext(file.filename)[1][1:].lower()
+        if file_extension != document.file_type:
+            log_warning(f"File type change rejected for document {document_id}: {file_extension}")
+            raise HTTPException(
+                status_code=400,
+                detail=f"A new version must be a {document.file_type.upper()} file. Upload other types as a new document."
+            )
+        
+        job = await run_io(ingestion_service.get_latest_job, db, document_id)
+        if job and job.status in ACTIVE_STATUSES:
+            raise HTTPException(status_code=409, detail="The document is still being processed")
+        
+        old_path = document.file_path
+        file_path = await document_service.save_file(file, current_user.id)
+        document = await run_io(
+            document_service.replace_file,
+            db=db,
+            document=document,
+            file_path=file_path,
+            file_name=os.path.splitext(file.filename)[0].lower()
+        )
+        if old_path != file_path:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+        log_info(f"Saved new version of document {document_id} at: {file_path}")
+        
+        job = await run_io(ingestion_service.enqueue, db, document.id)
+        log_info(f"Document {document.id} queued for re-ingestion as job {job.id}")
+        
+        return DocumentUpload(
+            id=document.id,
+            user_id=document.user_id,
+            file_name=document.file_name,
+            file_type=document.file_type,
+            file_path=document.file_path,
+            uploaded_at=document.uploaded_at,
+            job_id=job.id,
+            status=job.status
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error(e, f"Error replacing document {document_id} for user {current_user.id}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{document_id}/status", response_model=IngestionStatus)
+async def get_document_status(
+    document_id: int,
+    current_user: User = Depends(AuthService.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the ingestion progress of a document
+    """
+    try:
+        log_api_request("GET", f"/documents/{document_id}/status", current_user.id)
+        
+        await run_io(document_service.get_document, db, document_id, current_user.id)
+        job = await run_io(ingestion_service.get_latest_job, db, document_id)
+        if not job:
+            log_warning(f"No ingestion job found for document {document_id}")
+            raise HTTPException(status_code=404, detail="No ingestion job found for this document")
+        
+        return IngestionStatus(
+            document_id=document_id,
+            job_id=job.id,
+            status=job.status,
+            chunks_done=job.chunks_done,
+            chunks_total=job.chunks_total,
+            chunks_reused=job.chunks_reused,
+            attempts=job.attempts,
+            error=job.error,
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+            queued_seconds=_seconds_between(job.created_at, job.started_at),
+            processing_seconds=_seconds_between(job.started_at, job.finished_at or datetime.utcnow())
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error(e, f"Error retrieving status for document {document_id}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.delete("/{document_id}")
 async def delete_document(
     document_id: int,
     current_user: User = Depends(AuthService.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    rag_service=Depends(get_rag_service),
+    tabular_service=Depends(get_tabular_service)
 ):
     """
     Delete a document and its associated RAG data
@@ -136,20 +260,23 @@ async def delete_document(
         log_api_request("DELETE", f"/documents/{document_id}", current_user.id)
         
         # Get document first to ensure it exists and belongs to user
-        document = document_service.get_document(db, document_id, current_user.id)
+        document = await run_io(document_service.get_document, db, document_id, current_user.id)
         if not document:
             log_warning(f"Document {document_id} not found for deletion")
             raise HTTPException(status_code=404, detail="Document not found")
         
         # Clean up RAG data first
         try:
-            rag_service.cleanup_document(document_id)
+            await run_io(rag_service.cleanup_document, document_id)
+            await run_io(tabular_service.remove_document, document_id)
+        except HTTPException:
+            raise
         except Exception as e:
             log_error(e, f"Failed to cleanup RAG data for document {document_id}")
             # Continue with document deletion even if RAG cleanup fails
         
         # Delete the document
-        success = document_service.delete_document(db, document_id, current_user.id)
+        success = await run_io(document_service.delete_document, db, document_id, current_user.id)
         if not success:
             log_warning(f"Failed to delete document {document_id}")
             raise HTTPException(status_code=500, detail="Failed to delete document")
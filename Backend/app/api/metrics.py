@@ -0,0 +1,61 @@
+from fastapi import APIRouter
+from ..services.registry import get_embedding_engine, registry
+from ..services.cache import get_retrieval_cache
+from ..services.answer_cache import get_answer_cache
+from ..services.sql_schema import get_schema_cache
+from ..services.sql_retrieval import get_schema_retriever
+from ..services.rerank import get_reranker
+from ..services.executors import get_cpu_executor, get_io_executor
+from ..services.llm import get_llm_gateway
+from ..services.coalesce import get_request_coalescer
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("/embedding")
+def embedding_metrics():
+    """Throughput and queue-depth counters of the shared embedding engine"""
+    return get_embedding_engine().stats()
+
+@router.get("/cache")
+def cache_metrics():
+    """Hit and miss counters of the query embedding, retrieval, answer and SQL schema caches"""
+    engine = get_embedding_engine()
+    answer_cache = get_answer_cache()
+    schema_retriever = get_schema_retriever()
+    return {
+        "query_embeddings": engine.query_cache.stats() if engine.query_cache else None,
+        "retrieval": get_retrieval_cache().stats(),
+        "answers": answer_cache.stats() if answer_cache else None,
+        "sql_schema": get_schema_cache().stats(),
+        "sql_schema_subset": schema_retriever.stats() if schema_retriever else None
+    }
+
+@router.get("/rerank")
+def rerank_metrics():
+    """Latency-budget and score-cache counters of the cross-encoder reranker"""
+    reranker = get_reranker()
+    return reranker.stats() if reranker else {"enabled": False}
+
+@router.get("/services")
+def service_metrics():
+    """Which lazily initialized services are loaded, and how long each took to build"""
+    return registry.stats()
+
+@router.get("/executors")
+def executor_metrics():
+    """Utilization, queue depth and rejection counters of the I/O and CPU pools"""
+    return {
+        "io": get_io_executor().stats(),
+        "cpu": get_cpu_executor().stats()
+    }
+
+@router.get("/llm")
+def llm_metrics():
+    """Request, retry and deadline counters of the shared LLM gateway"""
+    return get_llm_gateway().stats()
+
+@router.get("/coalescing")
+def coalescing_metrics():
+    """How many chat and query requests were answered by another identical request in flight"""
+    coalescer = get_request_coalescer()
+    return coalescer.stats() if coalescer else {"enabled": False}
@@ -6,25 +6,30 @@ from typing import List
 from app.database import get_db
 from app.models.query import SQLQueryHistory
 from app.schemas.query import QueryCreate, QueryResponse, QueryHistory as QueryHistorySchema
-from app.services.nl_to_sql import NLToSQLService
+from app.services.registry import get_nl_to_sql_service
 from ..services.auth import AuthService
+from ..services.executors import run_io
+from ..services.coalesce import coalesced, coalesce_key
 from app.models.user import User
 from ..utils.logger import log_info, log_error, log_api_request
 
 router = APIRouter(prefix="/query", tags=["query"])
-nl_to_sql_service = NLToSQLService()
 
 @router.post("/", response_model=QueryResponse)
 async def query_database(
     query: QueryCreate,
     current_user: User = Depends(AuthService.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    nl_to_sql_service=Depends(get_nl_to_sql_service)
 ):
     try:
         log_api_request("POST", "/query", current_user.id)
         
         # Unpack all three return values: SQL query, results, and natural response
-        sql_query, results, natural_response = nl_to_sql_service.generate_sql_query(query.natural_query)
+        sql_query, results, natural_response = await coalesced(
+            coalesce_key(nl_to_sql_service.db_path, query.natural_query, nl_to_sql_service.PROMPT_VERSION),
+            lambda: run_io(nl_to_sql_service.generate_sql_query, query.natural_query)
+        )
         
         # Save to history (you can store the results as a string, or change your model/schema to store JSON)
         query_history = SQLQueryHistory(
@@ -35,8 +40,8 @@ async def query_database(
             results=json.dumps(results)
         )
         db.add(query_history)
-        db.commit()
-        db.refresh(query_history)
+        await run_io(db.commit)
+        await run_io(db.refresh, query_history)
         
         log_info(f"Database query processed for user {current_user.id}")
         
@@ -46,6 +51,8 @@ async def query_database(
             results=results,              
             response=natural_response
         )
+    except HTTPException:
+        raise
     except Exception as e:
         log_error(e, f"Error processing database query for user {current_user.id}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -58,10 +65,12 @@ async def get_query_history(
     try:
         log_api_request("GET", "/query/history", current_user.id)
         
-        queries = db.query(SQLQueryHistory)\
-            .filter(SQLQueryHistory.user_id == current_user.id)\
-            .order_by(SQLQueryHistory.timestamp.asc())\
-            .all()
+        queries = await run_io(
+            db.query(SQLQueryHistory)
+            .filter(SQLQueryHistory.user_id == current_user.id)
+            .order_by(SQLQueryHistory.timestamp.asc())
+            .all
+        )
         
         for query in queries:
             if query.results:
@@ -70,6 +79,8 @@ async def get_query_history(
         log_info(f"Retrieved {len(queries)} query history entries for user {current_user.id}")
         
         return queries
+    except HTTPException:
+        raise
     except Exception as e:
         log_error(e, f"Error retrieving query history for user {current_user.id}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -82,14 +93,18 @@ async def clear_query_history(
     try:
         log_api_request("DELETE", "/query/history", current_user.id)
         
-        deleted_count = db.query(SQLQueryHistory)\
-            .filter(SQLQueryHistory.user_id == current_user.id)\
-            .delete()
-        db.commit()
+        deleted_count = await run_io(
+            db.query(SQLQueryHistory)
+            .filter(SQLQueryHistory.user_id == current_user.id)
+            .delete
+        )
+        await run_io(db.commit)
         
         log_info(f"Cleared {deleted_count} query history entries for user {current_user.id}")
         
         return {"message": "Query history cleared successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         log_error(e, f"Error clearing query history for user {current_user.id}")
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
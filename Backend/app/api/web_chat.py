@@ -1,20 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel, validator, Field
-from ..database import get_db
-from ..services.web_rag import WebRAGService
+from ..database import get_db, SessionLocal
+from ..services.registry import get_web_rag_service
+from ..services.web_refresh import WebRefreshScheduler
+from ..config import settings
 from ..services.auth import AuthService
+from ..services.executors import run_io
+from ..services.coalesce import coalesced, coalesce_key
 from ..models.user import User
 from ..models.chat import WebChatHistory  # New model for web chat history
 from ..schemas.chat import WebChatMessage, WebChatMessageCreate
 from ..utils.logger import log_info, log_error, log_api_request, log_warning
+from ..utils.sse import format_sse
 from datetime import datetime
 from sqlalchemy import desc
 import validators
 
-# Initialize WebRAG service
-web_rag_service = WebRAGService()
+# The scheduler resolves the WebRAG service only when a refresh is due
+refresh_scheduler = WebRefreshScheduler(get_web_rag_service, settings.WEB_REFRESH_INTERVAL_MINUTES)
 
 # Pydantic models
 class URLItem(BaseModel):
@@ -55,12 +61,13 @@ router = APIRouter(prefix="/webrag", tags=["webrag"])
 async def add_url(
     url_item: URLItem,
     current_user: User = Depends(AuthService.get_current_user),
+    web_rag_service=Depends(get_web_rag_service)
 ):
     """Add a URL to the user's WebRAG collection"""
     try:
         log_api_request("POST", "/webrag/url", current_user.id)
         
-        result = web_rag_service.add_url_to_collection(current_user.id, url_item.url)
+        result = await run_io(web_rag_service.add_url_to_collection, current_user.id, url_item.url)
         
         if not result["success"]:
             log_warning(f"Failed to add URL {url_item.url} for user {current_user.id}: {result.get('error', 'Unknown error')}")
@@ -79,12 +86,13 @@ async def add_url(
 async def add_multiple_urls(
     urls: MultipleURLs,
     current_user: User = Depends(AuthService.get_current_user),
+    web_rag_service=Depends(get_web_rag_service)
 ):
     """Add multiple URLs to the user's WebRAG collection"""
     try:
         log_api_request("POST", "/webrag/urls", current_user.id)
         
-        results = web_rag_service.add_multiple_urls(current_user.id, urls.urls)
+        results = await web_rag_service.add_multiple_urls(current_user.id, urls.urls)
         
         # Check if any URLs failed to process
         failed_urls = [result for result in results if not result["success"]]
@@ -94,6 +102,8 @@ async def add_multiple_urls(
         log_info(f"Processed {len(urls.urls)} URLs for user {current_user.id}")
         return {"results": results}
         
+    except HTTPException as he:
+        raise he
     except Exception as e:
         log_error(e, f"Error adding multiple URLs for user {current_user.id}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -101,16 +111,19 @@ async def add_multiple_urls(
 @router.get("/urls")
 async def get_indexed_urls(
     current_user: User = Depends(AuthService.get_current_user),
+    web_rag_service=Depends(get_web_rag_service)
 ):
     """Get all indexed URLs for the current user"""
     try:
         log_api_request("GET", "/webrag/urls", current_user.id)
         
-        urls = web_rag_service.get_indexed_urls(current_user.id)
+        urls = await run_io(web_rag_service.get_indexed_urls, current_user.id)
         
         log_info(f"Retrieved {len(urls)} indexed URLs for user {current_user.id}")
         return {"urls": urls}
         
+    except HTTPException as he:
+        raise he
     except Exception as e:
         log_error(e, f"Error retrieving indexed URLs for user {current_user.id}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -119,12 +132,13 @@ async def get_indexed_urls(
 async def remove_url(
     url_item: URLItem,
     current_user: User = Depends(AuthService.get_current_user),
+    web_rag_service=Depends(get_web_rag_service)
 ):
     """Remove a URL from the user's WebRAG collection"""
     try:
         log_api_request("DELETE", "/webrag/url", current_user.id)
         
-        result = web_rag_service.remove_url(current_user.id, url_item.url)
+        result = await run_io(web_rag_service.remove_url, current_user.id, url_item.url)
         
         if not result["success"]:
             log_warning(f"Failed to remove URL {url_item.url} for user {current_user.id}: {result.get('error', result.get('message', 'Unknown error'))}")
@@ -142,12 +156,13 @@ async def remove_url(
 @router.delete("/urls")
 async def clear_all_urls(
     current_user: User = Depends(AuthService.get_current_user),
+    web_rag_service=Depends(get_web_rag_service)
 ):
     """Clear all URLs from the user's WebRAG collection"""
     try:
         log_api_request("DELETE", "/webrag/urls", current_user.id)
         
-        result = web_rag_service.clear_all_urls(current_user.id)
+        result = await run_io(web_rag_service.clear_all_urls, current_user.id)
         
         if not result["success"]:
             log_warning(f"Failed to clear URLs for user {current_user.id}: {result.get('error', result.get('message', 'Unknown error'))}")
@@ -164,24 +179,51 @@ async def clear_all_urls(
         log_error(e, f"Error clearing URLs for user {current_user.id}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/refresh")
+async def refresh_urls(
+    current_user: User = Depends(AuthService.get_current_user),
+    web_rag_service=Depends(get_web_rag_service)
+):
+    """Re-check the user's indexed URLs and re-index the pages that changed"""
+    try:
+        log_api_request("POST", "/webrag/refresh", current_user.id)
+
+        result = await web_rag_service.refresh_urls(current_user.id)
+
+        if not result["success"]:
+            raise HTTPException(status_code=404, detail=result.get("message", "No indexed URLs found"))
+
+        if result["failed"]:
+            log_warning(f"{result['failed']} URLs failed to refresh for user {current_user.id}")
+
+        log_info(f"Refreshed {result['checked']} URLs for user {current_user.id} ({result['updated']} updated)")
+        return result
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        log_error(e, f"Error refreshing URLs for user {current_user.id}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # NEW: Chat functionality for WebRAG (consistent with document chat)
 @router.post("/chat", response_model=WebChatMessage)
 async def create_web_chat_message(
     message: WebChatMessageCreate,
     current_user: User = Depends(AuthService.get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    web_rag_service=Depends(get_web_rag_service)
 ):
     """Chat with indexed web content"""
     try:
         log_api_request("POST", "/webrag/chat", current_user.id)
         
         # Get recent chat history for context
-        chat_history = (
+        chat_history = await run_io(
             db.query(WebChatHistory)
             .filter(WebChatHistory.user_id == current_user.id)
             .order_by(desc(WebChatHistory.timestamp))
             .limit(10)  # Last 10 exchanges
-            .all()  
+            .all
         )
         
         # Format chat history for RAG (reverse to get chronological order)
@@ -190,26 +232,30 @@ async def create_web_chat_message(
         ]
         
         # Get response from WebRAG
-        response = web_rag_service.get_response(
-            user_id=current_user.id,
-            query=message.message,
-            chat_history=formatted_history
+        # The history is part of the prompt, so only requests with the same history coalesce
+        result = await coalesced(
+            coalesce_key(
+                f"web_{current_user.id}", message.message, web_rag_service.PROMPT_VERSION, tuple(formatted_history)
+            ),
+            lambda: run_io(
+                web_rag_service.get_response,
+                user_id=current_user.id,
+                query=message.message,
+                chat_history=formatted_history
+            )
         )
         
-        # Get sources for reference
-        sources = web_rag_service.get_sources_for_query(current_user.id, message.message)
-        
         # Save to database
         chat_message = WebChatHistory(
             user_id=current_user.id,
             message=message.message,
-            response=response,
-            sources=sources,  # Store as JSON
+            response=result.answer,
+            sources=result.sources,  # Store as JSON
             timestamp=datetime.utcnow()
         )
         db.add(chat_message)
-        db.commit()
-        db.refresh(chat_message)
+        await run_io(db.commit)
+        await run_io(db.refresh, chat_message)
         
         log_info(f"Web chat message created for user {current_user.id}")
         
@@ -219,14 +265,98 @@ async def create_web_chat_message(
             message=chat_message.message,
             response=chat_message.response,
             sources=chat_message.sources,
-            timestamp=chat_message.timestamp
+            timestamp=chat_message.timestamp,
+            cached=result.cached
         )
         
+    except HTTPException as he:
+        raise he
     except Exception as e:
         db.rollback()
         log_error(e, f"Error creating web chat message for user {current_user.id}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/chat/stream")
+async def stream_web_chat_message(
+    message: WebChatMessageCreate,
+    current_user: User = Depends(AuthService.get_current_user),
+    db: Session = Depends(get_db),
+    web_rag_service=Depends(get_web_rag_service)
+):
+    """Stream the answer as Server-Sent Events: `token` events, then `done` with the saved message"""
+    log_api_request("POST", "/webrag/chat/stream", current_user.id)
+    user_id = current_user.id
+    
+    try:
+        # Get recent chat history for context
+        chat_history = await run_io(
+            db.query(WebChatHistory)
+            .filter(WebChatHistory.user_id == user_id)
+            .order_by(desc(WebChatHistory.timestamp))
+            .limit(10)  # Last 10 exchanges
+            .all
+        )
+        formatted_history = [
+            (chat.message, chat.response) for chat in reversed(chat_history)
+        ]
+        
+        stream = await run_io(
+            web_rag_service.stream_response,
+            user_id=user_id,
+            query=message.message,
+            chat_history=formatted_history
+        )
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        log_error(e, f"Error starting web chat stream for user {user_id}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    def event_stream():
+        try:
+            for token in stream:
+                yield format_sse("token", {"content": token})
+            
+            # Save to database once the answer is complete
+            session = SessionLocal()
+            try:
+                chat_message = WebChatHistory(
+                    user_id=user_id,
+                    message=message.message,
+                    response=stream.answer,
+                    sources=stream.response.sources,
+                    timestamp=datetime.utcnow()
+                )
+                session.add(chat_message)
+                session.commit()
+                session.refresh(chat_message)
+                saved = WebChatMessage(
+                    id=chat_message.id,
+                    user_id=chat_message.user_id,
+                    message=chat_message.message,
+                    response=chat_message.response,
+                    sources=chat_message.sources,
+                    timestamp=chat_message.timestamp,
+                    cached=stream.cached
+                )
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+            
+            log_info(f"Streamed web chat message for user {user_id}")
+            yield format_sse("done", saved.model_dump(mode="json"))
+        except Exception as e:
+            log_error(e, f"Error streaming web chat message for user {user_id}")
+            yield format_sse("error", {"detail": str(e)})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/chat/history", response_model=List[WebChatMessage])
 async def get_web_chat_history(
     limit: Optional[int] = 50,
@@ -238,17 +368,19 @@ async def get_web_chat_history(
     try:
         log_api_request("GET", "/webrag/chat/history", current_user.id)
         
-        chat_history = (
+        chat_history = await run_io(
             db.query(WebChatHistory)
             .filter(WebChatHistory.user_id == current_user.id)
             .order_by(desc(WebChatHistory.timestamp))
             .offset(offset)
             .limit(limit)
-            .all()
+            .all
         )
         
         log_info(f"Retrieved web chat history for user {current_user.id}")
         return chat_history
+    except HTTPException as he:
+        raise he
     except Exception as e:
         log_error(e, f"Error fetching web chat history for user {current_user.id}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -262,16 +394,19 @@ async def clear_web_chat_history(
     try:
         log_api_request("DELETE", "/webrag/chat/history", current_user.id)
         
-        deleted_count = (
+        deleted_count = await run_io(
             db.query(WebChatHistory)
             .filter(WebChatHistory.user_id == current_user.id)
-            .delete(synchronize_session=False)
+            .delete,
+            synchronize_session=False
         )
-        db.commit()
+        await run_io(db.commit)
         
         log_info(f"Cleared web chat history for user {current_user.id}")
         
         return {"message": f"Successfully deleted {deleted_count} web chat messages"}
+    except HTTPException as he:
+        raise he
     except Exception as e:
         db.rollback()
         log_error(e, f"Error clearing web chat history for user {current_user.id}")
@@ -9,6 +9,111 @@ class Settings(BaseSettings):
     GROQ_API_KEY: str
     DATABASE_QUERY_URL: str
 
+    # Build services and load models in the background at startup instead of on first use
+    WARMUP_ON_STARTUP: bool = False
+
+    # Background document ingestion. Worker processes only extract and embed;
+    # Chroma's persistent client is single-process, so the API process does every write
+    INGESTION_WORKERS: int = 2
+    PDF_EXTRACT_WORKERS: int = 0  # 0 splits the CPU cores between INGESTION_WORKERS
+    PDF_PAGES_PER_SHARD: int = 16
+    PDF_PARALLEL_MIN_PAGES: int = 64
+    TABULAR_CHUNK_MAX_CHARS: int = 800
+    TABULAR_CHUNK_MAX_ROWS: int = 50
+    TABULAR_SQL_ENABLED: bool = True  # answer CSV/Excel documents with SQL instead of embeddings
+    TABULAR_DB_DIR: str = "tabular_db"
+
+    # NL-to-SQL answers
+    SQL_RESULT_MAX_ROWS: int = 100  # rows fetched and sent to the LLM; the total is still counted
+
+    # NL-to-SQL schema prompt, introspected once per schema version
+    SQL_SCHEMA_SAMPLE_VALUES: int = 3  # distinct sample values per text column, 0 disables
+    SQL_SCHEMA_ROW_COUNTS: bool = True
+    # Large schemas: prompt with the tables relevant to the question and their foreign key neighbours
+    SQL_SCHEMA_SUBSET_ENABLED: bool = True
+    SQL_SCHEMA_SUBSET_MIN_TABLES: int = 30  # smaller schemas are always sent whole
+    SQL_SCHEMA_SUBSET_TOP_TABLES: int = 5
+    SQL_SCHEMA_SUBSET_MAX_TABLES: int = 15  # top tables plus neighbours
+
+    # Vector store: "per_document" (one Chroma collection per document) or
+    # "shared" (one collection filtered by document_id metadata)
+    VECTOR_STORE_LAYOUT: str = "per_document"
+    MULTI_DOCUMENT_SEARCH_WORKERS: int = 8  # parallel collection queries for cross-document chat
+
+    # Hybrid BM25 + vector retrieval fused with reciprocal rank fusion
+    HYBRID_SEARCH_ENABLED: bool = True
+    LEXICAL_INDEX_DIR: str = "lexical_index"
+    HYBRID_CANDIDATES: int = 20  # results taken from each retriever before fusion
+    RRF_K: int = 60
+
+    # Context chunks handed to the LLM
+    DOCUMENT_TOP_K: int = 3
+    WEB_TOP_K: int = 5
+
+    # Optional cross-encoder reranking of retrieved candidates
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES: int = 20
+    RERANK_BATCH_SIZE: int = 16
+    RERANK_BUDGET_MS: float = 150  # past this the retriever order is kept
+    RERANK_CACHE_SIZE: int = 20000
+    RERANK_CACHE_TTL_SECONDS: float = 3600
+
+    # Shared embedding engine
+    EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_BACKEND: str = "torch"  # "torch", "onnx" or "onnx-int8" (ONNX Runtime, int8 dynamic quantization)
+    EMBEDDING_ONNX_DIR: str = "onnx_models"
+    EMBEDDING_ONNX_THREADS: int = 0  # 0 lets ONNX Runtime pick
+    EMBEDDING_MAX_BATCH_SIZE: int = 64
+    EMBEDDING_MAX_WAIT_MS: float = 5.0
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "embedding_cache/embeddings.db"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200000
+    EMBEDDING_CACHE_TOUCH_SECONDS: float = 60  # LRU recency granularity; hits within it don't write
+
+    # Query-side caches
+    QUERY_EMBEDDING_CACHE_SIZE: int = 2048
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: float = 3600
+    RETRIEVAL_CACHE_DIR: str = "retrieval_cache"
+    RETRIEVAL_CACHE_SIZE: int = 4096
+    RETRIEVAL_CACHE_TTL_SECONDS: float = 600
+
+    # Semantic LLM answer cache
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_TTL_SECONDS: float = 86400
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 10000
+
+    # Concurrent web page fetching
+    WEB_FETCH_CONCURRENCY: int = 16
+    WEB_FETCH_PER_HOST: int = 4
+    WEB_FETCH_TIMEOUT_SECONDS: float = 10.0
+    WEB_REFRESH_INTERVAL_MINUTES: int = 1440  # 0 disables background refresh
+
+    # HTML extraction: "auto", "selectolax", "lxml" or "html.parser"
+    WEB_HTML_PARSER: str = "auto"
+    WEB_READABILITY: bool = False
+
+    # Shared LLM gateway (OpenAI-compatible chat completions API)
+    LLM_API_BASE: str = "https://api.groq.com/openai/v1"
+    LLM_MAX_CONCURRENCY: int = 16  # calls in flight at once
+    LLM_MAX_CONNECTIONS: int = 32
+    LLM_HTTP2: bool = True  # needs the h2 package, otherwise keep-alive HTTP/1.1
+    LLM_MAX_RETRIES: int = 3  # on 429, 5xx and connection errors
+    LLM_BACKOFF_BASE_SECONDS: float = 0.5
+    LLM_BACKOFF_MAX_SECONDS: float = 8.0
+    LLM_TIMEOUT_SECONDS: float = 60  # deadline per call, retries included
+
+    # Identical concurrent questions share one computation
+    COALESCE_REQUESTS: bool = True
+
+    # Bounded executors for blocking work in async handlers
+    IO_POOL_WORKERS: int = 32  # database, Chroma and LLM calls
+    IO_POOL_QUEUE: int = 64
+    CPU_POOL_WORKERS: int = 0  # embedding and parsing; 0 uses the CPU count
+    CPU_POOL_QUEUE: int = 32
+    POOL_RETRY_AFTER_SECONDS: int = 2  # Retry-After sent with 503 when a pool is full
+
     class Config:
         env_file = ".env"
 
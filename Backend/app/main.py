@@ -1,10 +1,17 @@
-from fastapi import FastAPI
-from app.database import engine, Base
+import threading
+from fastapi import Depends, FastAPI
+from app.config import settings
+from app.database import engine, Base, add_missing_columns
+from app.services.registry import registry
+from app.services.auth import AuthService
+from app.services.executors import get_cpu_executor, get_io_executor
+from app.services.llm import get_llm_gateway
 from app.utils.logger import log_info
-from .api import auth, query, chat, documents, web_chat
+from .api import auth, query, chat, documents, web_chat, metrics
 
 # Create database tables if they don't exist
 Base.metadata.create_all(bind=engine)
+add_missing_columns()
 
 app = FastAPI(title="RAG-based Query System", version="1.0")
 
@@ -14,8 +21,48 @@ app.include_router(query.router)
 app.include_router(chat.router)
 app.include_router(documents.router)
 app.include_router(web_chat.router)
+app.include_router(metrics.router)
+
+@app.on_event("startup")
+def resume_ingestion_jobs():
+    documents.ingestion_service.resume_pending_jobs()
+
+@app.on_event("startup")
+async def start_web_refresh():
+    web_chat.refresh_scheduler.start()
+
+@app.on_event("startup")
+def schedule_warm_up():
+    # Serve requests right away; services a request needs first are built on demand
+    if settings.WARMUP_ON_STARTUP:
+        threading.Thread(target=registry.warm_up, name="service-warm-up", daemon=True).start()
+
+@app.on_event("shutdown")
+def stop_ingestion_workers():
+    documents.ingestion_service.shutdown()
+
+@app.on_event("shutdown")
+async def stop_web_refresh():
+    await web_chat.refresh_scheduler.stop()
+
+@app.on_event("shutdown")
+def stop_executors():
+    get_io_executor().shutdown()
+    get_cpu_executor().shutdown()
+
+@app.on_event("shutdown")
+def close_llm_gateway():
+    get_llm_gateway().close()
 
 @app.get("/")
 def root():
     log_info("Root endpoint accessed")
     return {"message": "Welcome to the RAG-based Query System!"}
+
+@app.post("/warmup", dependencies=[Depends(AuthService.get_current_user)])
+def warm_up():
+    """Build every service and load its models now instead of on first use.
+
+    Loading the models is expensive, so only signed-in users may trigger it.
+    """
+    return registry.warm_up()
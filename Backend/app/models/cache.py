@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, LargeBinary
+from ..database import Base
+
+class SemanticCacheEntry(Base):
+    __tablename__ = "semantic_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    collection = Column(String, nullable=False, index=True)
+    context_key = Column(String(64), nullable=False, index=True)  # hash of the retrieved chunk ids
+    query = Column(Text, nullable=False)
+    query_embedding = Column(LargeBinary, nullable=False)  # float32 vector
+    answer = Column(Text, nullable=False)
+    hit_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_hit_at = Column(DateTime, default=datetime.utcnow, index=True)
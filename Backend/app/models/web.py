@@ -0,0 +1,23 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint
+from ..database import Base
+
+class IndexedURL(Base):
+    __tablename__ = "indexed_urls"
+    __table_args__ = (UniqueConstraint("user_id", "url_hash", name="uq_indexed_urls_user_url"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    url = Column(Text, nullable=False)
+    url_hash = Column(String(64), nullable=False)
+    title = Column(Text, nullable=True)
+
+    # HTTP validators and content fingerprint from the last successful fetch
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of the response body
+    chunks_count = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_fetched_at = Column(DateTime, nullable=True, index=True)
+    last_changed_at = Column(DateTime, nullable=True)
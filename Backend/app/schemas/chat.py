@@ -1,7 +1,7 @@
 # backend/app/schemas/chat.py
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 class ChatMessageBase(BaseModel):
     message: str
@@ -15,6 +15,21 @@ class ChatMessage(ChatMessageBase):
     user_id: int
     response: str
     timestamp: datetime
+    cached: bool = False
+
+class MultiDocumentChatCreate(BaseModel):
+    message: str
+    document_ids: Optional[List[int]] = None  # None searches every document of the user
+
+class MultiDocumentChatMessage(BaseModel):
+    id: int
+    user_id: int
+    message: str
+    response: str
+    document_ids: List[int]
+    sources: List[Dict[str, Any]] = []  # context chunks best first, with document_id
+    timestamp: datetime
+    cached: bool = False
 
 class ChatHistoryResponse(BaseModel):
     history: List[ChatMessage]
@@ -31,8 +46,9 @@ class WebChatMessage(BaseModel):
     user_id: int
     message: str
     response: str
-    sources: Optional[List[Dict[str, str]]] = None
+    sources: Optional[List[Dict[str, Any]]] = None
     timestamp: datetime
+    cached: bool = False
     
     class Config:
         from_attributes = True
@@ -42,7 +58,7 @@ class WebChatHistoryResponse(BaseModel):
     user_id: int
     message: str
     response: str
-    sources: Optional[List[Dict[str, str]]] = None
+    sources: Optional[List[Dict[str, Any]]] = None
     timestamp: datetime
     
     class Config:
@@ -17,4 +17,23 @@ class Document(DocumentBase):
     uploaded_at: Optional[datetime] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class DocumentUpload(Document):
+    job_id: int
+    status: str
+
+class IngestionStatus(BaseModel):
+    document_id: int
+    job_id: int
+    status: str
+    chunks_done: int
+    chunks_total: Optional[int] = None
+    chunks_reused: Optional[int] = None
+    attempts: int
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    queued_seconds: Optional[float] = None
+    processing_seconds: Optional[float] = None
@@ -0,0 +1,189 @@
+from typing import List, Optional, Dict, Sequence
+from datetime import datetime, timedelta
+from functools import lru_cache
+from array import array
+import threading
+import hashlib
+import math
+import logging
+from ..config import settings
+from ..database import SessionLocal
+from ..models.cache import SemanticCacheEntry
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _encode(vector: Sequence[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+def _decode(blob: bytes) -> array:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+class SemanticAnswerCache:
+    """LLM answers reused across paraphrased questions.
+
+    An entry is only a candidate when it belongs to the same collection and
+    was generated from exactly the same retrieved chunks; among those, the
+    stored answer is returned if its question embedding is within
+    ``threshold`` cosine similarity of the new one. Entries live in the app
+    database, expire after ``ttl_seconds`` and the least recently hit ones
+    are evicted beyond ``max_entries``.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 86400, max_entries: int = 10000):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @staticmethod
+    def context_key(chunk_ids: List[str], history: str = "") -> str:
+        """Key of what the answer was generated from: the chunks and any conversation history in the prompt"""
+        key = "\0".join(sorted(chunk_ids))
+        if history:
+            key += "\1" + history
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def lookup(self, collection: str, chunk_ids: List[str], query_embedding: List[float],
+               history: str = "") -> Optional[str]:
+        """Return a cached answer for a semantically equivalent question, if any"""
+        db = SessionLocal()
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+            candidates = (
+                db.query(SemanticCacheEntry)
+                .filter(
+                    SemanticCacheEntry.collection == collection,
+                    SemanticCacheEntry.context_key == self.context_key(chunk_ids, history),
+                    SemanticCacheEntry.created_at >= cutoff
+                )
+                .all()
+            )
+
+            best, best_score = None, self.threshold
+            for entry in candidates:
+                score = _cosine(query_embedding, _decode(entry.query_embedding))
+                if score >= best_score:
+                    best, best_score = entry, score
+
+            if best is None:
+                self._count(hit=False)
+                return None
+
+            best.hit_count += 1
+            best.last_hit_at = datetime.utcnow()
+            db.commit()
+            self._count(hit=True)
+            logger.info(f"Semantic cache hit on {collection} (similarity {best_score:.3f})")
+            return best.answer
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Semantic cache lookup failed: {str(e)}")
+            self._count(hit=False)
+            return None
+        finally:
+            db.close()
+
+    def store(self, collection: str, chunk_ids: List[str], query: str,
+              query_embedding: List[float], answer: str, history: str = "") -> None:
+        db = SessionLocal()
+        try:
+            db.add(SemanticCacheEntry(
+                collection=collection,
+                context_key=self.context_key(chunk_ids, history),
+                query=query,
+                query_embedding=_encode(query_embedding),
+                answer=answer
+            ))
+            db.commit()
+            with self._lock:
+                self.stores += 1
+            self._evict(db)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Semantic cache store failed: {str(e)}")
+        finally:
+            db.close()
+
+    def invalidate(self, collection: str) -> None:
+        """Drop every cached answer for a collection"""
+        db = SessionLocal()
+        try:
+            db.query(SemanticCacheEntry).filter(
+                SemanticCacheEntry.collection == collection
+            ).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Semantic cache invalidation failed: {str(e)}")
+        finally:
+            db.close()
+
+    def _evict(self, db) -> None:
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        removed = (
+            db.query(SemanticCacheEntry)
+            .filter(SemanticCacheEntry.created_at < cutoff)
+            .delete(synchronize_session=False)
+        )
+
+        excess = db.query(SemanticCacheEntry).count() - self.max_entries
+        if excess > 0:
+            oldest = [
+                row.id for row in
+                db.query(SemanticCacheEntry.id)
+                .order_by(SemanticCacheEntry.last_hit_at)
+                .limit(excess)
+            ]
+            removed += (
+                db.query(SemanticCacheEntry)
+                .filter(SemanticCacheEntry.id.in_(oldest))
+                .delete(synchronize_session=False)
+            )
+        db.commit()
+        if removed:
+            with self._lock:
+                self.evictions += removed
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl_seconds,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+@lru_cache()
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+    return SemanticAnswerCache(
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS,
+        max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES
+    )
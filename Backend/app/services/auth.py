@@ -10,6 +10,7 @@ from ..models.user import User
 from ..schemas.token import TokenData
 from ..config import settings
 from ..database import get_db
+from .executors import run_io
 class AuthService:
     pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
@@ -56,7 +57,7 @@ class AuthService:
             token_data = TokenData(email=email)
         except JWTError:
             raise credentials_exception
-        user = db.query(User).filter(User.email == token_data.email).first()
+        user = await run_io(cls.get_user_by_email, db, token_data.email)
         if user is None:
             raise credentials_exception
         return user
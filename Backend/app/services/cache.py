@@ -0,0 +1,168 @@
+from typing import Any, Dict, Hashable, Optional
+from collections import OrderedDict
+from functools import lru_cache
+import threading
+import time
+import os
+import logging
+from ..config import settings
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def normalize_query(query: str, lowercase: bool = True) -> str:
+    """Collapse case and whitespace so trivially different questions share cache keys"""
+    return " ".join((query.lower() if lowercase else query).split())
+
+class TTLCache:
+    """Thread-safe in-memory LRU cache whose entries also expire after a TTL"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+class RetrievalCache:
+    """Per-collection cache of top-k query results.
+
+    Each collection has a version stamp stored as the mtime of a marker file.
+    Writers call ``invalidate`` after changing a collection; because the stamp
+    lives on disk, changes made by ingestion worker processes also invalidate
+    results cached in the API process. Readers take ``version`` before
+    querying and pass it to ``set``, so results of a query that overlapped an
+    invalidation are never stored as fresh.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 4096, ttl_seconds: float = 600):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+        self._entries = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.invalidations = 0
+
+    def _marker(self, collection_name: str) -> str:
+        return os.path.join(self.directory, f"{collection_name}.version")
+
+    def version(self, collection_name: str) -> int:
+        try:
+            return os.stat(self._marker(collection_name)).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def get(self, collection_name: str, query: str, n_results: int) -> Optional[Any]:
+        key = (collection_name, normalize_query(query), n_results)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == self.version(collection_name):
+            with self._lock:
+                self.hits += 1
+            return entry[1]
+        with self._lock:
+            self.misses += 1
+            if entry is not None:
+                self.stale += 1
+        if entry is not None:
+            self._entries.pop(key)
+        return None
+
+    def set(self, collection_name: str, query: str, n_results: int, results: Any, version: int) -> None:
+        """Cache results of a query made at ``version``, taken before the query ran"""
+        if version != self.version(collection_name):
+            # The collection changed while the query was in flight
+            return
+        key = (collection_name, normalize_query(query), n_results)
+        self._entries.set(key, (version, results))
+
+    def invalidate(self, collection_name: str) -> None:
+        """Mark every cached result for a collection as stale"""
+        marker = self._marker(collection_name)
+        try:
+            previous = self.version(collection_name)
+            with open(marker, "a"):
+                pass
+            stamp = max(time.time_ns(), previous + 1)
+            os.utime(marker, ns=(stamp, stamp))
+            with self._lock:
+                self.invalidations += 1
+        except OSError as e:
+            logger.warning(f"Could not invalidate retrieval cache for {collection_name}: {str(e)}")
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self._entries.max_entries,
+                "ttl_seconds": self._entries.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stale": self.stale,
+                "invalidations": self.invalidations,
+            }
+
+@lru_cache()
+def get_retrieval_cache() -> RetrievalCache:
+    return RetrievalCache(
+        directory=settings.RETRIEVAL_CACHE_DIR,
+        max_entries=settings.RETRIEVAL_CACHE_SIZE,
+        ttl_seconds=settings.RETRIEVAL_CACHE_TTL_SECONDS
+    )
@@ -0,0 +1,36 @@
+from typing import Callable, Dict, List, Tuple
+import hashlib
+
+def chunk_id_factory(namespace: str) -> Callable[[str], str]:
+    """Return a function that assigns ids to chunks of one namespace in order.
+
+    An id is derived from the namespace (a document or URL), the chunk text
+    and how many identical chunks came before it, so unchanged content keeps
+    its id across re-indexing and only new or edited chunks need embedding.
+    Because the id does not depend on absolute position, inserting a chunk
+    does not change the ids of the chunks after it.
+    """
+    prefix = hashlib.sha256(namespace.encode("utf-8")).hexdigest()[:16]
+    seen: Dict[str, int] = {}
+
+    def next_id(chunk: str) -> str:
+        digest = hashlib.sha256(chunk.encode("utf-8")).hexdigest()[:32]
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        return f"{prefix}-{digest}-{occurrence}"
+
+    return next_id
+
+def chunk_ids(namespace: str, chunks: List[str]) -> List[str]:
+    """Deterministic ids for a sequence of chunks (see ``chunk_id_factory``)"""
+    next_id = chunk_id_factory(namespace)
+    return [next_id(chunk) for chunk in chunks]
+
+def diff_chunk_ids(existing_ids: List[str], new_ids: List[str]) -> Tuple[List[str], List[str], List[str]]:
+    """Split ids into (added, removed, kept) relative to what is already stored"""
+    existing = set(existing_ids)
+    current = set(new_ids)
+    added = [chunk_id for chunk_id in new_ids if chunk_id not in existing]
+    removed = [chunk_id for chunk_id in existing_ids if chunk_id not in current]
+    kept = [chunk_id for chunk_id in new_ids if chunk_id in existing]
+    return added, removed, kept
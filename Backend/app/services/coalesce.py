@@ -0,0 +1,66 @@
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+import asyncio
+import logging
+from ..config import settings
+from .cache import normalize_query
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def coalesce_key(collection: str, query: str, prompt_version: Any, *extra: Hashable) -> tuple:
+    """Requests with equal keys get the same answer: same collection, question and prompt"""
+    return (collection, normalize_query(query), prompt_version, *extra)
+
+class RequestCoalescer:
+    """Single-flight execution of identical concurrent requests.
+
+    The first request for a key starts the computation; requests with the
+    same key that arrive while it is running await that computation instead
+    of starting their own, and all of them receive its result or its
+    exception. Nothing is kept once it finishes, so this only merges
+    requests that overlap in time; the answer caches cover later repeats.
+    The computation runs as its own task, so a caller that disconnects does
+    not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._requests = 0
+        self._executions = 0
+        self._coalesced = 0
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        self._requests += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self._executions += 1
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self._coalesced += 1
+            logger.info(f"Coalesced request onto in-flight computation for {key[0]}")
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requests": self._requests,
+            "executions": self._executions,
+            "coalesced": self._coalesced,
+            "in_flight": len(self._in_flight),
+        }
+
+@lru_cache()
+def get_request_coalescer() -> Optional[RequestCoalescer]:
+    if not settings.COALESCE_REQUESTS:
+        return None
+    return RequestCoalescer()
+
+async def coalesced(key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+    """Await ``compute()``, sharing it with identical concurrent requests when coalescing is enabled"""
+    coalescer = get_request_coalescer()
+    if coalescer is None:
+        return await compute()
+    return await coalescer.run(key, compute)
@@ -55,6 +55,15 @@ class DocumentService:
         db.refresh(db_document)
         return db_document
     
+    def replace_file(self, db: Session, document: Document, file_path: str,
+                     file_name: str) -> Document:
+        """Point a document record at a newly uploaded version of its file"""
+        document.file_path = file_path
+        document.file_name = file_name
+        db.commit()
+        db.refresh(document)
+        return document
+    
     def get_user_documents(self, db: Session, user_id: int) -> List[Document]:
         """Get all documents for a user"""
         return db.query(Document).filter(Document.user_id == user_id).all()
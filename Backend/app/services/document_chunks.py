@@ -0,0 +1,150 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+import queue
+import hashlib
+import os
+import logging
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from ..config import settings
+from .pdf_extract import iter_pdf_pages
+from .tabular_extract import iter_table_chunks
+from .chunking import chunk_id_factory
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ChunkBatch:
+    """Chunks of a document ready to be written to its collection.
+
+    New chunks carry their ``embeddings``; chunks that are already stored
+    have ``embeddings=None`` and only need their metadata refreshed.
+    """
+    ids: List[str]
+    chunks: List[str]
+    metadatas: List[Dict[str, Any]]
+    embeddings: Optional[List[List[float]]] = None
+
+def make_text_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=500,
+        chunk_overlap=50,
+        separators=["\n\n", "\n", ".", " ", ""]
+    )
+
+def calculate_file_hash(file_path: str) -> str:
+    """Calculate SHA-256 hash of file contents"""
+    hash_sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(4096), b""):
+            hash_sha256.update(chunk)
+    return hash_sha256.hexdigest()
+
+def pdf_extract_workers() -> int:
+    """Extraction processes per PDF.
+
+    Every ingestion worker may extract a large PDF at once, so by default
+    the cores are split between them instead of each taking all of them.
+    """
+    if settings.PDF_EXTRACT_WORKERS:
+        return settings.PDF_EXTRACT_WORKERS
+    return max(1, (os.cpu_count() or 1) // max(1, settings.INGESTION_WORKERS))
+
+def iter_document_chunks(file_path: str, file_type: str,
+                         text_splitter: RecursiveCharacterTextSplitter) -> Iterator[Tuple[str, Dict[str, Union[str, int]]]]:
+    """Yield (chunk, metadata) pairs for a supported file type.
+
+    PDFs are chunked page by page as pages are extracted and every chunk
+    carries its 1-based ``page`` number; spreadsheets are streamed as
+    row groups with their sheet and row range.
+    """
+    try:
+        if file_type == 'pdf':
+            pages = iter_pdf_pages(
+                file_path,
+                workers=pdf_extract_workers(),
+                pages_per_shard=settings.PDF_PAGES_PER_SHARD,
+                parallel_min_pages=settings.PDF_PARALLEL_MIN_PAGES
+            )
+            for page_number, page_text in pages:
+                for chunk in text_splitter.split_text(page_text):
+                    yield chunk, {'page': page_number}
+        elif file_type in ['csv', 'xlsx', 'xls']:
+            yield from iter_table_chunks(
+                file_path,
+                file_type,
+                max_chars=settings.TABULAR_CHUNK_MAX_CHARS,
+                max_rows=settings.TABULAR_CHUNK_MAX_ROWS
+            )
+        else:
+            raise ValueError(f"Unsupported file type: {file_type}")
+    except Exception as e:
+        logger.error(f"Text extraction failed: {str(e)}")
+        raise
+
+def iter_chunk_batches(document_id: int, namespace: str, file_path: str, file_type: str, file_hash: str,
+                       existing_ids: Set[str], embedding_engine, text_splitter: RecursiveCharacterTextSplitter,
+                       batch_size: int = 100) -> Iterator[ChunkBatch]:
+    """Chunk a document and embed the chunks that are not stored yet.
+
+    Chunk ids are derived from content within ``namespace`` (see
+    ``chunk_id_factory``), so only chunks missing from ``existing_ids``
+    are embedded. Chunks stream in as pages are extracted and leave in
+    batches, so only one batch of each kind is held in memory at a time.
+    """
+    next_id = chunk_id_factory(namespace)
+    new = ChunkBatch([], [], [])
+    kept = ChunkBatch([], [], [])
+
+    def take(batch: ChunkBatch, embed: bool) -> ChunkBatch:
+        if embed:
+            batch.embeddings = embedding_engine.embed_documents(batch.chunks)
+        return batch
+
+    for chunk, metadata in iter_document_chunks(file_path, file_type, text_splitter):
+        chunk_id = next_id(chunk)
+        batch = kept if chunk_id in existing_ids else new
+        batch.ids.append(chunk_id)
+        batch.chunks.append(chunk)
+        batch.metadatas.append({'document_id': document_id, 'file_hash': file_hash, **metadata})
+        if len(batch.ids) >= batch_size:
+            yield take(batch, embed=batch is new)
+            if batch is new:
+                new = ChunkBatch([], [], [])
+            else:
+                kept = ChunkBatch([], [], [])
+    if new.ids:
+        yield take(new, embed=True)
+    if kept.ids:
+        yield take(kept, embed=False)
+
+def stream_chunk_batches(batches, stop, document_id: int, namespace: str, file_path: str, file_type: str,
+                         file_hash: str, existing_ids: Set[str]) -> None:
+    """Ingestion worker entry point: extract, chunk and embed a document into ``batches``.
+
+    Runs in a worker process and never opens the vector store; the API
+    process reads ``("batch", ChunkBatch)`` items from the queue and writes
+    them, followed by ``("done", None)`` or ``("error", message)``. Stops
+    early once the reader sets ``stop``.
+    """
+    from .embedding import get_embedding_engine
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        for batch in iter_chunk_batches(document_id, namespace, file_path, file_type, file_hash, existing_ids,
+                                        get_embedding_engine(), make_text_splitter()):
+            if not put(("batch", batch)):
+                return
+        put(("done", None))
+    except Exception as e:
+        logger.error(f"Embedding document {document_id} failed: {str(e)}")
+        put(("error", f"{type(e).__name__}: {e}"))
@@ -0,0 +1,255 @@
+from typing import TYPE_CHECKING, List, Dict, Optional, Union
+from functools import lru_cache
+import threading
+import queue
+import time
+import logging
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from ..config import settings
+from .embedding_cache import EmbeddingCache
+from .embedding_onnx import EMBEDDING_BACKENDS, OnnxSentenceEmbeddings
+from .cache import TTLCache, normalize_query
+
+if TYPE_CHECKING:
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class _EmbeddingRequest:
+    __slots__ = ("texts", "result", "error", "done")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.result: Optional[List[List[float]]] = None
+        self.error: Optional[Exception] = None
+        self.done = threading.Event()
+
+class EmbeddingEngine:
+    """Process-wide embedding model shared by every service.
+
+    Callers block on ``embed_documents``/``embed_query`` while a single worker
+    thread drains the request queue into micro-batches. A batch is flushed as
+    soon as it holds ``max_batch_size`` texts or ``max_wait_ms`` has passed
+    since its first request arrived, so concurrent queries and ingestion
+    share one forward pass instead of running one string at a time.
+
+    ``embed_documents`` additionally consults the on-disk ``cache`` so chunks
+    that were embedded before (by any user or process) skip the model, and
+    ``embed_query`` keeps recent question vectors in ``query_cache``.
+    """
+
+    def __init__(self, model_name: str, max_batch_size: int = 64, max_wait_ms: float = 5.0,
+                 cache: Optional[EmbeddingCache] = None, query_cache: Optional[TTLCache] = None,
+                 backend: str = "torch"):
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unknown embedding backend: {backend}")
+        self.model_name = model_name
+        self.backend = backend
+        # Quantized vectors differ slightly, so they get their own cache entries
+        self.cache_key = model_name if backend == "torch" else f"{model_name}#{backend}"
+        self.cache = cache
+        self.query_cache = query_cache
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._uncased: Optional[bool] = None
+        self._queue: "queue.Queue[_EmbeddingRequest]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+        # Counters
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._texts = 0
+        self._batches = 0
+        self._largest_batch = 0
+        self._busy_seconds = 0.0
+        self._started_at = time.time()
+
+    @property
+    def model(self) -> Union["HuggingFaceEmbeddings", OnnxSentenceEmbeddings]:
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    logger.info(f"Loading embedding model {self.model_name} ({self.backend})")
+                    if self.backend == "torch":
+                        # Imported here so the ONNX backends never load PyTorch
+                        from langchain_huggingface import HuggingFaceEmbeddings
+                        self._model = HuggingFaceEmbeddings(
+                            model_name=self.model_name,
+                            model_kwargs={'device': 'cpu'}
+                        )
+                    else:
+                        self._model = OnnxSentenceEmbeddings(
+                            self.model_name,
+                            export_dir=settings.EMBEDDING_ONNX_DIR,
+                            quantize=self.backend == "onnx-int8",
+                            threads=settings.EMBEDDING_ONNX_THREADS
+                        )
+        return self._model
+
+    @property
+    def uncased(self) -> bool:
+        """Whether the model's tokenizer ignores case, checked once on the loaded model"""
+        if self._uncased is None:
+            model = self.model
+            client = getattr(model, "_client", None) or getattr(model, "client", None)
+            tokenizer = getattr(model, "tokenizer", None) or getattr(client, "tokenizer", None)
+            if tokenizer is None:
+                # Unknown: keep case so different questions never share a vector
+                self._uncased = False
+            else:
+                self._uncased = tokenizer("Hello World")["input_ids"] == tokenizer("hello world")["input_ids"]
+        return self._uncased
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            with self._worker_lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(
+                        target=self._run, name="embedding-batcher", daemon=True
+                    )
+                    self._worker.start()
+
+    def _submit(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        self._ensure_worker()
+        request = _EmbeddingRequest(list(texts))
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with the model, bypassing the chunk cache"""
+        return self._submit(texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed document chunks, reusing cached vectors where possible"""
+        if self.cache is None or not texts:
+            return self._submit(texts)
+
+        vectors = self.cache.get_many(self.cache_key, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            missing_texts = list(dict.fromkeys(texts[i] for i in missing))
+            computed = self._submit(missing_texts)
+            self.cache.put_many(self.cache_key, missing_texts, computed)
+            by_text = dict(zip(missing_texts, computed))
+            for i in missing:
+                vectors[i] = by_text[texts[i]]
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.query_cache is None:
+            return self._submit([text])[0]
+
+        # Lower-casing the key is lossless only when the tokenizer lower-cases anyway
+        key = normalize_query(text, lowercase=self.uncased)
+        vector = self.query_cache.get(key)
+        if vector is None:
+            vector = self._submit([text])[0]
+            self.query_cache.set(key, vector)
+        return vector
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            size = len(first.texts)
+            deadline = time.monotonic() + self.max_wait
+
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.texts)
+
+            self._flush(batch, size)
+
+    def _flush(self, batch: List[_EmbeddingRequest], size: int) -> None:
+        texts = [text for request in batch for text in request.texts]
+        started = time.perf_counter()
+        try:
+            vectors = self.model.embed_documents(texts)
+        except Exception as e:
+            logger.error(f"Embedding batch of {size} texts failed: {str(e)}")
+            for request in batch:
+                request.error = e
+                request.done.set()
+            return
+
+        elapsed = time.perf_counter() - started
+        offset = 0
+        for request in batch:
+            request.result = vectors[offset:offset + len(request.texts)]
+            offset += len(request.texts)
+            request.done.set()
+
+        with self._stats_lock:
+            self._requests += len(batch)
+            self._texts += size
+            self._batches += 1
+            self._largest_batch = max(self._largest_batch, size)
+            self._busy_seconds += elapsed
+
+    def stats(self) -> Dict[str, float]:
+        cache_stats = self.cache.stats() if self.cache is not None else None
+        with self._stats_lock:
+            return {
+                "model_name": self.model_name,
+                "backend": self.backend,
+                "model_loaded": self._model is not None,
+                "requests": self._requests,
+                "texts_embedded": self._texts,
+                "batches": self._batches,
+                "avg_batch_size": self._texts / self._batches if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+                "queue_depth": self._queue.qsize(),
+                "busy_seconds": round(self._busy_seconds, 3),
+                "texts_per_second": self._texts / self._busy_seconds if self._busy_seconds else 0.0,
+                "uptime_seconds": round(time.time() - self._started_at, 3),
+                "cache": cache_stats,
+            }
+
+@lru_cache()
+def get_embedding_engine() -> EmbeddingEngine:
+    cache = None
+    if settings.EMBEDDING_CACHE_ENABLED:
+        cache = EmbeddingCache(
+            path=settings.EMBEDDING_CACHE_PATH,
+            max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            touch_interval=settings.EMBEDDING_CACHE_TOUCH_SECONDS
+        )
+    return EmbeddingEngine(
+        model_name=settings.EMBEDDING_MODEL,
+        max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+        max_wait_ms=settings.EMBEDDING_MAX_WAIT_MS,
+        cache=cache,
+        backend=settings.EMBEDDING_BACKEND,
+        query_cache=TTLCache(
+            max_entries=settings.QUERY_EMBEDDING_CACHE_SIZE,
+            ttl_seconds=settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS
+        )
+    )
+
+class SentenceTransformerEmbedding(EmbeddingFunction):
+    """Chroma embedding function backed by the shared engine"""
+
+    def __init__(self, engine: Optional[EmbeddingEngine] = None):
+        self.engine = engine or get_embedding_engine()
+
+    def __call__(self, input: Documents) -> Embeddings:
+        if not input:
+            return []
+        return self.engine.embed(list(input))
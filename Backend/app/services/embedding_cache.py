@@ -0,0 +1,232 @@
+from typing import List, Optional, Dict, Sequence
+from array import array
+import threading
+import sqlite3
+import hashlib
+import time
+import os
+import logging
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class EmbeddingCache:
+    """On-disk, content-addressed cache of chunk embeddings.
+
+    Entries are keyed by SHA-256 of (model name, chunk text) and hold the
+    vector as raw little-endian float32 bytes. The store is a single SQLite
+    file so ingestion workers in other processes share it; once it grows past
+    ``max_entries`` the least recently used rows are evicted.
+
+    The cache is read-mostly, so hits don't write: an entry's ``last_used``
+    is refreshed at most once per ``touch_interval`` seconds, and refreshes
+    are collected in memory and written in one transaction with the next
+    put or once the interval has passed. The row count is only checked for
+    eviction after every ``max_entries // 20`` rows written.
+    """
+
+    _BATCH = 500  # keep IN (...) lists under SQLite's variable limit
+
+    def __init__(self, path: str, max_entries: int = 200_000, touch_interval: float = 60.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self._evict_check_rows = max(1, max_entries // 20)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._evictions = 0
+
+        # Pending last_used refreshes and rows written since the last eviction check
+        self._touch_lock = threading.Lock()
+        self._touched: Dict[bytes, float] = {}
+        self._touched_at = time.time()
+        self._rows_since_check = 0
+
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key BLOB PRIMARY KEY,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _key(model_name: str, text: str) -> bytes:
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).digest()
+
+    @staticmethod
+    def _encode(vector: Sequence[float]) -> bytes:
+        return array("f", vector).tobytes()
+
+    @staticmethod
+    def _decode(blob: bytes) -> List[float]:
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    def get_many(self, model_name: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Return cached vectors in input order, with None for misses"""
+        keys = [self._key(model_name, text) for text in texts]
+        found: Dict[bytes, List[float]] = {}
+        conn = self._connection()
+        try:
+            unique_keys = list(dict.fromkeys(keys))
+            for i in range(0, len(unique_keys), self._BATCH):
+                batch = unique_keys[i:i + self._BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, vector, last_used FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                now = time.time()
+                stale = []
+                for key, blob, last_used in rows:
+                    found[key] = self._decode(blob)
+                    if now - last_used >= self.touch_interval:
+                        stale.append(key)
+                self._touch(stale, now)
+            if self._touch_due():
+                self._write_touches(conn)
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache lookup failed: {str(e)}")
+            conn.rollback()
+
+        results = [found.get(key) for key in keys]
+        hits = sum(1 for vector in results if vector is not None)
+        with self._stats_lock:
+            self._hits += hits
+            self._misses += len(results) - hits
+        return results
+
+    def put_many(self, model_name: str, texts: List[str], vectors: List[List[float]]) -> None:
+        if not texts:
+            return
+        now = time.time()
+        rows = [
+            (self._key(model_name, text), len(vector), self._encode(vector), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        conn = self._connection()
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._write_touches(conn)
+            conn.commit()
+            with self._stats_lock:
+                self._writes += len(rows)
+            with self._touch_lock:
+                self._rows_since_check += len(rows)
+                check = self._rows_since_check >= self._evict_check_rows
+                if check:
+                    self._rows_since_check = 0
+            if check:
+                self._evict(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache write failed: {str(e)}")
+            conn.rollback()
+
+    def _touch(self, keys: List[bytes], now: float) -> None:
+        if not keys:
+            return
+        with self._touch_lock:
+            for key in keys:
+                self._touched[key] = now
+
+    def _touch_due(self) -> bool:
+        with self._touch_lock:
+            return bool(self._touched) and time.time() - self._touched_at >= self.touch_interval
+
+    def _write_touches(self, conn: sqlite3.Connection) -> None:
+        """Write pending last_used refreshes in the caller's transaction"""
+        with self._touch_lock:
+            touched, self._touched = self._touched, {}
+            self._touched_at = time.time()
+        if not touched:
+            return
+        try:
+            # MAX keeps a newer value another process may have written
+            conn.executemany(
+                "UPDATE embeddings SET last_used = MAX(last_used, ?) WHERE key = ?",
+                [(last_used, key) for key, last_used in touched.items()]
+            )
+        except sqlite3.Error:
+            # Put them back for the next attempt
+            with self._touch_lock:
+                for key, last_used in touched.items():
+                    self._touched.setdefault(key, last_used)
+            raise
+
+    def flush(self) -> None:
+        """Write pending last_used refreshes now"""
+        conn = self._connection()
+        try:
+            self._write_touches(conn)
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache flush failed: {str(e)}")
+            conn.rollback()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # Trim a little below the bound so we do not evict on every write
+        excess = count - int(self.max_entries * 0.9)
+        # Recently used entries must not look older than they are
+        self._write_touches(conn)
+        conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,)
+        )
+        conn.commit()
+        with self._stats_lock:
+            self._evictions += excess
+        logger.info(f"Evicted {excess} entries from embedding cache")
+
+    def stats(self) -> Dict[str, float]:
+        entries = None
+        try:
+            entries = self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache stats failed: {str(e)}")
+        size_bytes = sum(
+            os.path.getsize(self.path + suffix)
+            for suffix in ("", "-wal")
+            if os.path.exists(self.path + suffix)
+        )
+        with self._stats_lock:
+            lookups = self._hits + self._misses
+            return {
+                "path": self.path,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "size_bytes": size_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "writes": self._writes,
+                "evictions": self._evictions,
+            }
@@ -0,0 +1,117 @@
+from typing import List
+import platform
+import tempfile
+import shutil
+import os
+import logging
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+class OnnxSentenceEmbeddings:
+    """Sentence-transformers model run with ONNX Runtime on CPU.
+
+    On first use the Hugging Face model is exported to ONNX under
+    ``export_dir`` (and, with ``quantize``, converted to int8 with dynamic
+    quantization); later processes load the exported files directly.
+    Sentence vectors are mean-pooled over the attention mask and
+    L2-normalized as in the all-MiniLM sentence-transformers pipeline, so
+    they have the same dimensionality as the PyTorch backend and can be
+    stored next to its vectors. Requires ``onnxruntime`` and ``optimum``.
+    """
+
+    def __init__(self, model_name: str, export_dir: str, quantize: bool = False,
+                 max_length: int = 256, threads: int = 0):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.quantize = quantize
+        self.max_length = max_length
+        self.directory = os.path.join(export_dir, model_name.replace("/", "__"))
+        model_file = self._export()
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.directory)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        logger.info(f"Loaded ONNX embedding model {model_file}")
+
+    def _export(self) -> str:
+        """Path of the ONNX file to run, exporting it on first use.
+
+        Files are written to a private temporary directory and moved into
+        place, so ingestion workers that start together never load a
+        half-written model.
+        """
+        fp32_file = os.path.join(self.directory, "model.onnx")
+        int8_file = os.path.join(self.directory, "model_quantized.onnx")
+
+        if not os.path.exists(fp32_file):
+            from optimum.onnxruntime import ORTModelForFeatureExtraction
+            from transformers import AutoTokenizer
+            logger.info(f"Exporting {self.model_name} to ONNX in {self.directory}")
+            os.makedirs(os.path.dirname(self.directory) or ".", exist_ok=True)
+            tmp_dir = tempfile.mkdtemp(prefix=".export-", dir=os.path.dirname(self.directory) or ".")
+            ORTModelForFeatureExtraction.from_pretrained(self.model_name, export=True).save_pretrained(tmp_dir)
+            AutoTokenizer.from_pretrained(self.model_name).save_pretrained(tmp_dir)
+            try:
+                os.replace(tmp_dir, self.directory)
+            except OSError:
+                # Another process finished the export first
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        if self.quantize and not os.path.exists(int8_file):
+            from optimum.onnxruntime import ORTQuantizer
+            from optimum.onnxruntime.configuration import AutoQuantizationConfig
+            logger.info(f"Quantizing {self.model_name} to int8")
+            if platform.machine().lower() in ("arm64", "aarch64"):
+                config = AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+            else:
+                config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+            tmp_dir = tempfile.mkdtemp(prefix=".quantize-", dir=self.directory)
+            try:
+                ORTQuantizer.from_pretrained(self.directory, file_name="model.onnx").quantize(
+                    save_dir=tmp_dir,
+                    quantization_config=config
+                )
+                os.replace(os.path.join(tmp_dir, "model_quantized.onnx"), int8_file)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        return int8_file if self.quantize else fp32_file
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        import numpy as np
+
+        if not texts:
+            return []
+        encoded = self.tokenizer(
+            list(texts),
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np"
+        )
+        inputs = {
+            name: encoded[name].astype(np.int64)
+            for name in ("input_ids", "attention_mask", "token_type_ids")
+            if name in self.input_names and name in encoded
+        }
+        if "token_type_ids" in self.input_names and "token_type_ids" not in inputs:
+            inputs["token_type_ids"] = np.zeros_like(inputs["input_ids"])
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
@@ -0,0 +1,233 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Callable, Deque, Dict
+import asyncio
+import threading
+import os
+import time
+import logging
+from fastapi import HTTPException
+from ..config import settings
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class PoolSaturated(HTTPException):
+    """503 raised when a pool has no free worker or queue slot"""
+
+    def __init__(self, pool: str, retry_after: int):
+        super().__init__(
+            status_code=503,
+            detail=f"Server is busy ({pool} pool saturated), please retry",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+class BoundedExecutor:
+    """Thread pool with a bounded queue for blocking calls made from async handlers.
+
+    At most ``max_workers`` calls run at once and ``max_queue`` more may
+    wait for a worker; a call beyond that is rejected immediately with
+    PoolSaturated (503 + Retry-After) instead of queueing without limit, so
+    overload shows up as fast rejections rather than ever-growing latency.
+
+    ``run_waiting`` and ``call`` wait for a slot instead; waiters are woken
+    in arrival order by handing them the slot a finished call releases, and
+    ``run`` never takes a slot while anyone is waiting.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, retry_after: int = 1):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._thread_prefix = f"{name}-pool"
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=self._thread_prefix)
+        self._free_slots = max_workers + max_queue
+        self._waiters: Deque[Callable[[], None]] = deque()
+        self._slot_lock = threading.Lock()
+
+        # Counters
+        self._stats_lock = threading.Lock()
+        self._running = 0
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+        self._busy_seconds = 0.0
+
+    def _call(self, fn: Callable[..., Any], submitted: float) -> Any:
+        started = time.perf_counter()
+        with self._stats_lock:
+            self._pending -= 1
+            self._running += 1
+            self._wait_seconds += started - submitted
+        ok = False
+        try:
+            result = fn()
+            ok = True
+            return result
+        finally:
+            with self._stats_lock:
+                self._running -= 1
+                self._busy_seconds += time.perf_counter() - started
+                if ok:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+
+    def _try_acquire(self) -> bool:
+        with self._slot_lock:
+            if self._free_slots and not self._waiters:
+                self._free_slots -= 1
+                return True
+            return False
+
+    def _release(self) -> None:
+        """Hand the slot to the longest waiter, or return it to the pool"""
+        with self._slot_lock:
+            if self._waiters:
+                wake = self._waiters.popleft()
+            else:
+                self._free_slots += 1
+                return
+        wake()
+
+    async def _acquire_waiting(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._slot_lock:
+            if self._free_slots and not self._waiters:
+                self._free_slots -= 1
+                return
+            waiter = loop.create_future()
+
+            def hand_over():
+                # A waiter cancelled in the meantime passes the slot on
+                if waiter.cancelled():
+                    self._release()
+                else:
+                    waiter.set_result(None)
+
+            wake = lambda: loop.call_soon_threadsafe(hand_over)
+            self._waiters.append(wake)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._slot_lock:
+                try:
+                    self._waiters.remove(wake)
+                    granted = False
+                except ValueError:
+                    # Already woken: hand_over will see the cancellation, or the
+                    # slot was handed over just before it and is ours to pass on
+                    granted = waiter.done() and not waiter.cancelled()
+            if granted:
+                self._release()
+            raise
+
+    def _acquire_blocking(self) -> None:
+        with self._slot_lock:
+            if self._free_slots and not self._waiters:
+                self._free_slots -= 1
+                return
+            woken = threading.Event()
+            self._waiters.append(woken.set)
+        woken.wait()
+
+    def _done(self, future) -> None:
+        # A call cancelled while still queued never reached _call
+        if future.cancelled():
+            with self._stats_lock:
+                self._pending -= 1
+        self._release()
+
+    def _submit(self, fn: Callable[..., Any], args, kwargs) -> Future:
+        with self._stats_lock:
+            self._pending += 1
+        try:
+            future = self._executor.submit(self._call, partial(fn, *args, **kwargs), time.perf_counter())
+        except Exception:
+            with self._stats_lock:
+                self._pending -= 1
+            self._release()
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` on the pool, or raise PoolSaturated when it is full"""
+        if not self._try_acquire():
+            with self._stats_lock:
+                self._rejected += 1
+            logger.warning(f"{self.name} pool saturated; rejecting request")
+            raise PoolSaturated(self.name, self.retry_after)
+        return await asyncio.wrap_future(self._submit(fn, args, kwargs))
+
+    async def run_waiting(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Like ``run``, but wait for a free slot instead of failing.
+
+        For work fanned out inside a request that was already admitted and
+        for background jobs, which should slow down rather than fail.
+        """
+        await self._acquire_waiting()
+        return await asyncio.wrap_future(self._submit(fn, args, kwargs))
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Blocking ``run_waiting`` for synchronous code running on another pool.
+
+        Lets a request handler on the I/O pool run its compute-heavy steps
+        (embedding, reranking, parsing) on this pool. Called from one of
+        this pool's own threads, ``fn`` runs inline so it cannot deadlock.
+        """
+        if threading.current_thread().name.startswith(self._thread_prefix):
+            return fn(*args, **kwargs)
+        self._acquire_blocking()
+        return self._submit(fn, args, kwargs).result()
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            finished = self._completed + self._failed
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._pending,
+                "waiting": len(self._waiters),
+                "utilization": self._running / self.max_workers,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_wait_ms": self._wait_seconds * 1000 / finished if finished else 0.0,
+                "avg_run_ms": self._busy_seconds * 1000 / finished if finished else 0.0,
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+@lru_cache()
+def get_io_executor() -> BoundedExecutor:
+    """Pool for calls that mostly wait: database queries, Chroma and LLM HTTP calls"""
+    return BoundedExecutor(
+        "io",
+        max_workers=settings.IO_POOL_WORKERS,
+        max_queue=settings.IO_POOL_QUEUE,
+        retry_after=settings.POOL_RETRY_AFTER_SECONDS
+    )
+
+@lru_cache()
+def get_cpu_executor() -> BoundedExecutor:
+    """Pool for compute-heavy calls: embedding, reranking, HTML parsing and chunking"""
+    return BoundedExecutor(
+        "cpu",
+        max_workers=settings.CPU_POOL_WORKERS or (os.cpu_count() or 1),
+        max_queue=settings.CPU_POOL_QUEUE,
+        retry_after=settings.POOL_RETRY_AFTER_SECONDS
+    )
+
+async def run_io(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    return await get_io_executor().run(fn, *args, **kwargs)
+
+async def run_cpu(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    return await get_cpu_executor().run(fn, *args, **kwargs)
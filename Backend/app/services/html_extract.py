@@ -0,0 +1,272 @@
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional, Tuple
+import re
+import logging
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Optional fast parsers, tried in order by the "auto" backend
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # pragma: no cover - optional dependency
+    LexborHTMLParser = None
+
+try:
+    import lxml.html
+    from lxml.etree import ParserError
+except ImportError:  # pragma: no cover - optional dependency
+    lxml = None
+
+# Always dropped, matching what the BeautifulSoup extractor used to remove
+SKIP_TAGS = ("script", "style", "nav", "footer", "header")
+
+# Additionally dropped in readability mode
+BOILERPLATE_TAGS = ("aside", "form", "iframe", "noscript", "svg", "button", "template")
+BOILERPLATE_PATTERN = re.compile(
+    r"comment|sidebar|footer|masthead|\bnav|menu|breadcrumb|share|social|related|"
+    r"promo|banner|cookie|consent|advert|\bads?\b|sponsor|subscribe|newsletter|popup|modal",
+    re.IGNORECASE
+)
+MAIN_SELECTOR = "article, main, [role=main]"
+BLOCK_TAGS = ("div", "section", "ul", "ol", "li", "table", "tr", "td", "p")
+MAX_LINK_DENSITY = 0.5
+
+VOID_TAGS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr"
+))
+
+# Any whitespace run containing a newline, or two or more whitespace characters
+_BREAKS = re.compile(r"\s*\n\s*|\s{2,}")
+
+def clean_text(text: str) -> str:
+    """Split text into lines at line breaks and runs of spaces, dropping empty ones"""
+    return "\n".join(part for part in _BREAKS.split(text.strip()) if part)
+
+@dataclass
+class ExtractedPage:
+    title: Optional[str]
+    text: str
+    links: List[str] = field(default_factory=list)
+
+def _is_boilerplate(tag: str, attributes: Dict[str, Optional[str]]) -> bool:
+    if tag in BOILERPLATE_TAGS:
+        return True
+    if tag in ("html", "body", "article", "main"):
+        return False
+    marker = f"{attributes.get('class') or ''} {attributes.get('id') or ''}"
+    return bool(marker.strip()) and BOILERPLATE_PATTERN.search(marker) is not None
+
+def _extract_selectolax(html: str, readability: bool) -> ExtractedPage:
+    tree = LexborHTMLParser(html)
+    title_node = tree.css_first("title")
+    title = title_node.text(strip=True) if title_node is not None else None
+    links = [node.attributes.get("href") for node in tree.css("a[href]")]
+    tree.strip_tags(list(SKIP_TAGS))
+
+    root = tree.root
+    if root is None:
+        return ExtractedPage(title, "", links)
+
+    if readability:
+        # Pick the outermost boilerplate nodes before mutating: decomposing
+        # a node frees its descendants, which must not be touched afterwards
+        matches = [
+            node for node in tree.css(", ".join(BOILERPLATE_TAGS) + ", [class], [id]")
+            if _is_boilerplate(node.tag, node.attributes)
+        ]
+        removed = {node.mem_id for node in matches}
+        outermost = []
+        for node in matches:
+            parent = node.parent
+            while parent is not None and parent.mem_id not in removed:
+                parent = parent.parent
+            if parent is None:
+                outermost.append(node)
+        for node in outermost:
+            node.decompose()
+        candidates = tree.css(MAIN_SELECTOR)
+        if candidates:
+            root = max(candidates, key=lambda node: len(node.text()))
+        for node in reversed(root.css(", ".join(BLOCK_TAGS))):
+            text_length = len(node.text(strip=True))
+            if not text_length:
+                continue
+            link_length = sum(len(a.text(strip=True)) for a in node.css("a"))
+            if link_length / text_length > MAX_LINK_DENSITY:
+                node.decompose()
+
+    return ExtractedPage(title, clean_text(root.text(separator="\n")), links)
+
+def _extract_lxml(html: str, readability: bool) -> ExtractedPage:
+    # Parse bytes so pages that declare an XML encoding are accepted
+    parser = lxml.html.HTMLParser(encoding="utf-8", remove_comments=True)
+    try:
+        root = lxml.html.document_fromstring(html.encode("utf-8", "replace"), parser=parser)
+    except ParserError:
+        return ExtractedPage(None, "", [])
+
+    title = root.findtext(".//title")
+    title = title.strip() if title else None
+    links = root.xpath("//a/@href")
+    for element in list(root.iter(*SKIP_TAGS)):
+        element.drop_tree()
+
+    if readability:
+        for element in list(root.iter()):
+            if isinstance(element.tag, str) and _is_boilerplate(element.tag, element.attrib):
+                element.drop_tree()
+        candidates = root.xpath("//article | //main | //*[@role='main']")
+        if candidates:
+            root = max(candidates, key=lambda element: len(element.text_content()))
+        for element in reversed(list(root.iter(*BLOCK_TAGS))):
+            if element is root:
+                continue
+            text_length = len(element.text_content().strip())
+            if not text_length:
+                continue
+            link_length = sum(len(a.text_content().strip()) for a in element.iter("a"))
+            if link_length / text_length > MAX_LINK_DENSITY:
+                element.drop_tree()
+
+    return ExtractedPage(title, clean_text("\n".join(root.itertext())), links)
+
+class _StdlibParser(HTMLParser):
+    """Event-driven extraction for when no compiled parser is installed.
+
+    Text is collected into frames, one per open block element in
+    readability mode, so a block can be discarded when it closes with too
+    high a link density.
+    """
+
+    def __init__(self, readability: bool):
+        super().__init__(convert_charrefs=True)
+        self.readability = readability
+        self.title_parts: List[str] = []
+        self.links: List[str] = []
+        self._stack: List[str] = []
+        self._skip_depth: Optional[int] = None
+        self._main_depth: Optional[int] = None
+        self._in_title = False
+        self._in_link = 0
+        # Each frame: [open depth, parts as (text, in_main), chars, link chars]
+        self._frames: List[list] = [[0, [], 0, 0]]
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        attributes = dict(attrs)
+        if tag == "a":
+            if attributes.get("href"):
+                self.links.append(attributes["href"])
+            self._in_link += 1
+        if tag in VOID_TAGS:
+            return
+
+        self._stack.append(tag)
+        depth = len(self._stack)
+        if tag == "title":
+            self._in_title = True
+        if self._skip_depth is None and (
+            tag in SKIP_TAGS or (self.readability and _is_boilerplate(tag, attributes))
+        ):
+            self._skip_depth = depth
+        if self.readability:
+            if self._main_depth is None and (
+                tag in ("article", "main") or attributes.get("role") == "main"
+            ):
+                self._main_depth = depth
+            if tag in BLOCK_TAGS:
+                self._frames.append([depth, [], 0, 0])
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "a" and self._in_link:
+            self._in_link -= 1
+        if tag not in self._stack:
+            return
+        # Close the tag and anything left open inside it
+        while self._stack:
+            open_tag = self._stack.pop()
+            depth = len(self._stack) + 1
+            if open_tag == "title":
+                self._in_title = False
+            if self._skip_depth is not None and depth <= self._skip_depth:
+                self._skip_depth = None
+            if self._main_depth is not None and depth <= self._main_depth:
+                self._main_depth = None
+            if len(self._frames) > 1 and self._frames[-1][0] == depth:
+                self._close_frame()
+            if open_tag == tag:
+                break
+
+    def _close_frame(self) -> None:
+        _, parts, chars, link_chars = self._frames.pop()
+        if chars and link_chars / chars > MAX_LINK_DENSITY:
+            return
+        parent = self._frames[-1]
+        parent[1].extend(parts)
+        parent[2] += chars
+        parent[3] += link_chars
+
+    def handle_data(self, data: str) -> None:
+        if self._in_title:
+            self.title_parts.append(data)
+        if self._skip_depth is not None:
+            return
+        frame = self._frames[-1]
+        frame[1].append((data, self._main_depth is not None))
+        if self.readability:
+            chars = len(data.strip())
+            frame[2] += chars
+            if self._in_link:
+                frame[3] += chars
+
+    def result(self) -> ExtractedPage:
+        while len(self._frames) > 1:
+            self._close_frame()
+        parts = self._frames[0][1]
+        if self.readability and any(in_main for _, in_main in parts):
+            parts = [part for part in parts if part[1]]
+        title = "".join(self.title_parts).strip() or None
+        return ExtractedPage(title, clean_text("\n".join(text for text, _ in parts)), self.links)
+
+def _extract_stdlib(html: str, readability: bool) -> ExtractedPage:
+    parser = _StdlibParser(readability)
+    parser.feed(html)
+    parser.close()
+    return parser.result()
+
+_BACKENDS: Dict[str, Tuple[bool, Callable[[str, bool], ExtractedPage]]] = {
+    "selectolax": (LexborHTMLParser is not None, _extract_selectolax),
+    "lxml": (lxml is not None, _extract_lxml),
+    "html.parser": (True, _extract_stdlib),
+}
+
+def available_backends() -> List[str]:
+    return [name for name, (available, _) in _BACKENDS.items() if available]
+
+class HTMLExtractor:
+    """Title, main text and links of an HTML page from a single parse.
+
+    ``backend`` is one of ``available_backends()`` or "auto" for the fastest
+    installed one. With ``readability`` enabled, boilerplate (asides, forms,
+    elements whose class/id looks like navigation, ads or comments, and
+    link-heavy blocks) is removed and an ``<article>``/``<main>`` element is
+    preferred over the whole page when present.
+    """
+
+    def __init__(self, backend: str = "auto", readability: bool = False):
+        if backend == "auto":
+            backend = available_backends()[0]
+        if backend not in _BACKENDS:
+            raise ValueError(f"Unknown HTML parser backend: {backend}")
+        if not _BACKENDS[backend][0]:
+            raise ValueError(f"HTML parser backend {backend} is not installed")
+        self.backend = backend
+        self.readability = readability
+        self._extract = _BACKENDS[backend][1]
+        logger.info(f"Using {backend} HTML parser (readability={readability})")
+
+    def extract(self, html: str) -> ExtractedPage:
+        return self._extract(html, self.readability)
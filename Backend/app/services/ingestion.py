@@ -0,0 +1,264 @@
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Iterator, Optional, Set
+import multiprocessing
+import queue
+import threading
+import logging
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import SessionLocal
+from ..models.document import IngestionJob
+from .registry import get_rag_service, get_tabular_service
+from .document_chunks import ChunkBatch, stream_chunk_batches
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "extracting", "embedding")
+
+def _finish_job(db: Session, job: IngestionJob) -> str:
+    job.status = "completed"
+    if job.chunks_total is None:
+        job.chunks_total = job.chunks_done
+    job.finished_at = datetime.utcnow()
+    db.commit()
+    logger.info(f"Ingestion job {job.id} completed for document {job.document_id}")
+    return job.status
+
+def _load_table(job_id: int) -> None:
+    """Load a spreadsheet job into its SQLite database inside a worker process"""
+    # Register every mapped class so relationships resolve in a fresh process
+    from ..models import user, chat, query, document  # noqa: F401
+
+    db = SessionLocal()
+    try:
+        job = db.get(IngestionJob, job_id)
+        document = job.document
+
+        def on_progress(stage: str, chunks_done: int, chunks_total: Optional[int]):
+            job.status = stage
+            job.chunks_done = chunks_done
+            if chunks_total is not None:
+                job.chunks_total = chunks_total
+            db.commit()
+
+        get_tabular_service().load_document(
+            document_id=document.id,
+            file_path=document.file_path,
+            file_type=document.file_type,
+            progress_callback=on_progress
+        )
+    finally:
+        db.close()
+
+class IngestionService:
+    """Queues document ingestion and tracks it in the database.
+
+    Jobs are driven from threads of the API process. Extraction, chunking
+    and embedding run in a spawned process pool, but Chroma's persistent
+    client is not safe to share between processes, so the workers never
+    open the vector store: they stream batches of chunks and embeddings
+    back through a bounded queue and the API process writes them.
+    Spreadsheets answered with SQL don't touch Chroma and are loaded
+    entirely in a worker.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or settings.INGESTION_WORKERS
+        self._jobs: Optional[ThreadPoolExecutor] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _get_jobs(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._jobs is None:
+                self._closed = False
+                self._jobs = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingestion")
+            return self._jobs
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn keeps Chroma/PyTorch threads of the API process out of the workers
+                context = multiprocessing.get_context("spawn")
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+                if self._manager is None:
+                    self._manager = context.Manager()
+            return self._executor
+
+    def _reset_executor(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+
+    def _stream_batches(self, document, namespace: str, file_hash: str, existing_ids: Set[str]) -> Iterator[ChunkBatch]:
+        """Yield the batches a worker process extracts and embeds for ``document``"""
+        executor = self._get_executor()
+        batches = self._manager.Queue(maxsize=4)
+        stop = self._manager.Event()
+        future = executor.submit(
+            stream_chunk_batches, batches, stop, document.id, namespace,
+            document.file_path, document.file_type, file_hash, existing_ids
+        )
+        try:
+            while True:
+                try:
+                    kind, payload = batches.get(timeout=1)
+                except queue.Empty:
+                    if future.done():
+                        try:
+                            future.result()
+                        except BrokenProcessPool:
+                            self._reset_executor(executor)
+                            raise
+                        raise RuntimeError("Ingestion worker exited without finishing the document")
+                    continue
+                if kind == "batch":
+                    yield payload
+                elif kind == "error":
+                    raise RuntimeError(payload)
+                else:
+                    return
+        finally:
+            # Lets the worker give up when the write side fails first
+            stop.set()
+
+    def _run_job(self, job_id: int) -> str:
+        """Run a single ingestion job"""
+        db = SessionLocal()
+        try:
+            job = db.get(IngestionJob, job_id)
+            if job is None:
+                logger.warning(f"Ingestion job {job_id} no longer exists")
+                return "missing"
+
+            document = job.document
+            job.attempts += 1
+            job.status = "extracting"
+            job.error = None
+            job.started_at = datetime.utcnow()
+            job.finished_at = None
+            db.commit()
+
+            def on_progress(stage: str, chunks_done: int, chunks_total: Optional[int]):
+                job.status = stage
+                job.chunks_done = chunks_done
+                if chunks_total is not None:
+                    job.chunks_total = chunks_total
+                db.commit()
+
+            from .tabular import uses_sql
+            if uses_sql(document.file_type):
+                # Spreadsheets are loaded into SQLite and answered with SQL; no embeddings
+                executor = self._get_executor()
+                try:
+                    executor.submit(_load_table, job_id).result()
+                except BrokenProcessPool:
+                    self._reset_executor(executor)
+                    raise
+                # The worker reported progress through its own session
+                db.refresh(job)
+                return _finish_job(db, job)
+
+            # Chunk ids are content-derived, so a retry after an interrupted run
+            # reuses whatever that run already embedded
+            stats = get_rag_service().process_document(
+                document_id=document.id,
+                file_path=document.file_path,
+                file_type=document.file_type,
+                progress_callback=on_progress,
+                chunk_batches=lambda namespace, file_hash, existing_ids: self._stream_batches(
+                    document, namespace, file_hash, existing_ids
+                )
+            )
+            job.chunks_reused = stats['chunks_reused']
+            return _finish_job(db, job)
+
+        except Exception as e:
+            db.rollback()
+            if self._closed:
+                # Left in its active status so the next start resumes it
+                logger.info(f"Ingestion job {job_id} interrupted by shutdown")
+                return "interrupted"
+            logger.error(f"Ingestion job {job_id} failed: {str(e)}")
+            try:
+                job = db.get(IngestionJob, job_id)
+                if job is not None:
+                    job.status = "failed"
+                    job.error = str(e)
+                    job.finished_at = datetime.utcnow()
+                    db.commit()
+            except Exception as inner:
+                db.rollback()
+                logger.error(f"Could not record failure for ingestion job {job_id}: {str(inner)}")
+            return "failed"
+        finally:
+            db.close()
+
+    def _on_job_done(self, job_id: int, future: Future) -> None:
+        try:
+            logger.info(f"Ingestion job {job_id} finished with status {future.result()}")
+        except Exception as e:
+            logger.error(f"Ingestion job {job_id} crashed: {str(e)}")
+
+    def submit(self, job_id: int) -> None:
+        """Hand an existing job to the worker pool"""
+        future = self._get_jobs().submit(self._run_job, job_id)
+        future.add_done_callback(lambda f: self._on_job_done(job_id, f))
+
+    def enqueue(self, db: Session, document_id: int) -> IngestionJob:
+        """Create a queued job for a document and start processing it"""
+        job = IngestionJob(document_id=document_id, status="queued")
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self.submit(job.id)
+        logger.info(f"Queued ingestion job {job.id} for document {document_id}")
+        return job
+
+    def get_latest_job(self, db: Session, document_id: int) -> Optional[IngestionJob]:
+        return (
+            db.query(IngestionJob)
+            .filter(IngestionJob.document_id == document_id)
+            .order_by(IngestionJob.id.desc())
+            .first()
+        )
+
+    def resume_pending_jobs(self) -> int:
+        """Resubmit jobs that were queued or running when the server stopped"""
+        db = SessionLocal()
+        try:
+            pending = (
+                db.query(IngestionJob)
+                .filter(IngestionJob.status.in_(ACTIVE_STATUSES))
+                .order_by(IngestionJob.id)
+                .all()
+            )
+            for job in pending:
+                job.status = "queued"
+            db.commit()
+            for job in pending:
+                self.submit(job.id)
+            if pending:
+                logger.info(f"Resumed {len(pending)} pending ingestion jobs")
+            return len(pending)
+        finally:
+            db.close()
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            self._closed = True
+            if self._jobs is not None:
+                self._jobs.shutdown(wait=False, cancel_futures=True)
+                self._jobs = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
@@ -0,0 +1,345 @@
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from array import array
+from collections import Counter, defaultdict
+from functools import lru_cache
+import threading
+import sqlite3
+import math
+import os
+import re
+import logging
+from ..config import settings
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Words plus identifiers joined by - . / _ such as "AB-1234" or "v2.3.1"
+_TOKEN_RE = re.compile(r"\w+(?:[-./]\w+)*")
+_PART_RE = re.compile(r"[^\W_]+")
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms of a text.
+
+    Compound identifiers are kept whole and also split into their parts, so
+    "AB-1234" matches a query for "ab-1234" as well as one for "1234".
+    """
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        terms.append(token)
+        parts = _PART_RE.findall(token)
+        if len(parts) > 1 or (parts and parts[0] != token):
+            terms.extend(parts)
+    return terms
+
+class BM25Index:
+    """On-disk BM25 inverted index over the chunks of one collection.
+
+    Each term has one posting row holding three packed arrays: chunk
+    ordinals (uint32, ascending), term frequencies (uint16) and chunk lengths
+    (uint32), so scoring a query is one primary-key lookup per query term
+    with no per-chunk reads. Chunks are added and removed incrementally by
+    their Chroma id; only the ids of the final top-k are looked up. The
+    index is a SQLite file so ingestion workers and the API process share it.
+    """
+
+    _BATCH = 500  # keep IN (...) lists under SQLite's variable limit
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                ordinal INTEGER PRIMARY KEY AUTOINCREMENT,
+                chunk_id TEXT NOT NULL UNIQUE,
+                length INTEGER NOT NULL,
+                terms TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT PRIMARY KEY,
+                ordinals BLOB NOT NULL,
+                freqs BLOB NOT NULL,
+                lengths BLOB NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS stats (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                chunks INTEGER NOT NULL,
+                total_length INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO stats (id, chunks, total_length) VALUES (0, 0, 0);
+        """)
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _unpack(typecode: str, blob: bytes) -> array:
+        values = array(typecode)
+        values.frombytes(blob)
+        return values
+
+    def _posting(self, conn: sqlite3.Connection, term: str) -> Optional[Tuple[array, array, array]]:
+        row = conn.execute(
+            "SELECT ordinals, freqs, lengths FROM postings WHERE term = ?", (term,)
+        ).fetchone()
+        if row is None:
+            return None
+        return self._unpack("I", row[0]), self._unpack("H", row[1]), self._unpack("I", row[2])
+
+    def _write_posting(self, conn: sqlite3.Connection, term: str, ordinals: array, freqs: array, lengths: array) -> None:
+        if not ordinals:
+            conn.execute("DELETE FROM postings WHERE term = ?", (term,))
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO postings (term, ordinals, freqs, lengths) VALUES (?, ?, ?, ?)",
+            (term, ordinals.tobytes(), freqs.tobytes(), lengths.tobytes())
+        )
+
+    def _existing(self, conn: sqlite3.Connection, chunk_ids: Sequence[str]) -> Dict[str, Tuple[int, str]]:
+        """Map of stored chunk id -> (ordinal, space-joined distinct terms)"""
+        found = {}
+        for i in range(0, len(chunk_ids), self._BATCH):
+            batch = list(chunk_ids[i:i + self._BATCH])
+            placeholders = ",".join("?" * len(batch))
+            for chunk_id, ordinal, terms in conn.execute(
+                f"SELECT chunk_id, ordinal, terms FROM chunks WHERE chunk_id IN ({placeholders})", batch
+            ):
+                found[chunk_id] = (ordinal, terms)
+        return found
+
+    def add(self, chunk_ids: Sequence[str], texts: Sequence[str]) -> int:
+        """Index chunks; ids that are already indexed are skipped. Returns how many were added."""
+        if not chunk_ids:
+            return 0
+        conn = self._connection()
+        try:
+            existing = self._existing(conn, chunk_ids)
+            new_postings: Dict[str, List[Tuple[int, int, int]]] = defaultdict(list)
+            added = total_length = 0
+            for chunk_id, text in zip(chunk_ids, texts):
+                if chunk_id in existing:
+                    continue
+                counts = Counter(tokenize(text))
+                length = sum(counts.values())
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO chunks (chunk_id, length, terms) VALUES (?, ?, ?)",
+                    (chunk_id, length, " ".join(counts))
+                )
+                if not cursor.rowcount:
+                    continue  # indexed by another writer since we looked
+                ordinal = cursor.lastrowid
+                existing[chunk_id] = (ordinal, "")
+                for term, freq in counts.items():
+                    new_postings[term].append((ordinal, min(freq, 0xFFFF), length))
+                added += 1
+                total_length += length
+
+            # Ordinals only grow, so appending keeps every posting list sorted
+            for term, entries in new_postings.items():
+                posting = self._posting(conn, term) or (array("I"), array("H"), array("I"))
+                ordinals, freqs, lengths = posting
+                for ordinal, freq, length in entries:
+                    ordinals.append(ordinal)
+                    freqs.append(freq)
+                    lengths.append(length)
+                self._write_posting(conn, term, ordinals, freqs, lengths)
+
+            conn.execute(
+                "UPDATE stats SET chunks = chunks + ?, total_length = total_length + ? WHERE id = 0",
+                (added, total_length)
+            )
+            conn.commit()
+            return added
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+    def remove(self, chunk_ids: Sequence[str]) -> int:
+        """Drop chunks from the index. Returns how many were removed."""
+        if not chunk_ids:
+            return 0
+        conn = self._connection()
+        try:
+            existing = self._existing(conn, chunk_ids)
+            if not existing:
+                return 0
+            removed_ordinals = {ordinal for ordinal, _ in existing.values()}
+            terms = set()
+            for _, chunk_terms in existing.values():
+                terms.update(chunk_terms.split())
+
+            for term in terms:
+                posting = self._posting(conn, term)
+                if posting is None:
+                    continue
+                ordinals, freqs, lengths = posting
+                keep = [i for i, ordinal in enumerate(ordinals) if ordinal not in removed_ordinals]
+                self._write_posting(
+                    conn, term,
+                    array("I", (ordinals[i] for i in keep)),
+                    array("H", (freqs[i] for i in keep)),
+                    array("I", (lengths[i] for i in keep))
+                )
+
+            total_length = 0
+            ordinals = sorted(removed_ordinals)
+            for i in range(0, len(ordinals), self._BATCH):
+                batch = ordinals[i:i + self._BATCH]
+                placeholders = ",".join("?" * len(batch))
+                total_length += conn.execute(
+                    f"SELECT COALESCE(SUM(length), 0) FROM chunks WHERE ordinal IN ({placeholders})", batch
+                ).fetchone()[0]
+                conn.execute(f"DELETE FROM chunks WHERE ordinal IN ({placeholders})", batch)
+            conn.execute(
+                "UPDATE stats SET chunks = chunks - ?, total_length = total_length - ? WHERE id = 0",
+                (len(ordinals), total_length)
+            )
+            conn.commit()
+            return len(ordinals)
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT chunks FROM stats WHERE id = 0").fetchone()[0]
+
+    def search(self, query: str, n_results: int = 10) -> List[Tuple[str, float]]:
+        """Top chunks for a query as (chunk_id, BM25 score), best first"""
+        conn = self._connection()
+        chunks, total_length = conn.execute("SELECT chunks, total_length FROM stats WHERE id = 0").fetchone()
+        if not chunks:
+            return []
+        average_length = total_length / chunks or 1.0
+
+        scores: Dict[int, float] = defaultdict(float)
+        k1, b = self.k1, self.b
+        for term in set(tokenize(query)):
+            posting = self._posting(conn, term)
+            if posting is None:
+                continue
+            ordinals, freqs, lengths = posting
+            df = len(ordinals)
+            idf = math.log(1 + (chunks - df + 0.5) / (df + 0.5))
+            norm = k1 * (1 - b)
+            slope = k1 * b / average_length
+            for ordinal, freq, length in zip(ordinals, freqs, lengths):
+                scores[ordinal] += idf * freq * (k1 + 1) / (freq + norm + slope * length)
+        if not scores:
+            return []
+
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n_results]
+        placeholders = ",".join("?" * len(top))
+        ids = dict(conn.execute(
+            f"SELECT ordinal, chunk_id FROM chunks WHERE ordinal IN ({placeholders})",
+            [ordinal for ordinal, _ in top]
+        ).fetchall())
+        return [(ids[ordinal], score) for ordinal, score in top if ordinal in ids]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+class LexicalIndexStore:
+    """One BM25Index file per collection under a directory"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+        self._indexes: Dict[str, BM25Index] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, collection_name: str) -> str:
+        return os.path.join(self.directory, f"{collection_name}.bm25")
+
+    def get(self, collection_name: str) -> BM25Index:
+        with self._lock:
+            index = self._indexes.get(collection_name)
+            if index is None:
+                index = self._indexes[collection_name] = BM25Index(self._path(collection_name))
+            return index
+
+    def exists(self, collection_name: str) -> bool:
+        return collection_name in self._indexes or os.path.exists(self._path(collection_name))
+
+    def delete(self, collection_name: str) -> None:
+        with self._lock:
+            index = self._indexes.pop(collection_name, None)
+        if index is not None:
+            index.close()
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(self._path(collection_name) + suffix)
+            except FileNotFoundError:
+                pass
+
+def index_collection(index: BM25Index, collection, where: Optional[Dict] = None, batch_size: int = 1000) -> int:
+    """Add every chunk already stored in a Chroma collection to a BM25 index"""
+    added = offset = 0
+    while True:
+        items = collection.get(where=where, include=["documents"], limit=batch_size, offset=offset)
+        if not items["ids"]:
+            break
+        added += index.add(items["ids"], items["documents"])
+        offset += len(items["ids"])
+    return added
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Merge ranked id lists by summing 1 / (k + rank); best first"""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+def fuse_results(dense: Dict, lexical: List[Tuple[str, float]], fetch: Callable[[List[str]], Dict],
+                 n_results: int, k: int = 60) -> Dict:
+    """Fuse Chroma query results with BM25 hits, keeping Chroma's result shape.
+
+    ``fetch(ids)`` returns a Chroma ``get`` result with documents and
+    metadatas for hits that only the lexical search found; their distance
+    is None.
+    """
+    dense_ids = dense["ids"][0]
+    fused = [chunk_id for chunk_id, _ in reciprocal_rank_fusion(
+        [dense_ids, [chunk_id for chunk_id, _ in lexical]], k=k
+    )][:n_results]
+
+    by_id = {}
+    distances = (dense.get("distances") or [[None] * len(dense_ids)])[0]
+    for chunk_id, text, metadata, distance in zip(dense_ids, dense["documents"][0], dense["metadatas"][0], distances):
+        by_id[chunk_id] = (text, metadata, distance)
+    missing = [chunk_id for chunk_id in fused if chunk_id not in by_id]
+    if missing:
+        items = fetch(missing)
+        for chunk_id, text, metadata in zip(items["ids"], items["documents"], items["metadatas"]):
+            by_id[chunk_id] = (text, metadata, None)
+
+    fused = [chunk_id for chunk_id in fused if chunk_id in by_id]
+    return {
+        "ids": [fused],
+        "documents": [[by_id[chunk_id][0] for chunk_id in fused]],
+        "metadatas": [[by_id[chunk_id][1] for chunk_id in fused]],
+        "distances": [[by_id[chunk_id][2] for chunk_id in fused]],
+    }
+
+@lru_cache()
+def get_lexical_index_store() -> Optional[LexicalIndexStore]:
+    if not settings.HYBRID_SEARCH_ENABLED:
+        return None
+    return LexicalIndexStore(settings.LEXICAL_INDEX_DIR)
@@ -0,0 +1,344 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+import asyncio
+import random
+import threading
+import queue
+import time
+import json
+import logging
+import httpx
+from ..config import settings
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class LLMError(Exception):
+    """The LLM API failed, returned an error or missed the request deadline"""
+
+@dataclass
+class LLMMessage:
+    content: str
+
+class LLMGateway:
+    """One shared async client for an OpenAI-compatible chat completions API.
+
+    Every LLM call in the process goes through a single ``httpx.AsyncClient``
+    (HTTP/2 when ``h2`` is installed, keep-alive HTTP/1.1 otherwise), so
+    connections and TLS sessions are reused instead of set up per call. At
+    most ``max_concurrency`` calls are in flight; 429 and 5xx responses and
+    transport errors are retried with full-jitter exponential backoff
+    (honouring Retry-After), but never past the call's deadline.
+
+    The client runs on its own event loop thread. Async code awaits
+    ``acomplete``/``astream``; the synchronous services, which run on the
+    I/O pool, call ``complete``/``stream`` and block only their own thread.
+    """
+
+    def __init__(self, base_url: str, api_key: str, max_concurrency: int = 16, max_connections: int = 32,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 timeout: float = 60.0, http2: bool = True):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.http2 = http2
+        self._http2 = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._start_lock = threading.Lock()
+
+        # Counters
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._in_flight = 0
+        self._retries = 0
+        self._failures = 0
+        self._deadline_exceeded = 0
+        self._latency_seconds = 0.0
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                http2 = self.http2
+                if http2:
+                    try:
+                        import h2  # noqa: F401
+                    except ImportError:
+                        logger.info("h2 is not installed; LLM gateway uses keep-alive HTTP/1.1")
+                        http2 = False
+                loop = asyncio.new_event_loop()
+                self._client = httpx.AsyncClient(
+                    base_url=self.base_url,
+                    headers={"Authorization": f"Bearer {self.api_key}"},
+                    http2=http2,
+                    timeout=self.timeout,
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections
+                    )
+                )
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._http2 = http2
+                threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    def _payload(self, messages: List[Dict[str, str]], model: str, temperature: float,
+                 max_tokens: Optional[int], stream: bool) -> Dict[str, Any]:
+        payload = {"model": model, "messages": messages, "temperature": temperature, "stream": stream}
+        if max_tokens:
+            payload["max_tokens"] = max_tokens
+        return payload
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _open(self, payload: Dict[str, Any], deadline: float) -> httpx.Response:
+        """Send a request and return the open response, retrying transient failures"""
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            retry_after = None
+            try:
+                request = self._client.build_request(
+                    "POST", "/chat/completions", json=payload, timeout=httpx.Timeout(remaining)
+                )
+                response = await self._client.send(request, stream=True)
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code < 400:
+                    return response
+                body = (await response.aread()).decode(errors="replace")[:300]
+                await response.aclose()
+                error = f"HTTP {response.status_code}: {body}"
+                if response.status_code not in RETRY_STATUSES:
+                    raise LLMError(error)
+                retry_after = response.headers.get("Retry-After")
+
+            delay = self._backoff(attempt, retry_after)
+            if time.monotonic() + delay >= deadline:
+                with self._stats_lock:
+                    self._deadline_exceeded += 1
+                raise LLMError(f"LLM request deadline exceeded after {attempt + 1} attempts: {error}")
+            if attempt == self.max_retries:
+                raise LLMError(f"LLM request failed after {attempt + 1} attempts: {error}")
+            logger.warning(f"LLM request failed ({error}); retrying in {delay:.2f}s")
+            with self._stats_lock:
+                self._retries += 1
+            await asyncio.sleep(delay)
+
+        with self._stats_lock:
+            self._deadline_exceeded += 1
+        raise LLMError("LLM request deadline exceeded")
+
+    async def _complete(self, payload: Dict[str, Any], deadline: float) -> str:
+        async with self._semaphore:
+            response = await self._open(payload, deadline)
+            try:
+                body = await response.aread()
+            except httpx.TransportError as e:
+                raise LLMError(f"{type(e).__name__}: {e}")
+            finally:
+                await response.aclose()
+        return json.loads(body)["choices"][0]["message"]["content"]
+
+    async def _stream(self, payload: Dict[str, Any], deadline: float) -> AsyncIterator[str]:
+        async with self._semaphore:
+            response = await self._open(payload, deadline)
+            try:
+                lines = response.aiter_lines()
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        with self._stats_lock:
+                            self._deadline_exceeded += 1
+                        raise LLMError("LLM request deadline exceeded while streaming")
+                    try:
+                        line = await asyncio.wait_for(lines.__anext__(), remaining)
+                    except StopAsyncIteration:
+                        return
+                    except asyncio.TimeoutError:
+                        continue
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        return
+                    delta = json.loads(data)["choices"][0].get("delta", {})
+                    if delta.get("content"):
+                        yield delta["content"]
+            finally:
+                await response.aclose()
+
+    async def _tracked(self, coroutine):
+        started = time.perf_counter()
+        with self._stats_lock:
+            self._requests += 1
+            self._in_flight += 1
+        try:
+            return await coroutine
+        except Exception:
+            with self._stats_lock:
+                self._failures += 1
+            raise
+        finally:
+            with self._stats_lock:
+                self._in_flight -= 1
+                self._latency_seconds += time.perf_counter() - started
+
+    def _deadline(self, timeout: Optional[float]) -> float:
+        return time.monotonic() + (timeout or self.timeout)
+
+    async def acomplete(self, messages: List[Dict[str, str]], model: str, temperature: float = 0.3,
+                        max_tokens: Optional[int] = None, timeout: Optional[float] = None) -> str:
+        """Chat completion text; ``timeout`` is the deadline in seconds for the whole call, retries included"""
+        return await asyncio.wrap_future(self._submit(messages, model, temperature, max_tokens, timeout))
+
+    async def astream(self, messages: List[Dict[str, str]], model: str, temperature: float = 0.3,
+                      max_tokens: Optional[int] = None, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Like ``acomplete``, but yields content tokens as they arrive"""
+        tokens: asyncio.Queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        future = self._submit_stream(
+            messages, model, temperature, max_tokens, timeout,
+            lambda item: loop.call_soon_threadsafe(tokens.put_nowait, item)
+        )
+        try:
+            while True:
+                kind, value = await tokens.get()
+                if kind == "token":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    return
+        finally:
+            future.cancel()
+
+    def _submit(self, messages, model, temperature, max_tokens, timeout):
+        """Run a completion on the gateway loop; returns a concurrent future"""
+        loop = self._start()
+        payload = self._payload(messages, model, temperature, max_tokens, stream=False)
+        return asyncio.run_coroutine_threadsafe(self._tracked(self._complete(payload, self._deadline(timeout))), loop)
+
+    def _submit_stream(self, messages, model, temperature, max_tokens, timeout, emit):
+        """Run a streaming call on the gateway loop, passing ("token" | "error" | "done", value) to ``emit``"""
+        loop = self._start()
+        payload = self._payload(messages, model, temperature, max_tokens, stream=True)
+
+        async def pump():
+            async def consume():
+                async for token in self._stream(payload, self._deadline(timeout)):
+                    emit(("token", token))
+            try:
+                await self._tracked(consume())
+            except Exception as e:
+                emit(("error", e if isinstance(e, LLMError) else LLMError(str(e))))
+            else:
+                emit(("done", None))
+
+        return asyncio.run_coroutine_threadsafe(pump(), loop)
+
+    def complete(self, messages: List[Dict[str, str]], model: str, temperature: float = 0.3,
+                 max_tokens: Optional[int] = None, timeout: Optional[float] = None) -> str:
+        """Blocking ``acomplete`` for synchronous callers; never call it on an event loop"""
+        return self._submit(messages, model, temperature, max_tokens, timeout).result()
+
+    def stream(self, messages: List[Dict[str, str]], model: str, temperature: float = 0.3,
+               max_tokens: Optional[int] = None, timeout: Optional[float] = None) -> Iterator[str]:
+        """Blocking ``astream`` for synchronous callers; closing the iterator cancels the call"""
+        tokens: queue.Queue = queue.Queue()
+        future = self._submit_stream(messages, model, temperature, max_tokens, timeout, tokens.put)
+        try:
+            while True:
+                kind, value = tokens.get()
+                if kind == "token":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    return
+        finally:
+            future.cancel()
+
+    def chat_model(self, model: str, temperature: float = 0.3, max_tokens: Optional[int] = None) -> "GatewayChatModel":
+        return GatewayChatModel(self, model, temperature, max_tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "base_url": self.base_url,
+                "http2": self._http2,
+                "max_concurrency": self.max_concurrency,
+                "requests": self._requests,
+                "in_flight": self._in_flight,
+                "retries": self._retries,
+                "failures": self._failures,
+                "deadline_exceeded": self._deadline_exceeded,
+                "avg_latency_ms": self._latency_seconds * 1000 / self._requests if self._requests else 0.0,
+            }
+
+    def close(self) -> None:
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+class GatewayChatModel:
+    """Chat model bound to one model name, with the ``invoke``/``stream`` interface of LangChain chat models.
+
+    The RAG services accept any object with this interface as ``llm``, so a
+    LangChain model can still be passed in instead.
+    """
+
+    def __init__(self, gateway: LLMGateway, model: str, temperature: float = 0.3, max_tokens: Optional[int] = None):
+        self.gateway = gateway
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+
+    def _messages(self, prompt: str) -> List[Dict[str, str]]:
+        return [{"role": "user", "content": prompt}]
+
+    def invoke(self, prompt: str, timeout: Optional[float] = None) -> LLMMessage:
+        return LLMMessage(self.gateway.complete(
+            self._messages(prompt), self.model, self.temperature, self.max_tokens, timeout
+        ))
+
+    def stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[LLMMessage]:
+        for token in self.gateway.stream(self._messages(prompt), self.model, self.temperature, self.max_tokens, timeout):
+            yield LLMMessage(token)
+
+@lru_cache()
+def get_llm_gateway() -> LLMGateway:
+    return LLMGateway(
+        base_url=settings.LLM_API_BASE,
+        api_key=settings.GROQ_API_KEY,
+        max_concurrency=settings.LLM_MAX_CONCURRENCY,
+        max_connections=settings.LLM_MAX_CONNECTIONS,
+        max_retries=settings.LLM_MAX_RETRIES,
+        backoff_base=settings.LLM_BACKOFF_BASE_SECONDS,
+        backoff_max=settings.LLM_BACKOFF_MAX_SECONDS,
+        timeout=settings.LLM_TIMEOUT_SECONDS,
+        http2=settings.LLM_HTTP2
+    )
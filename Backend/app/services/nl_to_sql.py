@@ -1,45 +1,108 @@
 # app/services/nl_to_sql.py
 import sqlite3
-from typing import Tuple, List, Dict, Any
-import requests
+from pathlib import Path
+from typing import Tuple, List, Dict, Any, Optional
 import re
 import logging
 from app.config import settings
+from app.services.llm import get_llm_gateway
+from app.services.sql_schema import SchemaSnapshot, get_schema_cache
+from app.services.sql_retrieval import get_schema_retriever
 
-class NLToSQLService:
-    def __init__(self):
-        self.db_path = "Chinook.db"
-        self.api_url = "https://api.groq.com/openai/v1/chat/completions"
-        self.api_key = settings.GROQ_API_KEY
-        self.model = "llama-3.3-70b-versatile"
-        
-    def get_table_schema(self) -> str:
-        """Get the database schema information."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get tables and their columns
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = cursor.fetchall()
-        
-        schema_info = []
-        for table in tables:
-            table_name = table[0]
-            cursor.execute(f"PRAGMA table_info({table_name});")
-            columns = cursor.fetchall()
-            
-            columns_info = [f"{col[1]} ({col[2]})" for col in columns]
-            schema_info.append(f"Table {table_name}:\n" + "\n".join(columns_info))
-        
-        # Add some example queries to help guide the model
-        schema_info.append("""
+CHINOOK_EXAMPLES = """
 Example Queries:
 1. Count albums by artist: SELECT COUNT(a.AlbumId) as album_count FROM Album a JOIN Artist ar ON a.ArtistId = ar.ArtistId WHERE ar.Name = 'Artist Name';
 2. Find tracks by artist: SELECT t.Name FROM Track t JOIN Album a ON t.AlbumId = a.AlbumId JOIN Artist ar ON a.ArtistId = ar.ArtistId WHERE ar.Name = 'Artist Name';
-""")
+"""
+
+CHINOOK_EXAMPLE_QUERY = """Example: For the query "number of albums by AC/DC", the correct SQL is:
+SELECT COUNT(a.AlbumId) as album_count FROM Album a JOIN Artist ar ON a.ArtistId = ar.ArtistId WHERE ar.Name = 'AC/DC';"""
+
+class NLToSQLService:
+    """Answers natural language questions by generating and running SQLite queries.
+
+    Defaults to the Chinook sample database with its example queries;
+    pass ``db_path`` (and usually ``examples=False``) to query another
+    database such as an uploaded spreadsheet. Generated queries are run on
+    a read-only connection. Databases with more than
+    ``SQL_SCHEMA_SUBSET_MIN_TABLES`` tables are prompted with only the tables
+    the schema retriever selects for each question; ``schema_subset`` forces
+    either mode.
+    """
+
+    # Part of the request coalescing key; bump it when the prompt changes
+    PROMPT_VERSION = 4
+
+    def __init__(self, db_path: Optional[str] = None, examples: bool = True, schema_subset: Optional[bool] = None):
+        self.db_path = db_path or "Chinook.db"
+        self.examples = examples
+        self.schema_subset = schema_subset
+        self.llm = get_llm_gateway()
+        self.schema_cache = get_schema_cache()
+        self.schema_retriever = get_schema_retriever()
+        self.model = "llama-3.3-70b-versatile"
+        
+    def get_table_schema(self, tables: Optional[List[str]] = None) -> str:
+        """Get the database schema information.
+
+        Tables with their columns, foreign keys, row counts and sample text
+        values, from the shared schema cache; the full schema text is
+        rendered once per schema version rather than on every request, and
+        a subset is joined from the per-table blocks.
+        """
+        snapshot = self.schema_cache.get(self.db_path)
+        
+        def render() -> str:
+            schema_info = snapshot.render(tables)
+            # Add some example queries to help guide the model
+            if self.examples:
+                schema_info += "\n\n" + CHINOOK_EXAMPLES
+            return schema_info
+        
+        if tables is not None:
+            return render()
+        return snapshot.memo(("schema", self.examples), render)
+    
+    def select_tables(self, snapshot: SchemaSnapshot, natural_query: str) -> Optional[List[str]]:
+        """Tables to put in the prompt for this question, or None for the whole schema"""
+        subset = self.schema_subset
+        if subset is None:
+            subset = len(snapshot.tables) > settings.SQL_SCHEMA_SUBSET_MIN_TABLES
+        if not subset or self.schema_retriever is None:
+            return None
+        tables = self.schema_retriever.select(snapshot, natural_query)
+        logging.info(f"Prompting with {len(tables)} of {len(snapshot.tables)} tables: {', '.join(tables)}")
+        return tables
+    
+    def build_sql_prompt(self, natural_query: str) -> str:
+        """Prompt asking the model for SQL; with the whole schema, everything before the question is precomputed"""
+        snapshot = self.schema_cache.get(self.db_path)
+        tables = self.select_tables(snapshot, natural_query)
+        
+        def render_prefix() -> str:
+            example_query = CHINOOK_EXAMPLE_QUERY if self.examples else ""
+            return f"""You are an SQL expert. Convert this natural language query to a valid SQLite query using this schema:
+
+{self.get_table_schema(tables)}
+
+{example_query}
+
+"""
         
-        conn.close()
-        return "\n\n".join(schema_info)
+        if tables is None:
+            prefix = snapshot.memo(("sql_prompt", self.examples), render_prefix)
+        else:
+            prefix = render_prefix()
+        return prefix + f"""Query to convert: "{natural_query}"
+
+Rules:
+1. Use single quotes for string literals
+2. Always close string literals with a quote
+3. Include proper table aliases in joins
+4. End the query with a semicolon
+5. Return only the SQL query, no explanations
+
+Return the SQL query:"""
     
     def fix_quotes(self, query: str) -> str:
         """Ensure all string literals are properly quoted."""
@@ -81,42 +144,43 @@ Example Queries:
         logging.debug(f"Cleaned query: {query}")
         return query
 
-    def generate_natural_response(self, natural_query: str, results: List[Dict[str, Any]]) -> str:
-        """Generate a natural language response from the query results."""
+    def generate_natural_response(self, natural_query: str, results: List[Dict[str, Any]],
+                                  total_rows: Optional[int] = None) -> str:
+        """Generate a natural language response from the query results.
+
+        ``total_rows`` larger than ``len(results)`` means the results were
+        truncated; the model is told so and given the real row count.
+        """
+        truncated = total_rows is not None and total_rows > len(results)
+        if truncated:
+            results_label = f"Query results (first {len(results)} of {total_rows} rows)"
+            truncation_rule = f"\n6. The query returned {total_rows} rows but only the first {len(results)} are shown: state the total and don't present the shown rows as complete"
+        else:
+            results_label = "Query results"
+            truncation_rule = ""
         prompt = f"""Convert these database query results into a natural language response.
 
 Original question: "{natural_query}"
 
-Query results: {results}
+{results_label}: {results}
 
 Rules:
 1. Respond in a conversational, helpful tone
 2. Include specific numbers and details from the results
 3. Format any lists or enumerations naturally
 4. Keep the response concise but informative
-5. Return only the natural language response, no additional explanations
+5. Return only the natural language response, no additional explanations{truncation_rule}
 
 Generate the response:"""
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": "You are a helpful assistant that converts database query results into natural language responses."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7  # Slightly higher temperature for more natural responses
-        }
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant that converts database query results into natural language responses."},
+            {"role": "user", "content": prompt}
+        ]
         
         try:
-            response = requests.post(self.api_url, headers=headers, json=data)
-            response.raise_for_status()
-            
-            natural_response = response.json()["choices"][0]["message"]["content"].strip()
+            # Slightly higher temperature for more natural responses
+            natural_response = self.llm.complete(messages, self.model, temperature=0.7).strip()
             logging.info(f"Generated natural response: {natural_response}")
             
             return natural_response
@@ -125,69 +189,55 @@ Generate the response:"""
             logging.error(f"Error in generate_natural_response: {str(e)}")
             raise
     
+    def execute_query(self, sql_query: str) -> Tuple[List[Dict[str, Any]], int]:
+        """Run a query read-only; return at most ``SQL_RESULT_MAX_ROWS`` rows and the total row count"""
+        conn = sqlite3.connect(Path(self.db_path).absolute().as_uri() + "?mode=ro", uri=True)
+        try:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(sql_query)
+            results = [dict(row) for row in cursor.fetchmany(settings.SQL_RESULT_MAX_ROWS)]
+            # Count the rest without holding it in memory
+            total_rows = len(results) + sum(1 for _ in cursor)
+            return results, total_rows
+        finally:
+            conn.close()
+
     def generate_sql_query(self, natural_query: str) -> Tuple[str, List[Dict[str, Any]], str]:
         """Convert natural language to SQL query using Groq API and return natural language response."""
-        schema = self.get_table_schema()
-        
-        example_query = """Example: For the query "number of albums by AC/DC", the correct SQL is:
-SELECT COUNT(a.AlbumId) as album_count FROM Album a JOIN Artist ar ON a.ArtistId = ar.ArtistId WHERE ar.Name = 'AC/DC';"""
-        
-        prompt = f"""You are an SQL expert. Convert this natural language query to a valid SQLite query using this schema:
+        sql_query, results, _, natural_response = self.answer(natural_query)
+        return sql_query, results, natural_response
 
-{schema}
+    def answer(self, natural_query: str) -> Tuple[str, List[Dict[str, Any]], int, str]:
+        """Like ``generate_sql_query``, plus the total row count of the query.
 
-{example_query}
-
-Query to convert: "{natural_query}"
+        Results are capped at ``SQL_RESULT_MAX_ROWS`` rows so a broad query
+        on a large table neither fills memory nor overflows the prompt.
+        """
+        prompt = self.build_sql_prompt(natural_query)
 
-Rules:
-1. Use single quotes for string literals
-2. Always close string literals with a quote
-3. Include proper table aliases in joins
-4. End the query with a semicolon
-5. Return only the SQL query, no explanations
-
-Return the SQL query:"""
-
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": "You are an SQL expert. Return only valid SQLite queries with proper string quoting and table joins."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.1
-        }
+        messages = [
+            {"role": "system", "content": "You are an SQL expert. Return only valid SQLite queries with proper string quoting and table joins."},
+            {"role": "user", "content": prompt}
+        ]
         
         try:
-            response = requests.post(self.api_url, headers=headers, json=data)
-            response.raise_for_status()
-            
-            sql_query = response.json()["choices"][0]["message"]["content"].strip()
+            sql_query = self.llm.complete(messages, self.model, temperature=0.1).strip()
             sql_query = self.clean_sql_query(sql_query)
             
             logging.info(f"Generated SQL query: {sql_query}")
             
             # Execute the query
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute(sql_query)
-            results = [dict(row) for row in cursor.fetchall()]
-            
-            conn.close()
+            results, total_rows = self.execute_query(sql_query)
+            if total_rows > len(results):
+                logging.info(f"Query returned {total_rows} rows; answering from the first {len(results)}")
 
             # Generate natural language response
-            natural_response = self.generate_natural_response(natural_query, results)
+            natural_response = self.generate_natural_response(natural_query, results, total_rows)
             
-            return sql_query, results, natural_response
+            return sql_query, results, total_rows, natural_response
             # return sql_query,natural_response
             
         except Exception as e:
-            logging.error(f"Error in generate_sql_query: {str(e)}")
+            logging.error(f"Error in answer: {str(e)}")
             raise
\ No newline at end of file
@@ -0,0 +1,77 @@
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from typing import Iterator, List, Tuple
+import multiprocessing
+import os
+import logging
+import PyPDF2
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Reader reused by all shards a worker process extracts from the same file,
+# so the cross-reference table is parsed once per worker instead of per shard
+_worker_reader = None
+
+def _get_worker_reader(file_path: str) -> PyPDF2.PdfReader:
+    global _worker_reader
+    key = (file_path, os.stat(file_path).st_mtime_ns)
+    if _worker_reader is None or _worker_reader[0] != key:
+        if _worker_reader is not None:
+            _worker_reader[1].close()
+        file = open(file_path, 'rb')
+        _worker_reader = (key, file, PyPDF2.PdfReader(file))
+    return _worker_reader[2]
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Text of pages [start, stop) as (1-based page number, text); runs in a worker"""
+    pdf_reader = _get_worker_reader(file_path)
+    return [
+        (index + 1, pdf_reader.pages[index].extract_text() or "")
+        for index in range(start, stop)
+    ]
+
+def iter_pdf_pages(file_path: str, workers: int = 0, pages_per_shard: int = 16,
+                   parallel_min_pages: int = 64) -> Iterator[Tuple[int, str]]:
+    """Yield ``(page_number, text)`` for every page of a PDF, in order.
+
+    Small documents are read serially one page at a time. Documents with at
+    least ``parallel_min_pages`` pages are split into shards of
+    ``pages_per_shard`` pages that are extracted by a process pool; only
+    ``2 * workers`` shards are in flight at once, so memory stays bounded to
+    that window of pages however long the document is.
+    """
+    workers = workers or os.cpu_count() or 1
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        total_pages = len(pdf_reader.pages)
+
+        if workers <= 1 or total_pages < parallel_min_pages:
+            for index, page in enumerate(pdf_reader.pages):
+                yield index + 1, page.extract_text() or ""
+            return
+
+    shards = [
+        (start, min(start + pages_per_shard, total_pages))
+        for start in range(0, total_pages, pages_per_shard)
+    ]
+    workers = min(workers, len(shards))
+    logger.info(f"Extracting {total_pages} PDF pages in {len(shards)} shards on {workers} processes")
+
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+    try:
+        pending = deque()
+        next_shard = 0
+        while next_shard < len(shards) or pending:
+            while next_shard < len(shards) and len(pending) < 2 * workers:
+                start, stop = shards[next_shard]
+                pending.append(executor.submit(_extract_page_range, file_path, start, stop))
+                next_shard += 1
+            # Shards are consumed in submission order, so pages come out in order
+            yield from pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
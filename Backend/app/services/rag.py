@@ -1,58 +1,59 @@
-from typing import Optional, List, Dict
-import PyPDF2
-import pandas as pd
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_groq import ChatGroq
-from ..config import Settings
+from typing import Optional, List, Dict, Any, Callable, Iterable, Set, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from ..config import settings
+from .embedding import SentenceTransformerEmbedding, get_embedding_engine
+from .cache import get_retrieval_cache
+from .answer_cache import get_answer_cache
+from .retrieval import RAGResponse, RAGStream
+from .document_chunks import ChunkBatch, calculate_file_hash, iter_chunk_batches, make_text_splitter
+from .lexical import get_lexical_index_store, index_collection, fuse_results
+from .rerank import get_reranker
+from .llm import get_llm_gateway
+from .executors import get_cpu_executor
 import chromadb
 import shutil
 import os
-import uuid
 import logging
 import hashlib
-from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+import heapq
+import time
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class SentenceTransformerEmbedding(EmbeddingFunction):
-    _instance = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance.model = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2",
-                model_kwargs={'device': 'cpu'}
-            )
-        return cls._instance
-
-    def __call__(self, input: Documents) -> Embeddings:
-        if not input:
-            return []
-        return self.model.embed_documents(input)
+# per_document keeps one Chroma collection per document; shared stores every
+# document in one collection and filters queries on the document_id metadata
+VECTOR_STORE_LAYOUTS = ("per_document", "shared")
+SHARED_COLLECTION_NAME = "documents"
 
 class RAGService:
-    def __init__(self, persist_directory: str = "chroma_db"):
+    # Part of the request coalescing key; bump it when the prompt changes
+    PROMPT_VERSION = 1
+
+    def __init__(self, persist_directory: str = "chroma_db", llm=None, layout: Optional[str] = None):
         self.persist_directory = persist_directory
         os.makedirs(self.persist_directory, exist_ok=True)
         self.collection_name_template = "doc_{document_id}"
+        self.layout = layout or settings.VECTOR_STORE_LAYOUT
+        if self.layout not in VECTOR_STORE_LAYOUTS:
+            raise ValueError(f"Unknown vector store layout: {self.layout}")
+        self.manifest_directory = os.path.join(self.persist_directory, "manifests")
+        os.makedirs(self.manifest_directory, exist_ok=True)
+        self._shared_collection = None
         
         # Initialize components
-        self.embedding_function = SentenceTransformerEmbedding()
-        self.llm = ChatGroq(
-            temperature=0.3,
-            model_name="llama3-70b-8192",  # Updated model name
-            groq_api_key=Settings().GROQ_API_KEY,
-            max_tokens=1024
-        )
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=500,
-            chunk_overlap=50,
-            separators=["\n\n", "\n", ".", " ", ""]
-        )
+        self.embedding_engine = get_embedding_engine()
+        self.embedding_function = SentenceTransformerEmbedding(self.embedding_engine)
+        self.retrieval_cache = get_retrieval_cache()
+        self.answer_cache = get_answer_cache()
+        self.lexical_store = get_lexical_index_store()
+        self.reranker = get_reranker()
+        # Answers are built on the I/O pool; embedding and reranking run on the CPU pool
+        self.cpu_pool = get_cpu_executor()
+        self.llm = llm or get_llm_gateway().chat_model("llama3-70b-8192", temperature=0.3, max_tokens=1024)
+        self.text_splitter = make_text_splitter()
         
         # Initialize ChromaDB client
         try:
@@ -66,15 +67,76 @@ class RAGService:
             raise
 
     def _collection_name(self, document_id: int) -> str:
+        """Per-document namespace for chunk ids and caches, whatever the layout"""
         return self.collection_name_template.format(document_id=document_id)
+
+    def _collection(self, document_id: int, create: bool = False):
+        """Chroma collection that holds a document's chunks"""
+        if self.layout == "shared":
+            if self._shared_collection is None:
+                self._shared_collection = self.chroma_client.get_or_create_collection(
+                    name=SHARED_COLLECTION_NAME,
+                    embedding_function=self.embedding_function
+                )
+            return self._shared_collection
+        get = self.chroma_client.get_or_create_collection if create else self.chroma_client.get_collection
+        return get(name=self._collection_name(document_id), embedding_function=self.embedding_function)
+
+    def _where(self, document_id: int) -> Optional[Dict[str, int]]:
+        """Metadata filter selecting a document's chunks in its collection"""
+        return {'document_id': document_id} if self.layout == "shared" else None
+
+    def _lexical_index(self, document_id: int):
+        """BM25 index of a document, built from its stored chunks on first use"""
+        collection_name = self._collection_name(document_id)
+        if not self.lexical_store.exists(collection_name):
+            index_collection(
+                self.lexical_store.get(collection_name),
+                self._collection(document_id),
+                where=self._where(document_id)
+            )
+        return self.lexical_store.get(collection_name)
+
+    def _manifest_path(self, document_id: int) -> str:
+        return os.path.join(self.manifest_directory, f"{self._collection_name(document_id)}.sha256")
+
+    def _completed_hash(self, document_id: int) -> Optional[str]:
+        """File hash of the last run that finished for this document"""
+        try:
+            with open(self._manifest_path(document_id)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _set_completed_hash(self, document_id: int, file_hash: Optional[str]) -> None:
+        path = self._manifest_path(document_id)
+        if file_hash is None:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(file_hash)
+        os.replace(tmp_path, path)
     
+    def _legacy_file_hash(self, collection) -> Optional[str]:
+        """File hash of a collection indexed before manifests existed.
+
+        Those chunks carry only ``file_hash`` in their metadata. Chunks
+        written since also carry ``document_id`` and may come from an
+        interrupted run, so their hash is never trusted.
+        """
+        metadatas = collection.peek(1)['metadatas']
+        metadata = (metadatas[0] if metadatas else None) or {}
+        if 'document_id' in metadata:
+            return None
+        return metadata.get('file_hash') or None
+
     def _calculate_file_hash(self, file_path: str) -> str:
         """Calculate SHA-256 hash of file contents"""
-        hash_sha256 = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_sha256.update(chunk)
-        return hash_sha256.hexdigest()
+        return calculate_file_hash(file_path)
     
     def _load_existing_collections(self):
             """Load existing collections from ChromaDB"""
@@ -108,133 +170,487 @@ class RAGService:
                 logger.error(f"Failed to load collections: {str(e)}")
                 raise
     
-    def process_document(self, document_id: int, file_path: str, file_type: str) -> None:
+    def process_document(self, document_id: int, file_path: str, file_type: str,
+                         progress_callback: Optional[Callable[[str, int, Optional[int]], None]] = None,
+                         chunk_batches: Optional[Callable[[str, str, Set[str]], Iterable[ChunkBatch]]] = None) -> Dict[str, int]:
+        """Extract, chunk and embed a document into its collection.
+
+        Chunk ids are derived from chunk content (see ``chunk_id_factory``),
+        so re-processing a changed file only embeds chunks that are new,
+        refreshes the metadata of chunks that are still present and deletes
+        the ones that disappeared. ``progress_callback`` is called as
+        ``(stage, chunks_done, chunks_total)``. Returns chunk counts:
+        ``chunks_total``, ``chunks_added``, ``chunks_reused`` and
+        ``chunks_removed``.
+
+        ``chunk_batches(namespace, file_hash, existing_ids)`` supplies the
+        chunks and embeddings when they are computed elsewhere, e.g. in an
+        ingestion worker process (see ``stream_chunk_batches``); by default
+        they are computed here. Either way all writes to the vector store
+        happen in this process, as Chroma's persistent client must not be
+        shared between processes.
+        """
+        def report(stage: str, done: int = 0, total: Optional[int] = None):
+            if progress_callback:
+                progress_callback(stage, done, total)
+
+        collection_name = self._collection_name(document_id)
+        previous_hash = None
         try:
             current_hash = self._calculate_file_hash(file_path)
-            collection_name = self._collection_name(document_id)
 
-            # Check existing collection directly in ChromaDB
-            try:
-                collection = self.chroma_client.get_collection(collection_name)
-                existing_hash = collection.peek(1)['metadatas'][0].get('file_hash', '')
-                if existing_hash == current_hash:
-                    logger.info(f"Document {document_id} unchanged")
-                    return
-                self.chroma_client.delete_collection(collection_name)
-            except Exception as e:
-                logger.info(f"Creating new collection for document {document_id}")
+            # The file hash is recorded in the manifest only once a run
+            # completes, so an interrupted run is never mistaken for a finished one
+            collection = self._collection(document_id, create=True)
+            previous_hash = self._completed_hash(document_id)
+            if previous_hash is None and self.layout == "per_document":
+                previous_hash = self._legacy_file_hash(collection)
+            existing_ids = set(collection.get(where=self._where(document_id), include=[])['ids'])
+            lexical_index = self.lexical_store.get(collection_name) if self.lexical_store else None
+            if previous_hash == current_hash:
+                logger.info(f"Document {document_id} unchanged")
+                count = len(existing_ids)
+                if lexical_index and lexical_index.count() < count:
+                    # Indexed before hybrid search was enabled
+                    index_collection(lexical_index, collection, where=self._where(document_id))
+                return {'chunks_total': count, 'chunks_added': 0, 'chunks_reused': count, 'chunks_removed': 0}
+
+            if existing_ids:
+                logger.info(f"Re-processing document {document_id} against {len(existing_ids)} stored chunks")
+                self._set_completed_hash(document_id, None)
 
             # Process document
-            text = self._extract_text(file_path, file_type)
-            chunks = self.text_splitter.split_text(text)
-            
-            # Create new collection
-            collection = self.chroma_client.get_or_create_collection(
-                name=collection_name,
-                embedding_function=self.embedding_function
-            )
+            report("extracting")
 
-            # Add documents with metadata
-            batch_size = 100
-            for i in range(0, len(chunks), batch_size):
-                batch_chunks = chunks[i:i + batch_size]
-                batch_ids = [str(uuid.uuid4()) for _ in batch_chunks]
-                batch_metadata = [{'file_hash': current_hash} for _ in batch_chunks]
-                
-                collection.add(
-                    documents=batch_chunks,
-                    ids=batch_ids,
-                    metadatas=batch_metadata
+            # Batches arrive as pages are extracted and embedded, so only one
+            # batch is held in memory at a time
+            if chunk_batches is None:
+                batches = iter_chunk_batches(
+                    document_id, collection_name, file_path, file_type, current_hash,
+                    existing_ids, self.embedding_engine, self.text_splitter
                 )
+            else:
+                batches = chunk_batches(collection_name, current_hash, existing_ids)
+            seen_ids = set()
+            added = reused = 0
+            for batch in batches:
+                seen_ids.update(batch.ids)
+                if batch.embeddings is not None:
+                    collection.upsert(
+                        ids=batch.ids,
+                        documents=batch.chunks,
+                        embeddings=batch.embeddings,
+                        metadatas=batch.metadatas
+                    )
+                    added += len(batch.ids)
+                else:
+                    # Page numbers and row ranges may have shifted; no re-embedding needed
+                    collection.update(ids=batch.ids, metadatas=batch.metadatas)
+                    reused += len(batch.ids)
+                if lexical_index:
+                    lexical_index.add(batch.ids, batch.chunks)
+                report("embedding", added + reused, None)
+
+            removed = [chunk_id for chunk_id in existing_ids if chunk_id not in seen_ids]
+            max_batch = self.chroma_client.get_max_batch_size()
+            for start in range(0, len(removed), max_batch):
+                collection.delete(ids=removed[start:start + max_batch])
+            if lexical_index:
+                lexical_index.remove(removed)
 
-            logger.info(f"Processed document {document_id} with {len(chunks)} chunks")
+            self._set_completed_hash(document_id, current_hash)
+            total = added + reused
+            report("embedding", total, total)
+
+            self.retrieval_cache.invalidate(collection_name)
+            logger.info(
+                f"Processed document {document_id} with {total} chunks: "
+                f"{added} embedded, {reused} reused, {len(removed)} removed"
+            )
+            return {
+                'chunks_total': total,
+                'chunks_added': added,
+                'chunks_reused': reused,
+                'chunks_removed': len(removed)
+            }
 
         except Exception as e:
             logger.error(f"Document processing failed: {str(e)}")
-            self.cleanup_document(document_id)
+            if not previous_hash:
+                # Nothing usable was stored before this run
+                self.cleanup_document(document_id)
+            else:
+                # Keep the chunks written so far; the retry diffs against them
+                self.retrieval_cache.invalidate(collection_name)
             raise
 
-    
-    def get_response(self, document_id: int, query: str) -> str:
-        try:
-            collection_name = self._collection_name(document_id)
-            
+    def _prepare_answer(self, document_id: int, query: str) -> Union[RAGResponse, Tuple[str, Callable[[str], None]]]:
+        """Retrieve context for a query.
+
+        Returns a finished RAGResponse when no LLM call is needed (missing
+        document, nothing relevant, semantic cache hit); otherwise the prompt
+        and a callback that records the generated answer.
+        """
+        collection_name = self._collection_name(document_id)
+        n_results = settings.DOCUMENT_TOP_K
+        # The reranker picks n_results out of a wider list, and with hybrid
+        # search each retriever contributes its own candidates to that list
+        n_rerank = max(n_results, settings.RERANK_CANDIDATES) if self.reranker else n_results
+        n_candidates = max(n_rerank, settings.HYBRID_CANDIDATES) if self.lexical_store else n_rerank
+        
+        # Embedded at most once, and only if the search or the answer cache needs it
+        embed_query = lru_cache(maxsize=None)(partial(self.cpu_pool.call, self.embedding_engine.embed_query, query))
+        
+        cache_version = self.retrieval_cache.version(collection_name)
+        results = self.retrieval_cache.get(collection_name, query, n_candidates)
+        if results is None:
             try:
-                collection = self.chroma_client.get_collection(
-                    name=collection_name,
-                    embedding_function=self.embedding_function
-                )
+                collection = self._collection(document_id)
             except Exception as e:
                 logger.error(f"Collection {collection_name} not found: {str(e)}")
-                return "Document not found in the database"
+                return RAGResponse("Document not found in the database")
 
             results = collection.query(
-                query_texts=[query],
-                n_results=3
+                query_embeddings=[embed_query()],
+                n_results=n_candidates,
+                where=self._where(document_id)
             )
-            
-            if not results['documents'][0]:
-                return "No relevant information found in the document."
-            
-            context = "\n".join(results['documents'][0])
-            prompt = f"""Context information:
+            self.retrieval_cache.set(collection_name, query, n_candidates, results, cache_version)
+        
+        if self.lexical_store:
+            results = fuse_results(
+                results,
+                self._lexical_index(document_id).search(query, n_candidates),
+                lambda ids: self._collection(document_id).get(ids=ids, include=["documents", "metadatas"]),
+                n_rerank,
+                k=settings.RRF_K
+            )
+        if self.reranker:
+            results = self.cpu_pool.call(self.reranker.rerank_results, query, results, n_results)
+        
+        if not results['documents'][0]:
+            return RAGResponse("No relevant information found in the document.")
+        
+        chunk_ids = results['ids'][0]
+        if self.answer_cache:
+            cached_answer = self.answer_cache.lookup(collection_name, chunk_ids, embed_query())
+            if cached_answer is not None:
+                return RAGResponse(cached_answer, cached=True)
+        
+        context = "\n".join(results['documents'][0])
+        prompt = f"""Context information:
 {context}
 
 Question: {query}
 
 Provide a concise answer based on the context. If unsure, say you don't know."""
+        
+        def record(answer: str) -> None:
+            if self.answer_cache and answer:
+                self.answer_cache.store(collection_name, chunk_ids, query, embed_query(), answer)
+        
+        return prompt, record
+    
+    def get_response(self, document_id: int, query: str) -> RAGResponse:
+        try:
+            prepared = self._prepare_answer(document_id, query)
+            if isinstance(prepared, RAGResponse):
+                return prepared
             
+            prompt, record = prepared
             response = self.llm.invoke(prompt)
-            return response.content.strip()
+            answer = response.content.strip()
+            record(answer)
+            return RAGResponse(answer)
 
         except Exception as e:
             logger.error(f"Response generation failed: {str(e)}")
-            return "An error occurred while processing your request."
+            return RAGResponse("An error occurred while processing your request.")
     
-    def cleanup_document(self, document_id: int) -> None:
+    def stream_response(self, document_id: int, query: str) -> RAGStream:
+        """Like get_response, but yields the answer token by token"""
         try:
-            collection_name = self._collection_name(document_id)
-            self.chroma_client.delete_collection(collection_name)
-            logger.info(f"Cleaned up document {document_id}")
+            prepared = self._prepare_answer(document_id, query)
         except Exception as e:
-            logger.error(f"Cleanup failed: {str(e)}")
+            logger.error(f"Response generation failed: {str(e)}")
+            return RAGStream.from_response(RAGResponse("An error occurred while processing your request."))
+        if isinstance(prepared, RAGResponse):
+            return RAGStream.from_response(prepared)
+        
+        prompt, record = prepared
+        tokens = (chunk.content for chunk in self.llm.stream(prompt))
+        return RAGStream(tokens, on_complete=record)
+    
+    def _search_documents(self, document_ids: List[int], query: str, query_embedding: List[float],
+                          n_results: int) -> List[Dict[str, Any]]:
+        """Best chunks across several documents, ranked as for a single document.
 
-    def _extract_text(self, file_path: str, file_type: str) -> str:
-        """Extract text from supported file types"""
-        try:
-            if file_type == 'pdf':
-                return self._extract_from_pdf(file_path)
-            elif file_type in ['csv', 'xlsx', 'xls']:
-                return self._extract_from_spreadsheet(file_path, file_type)
+        The shared layout answers the dense search with a single query
+        filtered on ``document_id``; the per-document layout queries every
+        collection in parallel with the same query embedding, and the
+        closest candidates overall are kept. As in ``_prepare_answer``, the
+        BM25 hits of every document are then fused in with RRF and the
+        reranker picks the final ``n_results``. Documents without a
+        collection are skipped.
+        """
+        n_rerank = max(n_results, settings.RERANK_CANDIDATES) if self.reranker else n_results
+        n_candidates = max(n_rerank, settings.HYBRID_CANDIDATES) if self.lexical_store else n_rerank
+        workers = max(1, min(len(document_ids), settings.MULTI_DOCUMENT_SEARCH_WORKERS))
+
+        def search(document_id: int) -> Optional[Dict]:
+            collection_name = self._collection_name(document_id)
+            cache_version = self.retrieval_cache.version(collection_name)
+            results = self.retrieval_cache.get(collection_name, query, n_candidates)
+            if results is None:
+                try:
+                    collection = self._collection(document_id)
+                except Exception:
+                    return None
+                results = collection.query(query_embeddings=[query_embedding], n_results=n_candidates)
+                self.retrieval_cache.set(collection_name, query, n_candidates, results, cache_version)
+            return results
+
+        def search_lexical(document_id: int) -> List[Tuple[str, float]]:
+            try:
+                return self._lexical_index(document_id).search(query, n_candidates)
+            except Exception:
+                return []
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            if self.layout == "shared":
+                results = self._collection(document_ids[0]).query(
+                    query_embeddings=[query_embedding],
+                    n_results=n_candidates,
+                    where={'document_id': {'$in': list(document_ids)}}
+                )
+                searched = [(None, results)]
             else:
-                raise ValueError(f"Unsupported file type: {file_type}")
-        except Exception as e:
-            logger.error(f"Text extraction failed: {str(e)}")
-            raise
+                searched = list(zip(document_ids, executor.map(search, document_ids)))
+            lexical = list(zip(document_ids, executor.map(search_lexical, document_ids))) if self.lexical_store else []
+
+        owners: Dict[str, int] = {}
+        candidates = []
+        for document_id, results in searched:
+            if not results or not results['ids'][0]:
+                continue
+            for chunk_id, text, metadata, distance in zip(
+                results['ids'][0], results['documents'][0], results['metadatas'][0], results['distances'][0]
+            ):
+                owners[chunk_id] = (metadata or {}).get('document_id', document_id)
+                candidates.append((distance, chunk_id, text, metadata))
+        candidates = heapq.nsmallest(n_candidates, candidates, key=lambda candidate: candidate[0])
+        results = {
+            'ids': [[chunk_id for _, chunk_id, _, _ in candidates]],
+            'documents': [[text for _, _, text, _ in candidates]],
+            'metadatas': [[metadata for _, _, _, metadata in candidates]],
+            'distances': [[distance for distance, _, _, _ in candidates]],
+        }
+
+        if lexical:
+            lexical_hits = []
+            for document_id, hits in lexical:
+                for chunk_id, score in hits:
+                    owners.setdefault(chunk_id, document_id)
+                    lexical_hits.append((chunk_id, score))
+            # Scores of separate indexes are only roughly comparable; RRF below uses the ranks
+            lexical_hits = heapq.nlargest(n_candidates, lexical_hits, key=lambda hit: hit[1])
+
+            def fetch(ids: List[str]) -> Dict[str, List]:
+                fetched = {'ids': [], 'documents': [], 'metadatas': []}
+                for document_id in sorted({owners[chunk_id] for chunk_id in ids}):
+                    items = self._collection(document_id).get(
+                        ids=[chunk_id for chunk_id in ids if owners[chunk_id] == document_id],
+                        include=["documents", "metadatas"]
+                    )
+                    for key in fetched:
+                        fetched[key].extend(items[key])
+                return fetched
+
+            results = fuse_results(results, lexical_hits, fetch, n_rerank, k=settings.RRF_K)
+        if self.reranker:
+            results = self.cpu_pool.call(self.reranker.rerank_results, query, results, n_results)
+
+        hits = []
+        for chunk_id, text, metadata, distance in zip(
+            results['ids'][0], results['documents'][0], results['metadatas'][0], results['distances'][0]
+        ):
+            metadata = metadata or {}
+            hits.append({
+                'document_id': metadata.get('document_id', owners.get(chunk_id)),
+                'chunk_id': chunk_id,
+                'text': text,
+                'distance': distance,
+                **{key: value for key, value in metadata.items() if key not in ('document_id', 'file_hash')}
+            })
+        return hits[:n_results]
+
+    def _prepare_multi_document_answer(self, document_ids: List[int], query: str,
+                                       n_results: int = 5) -> Tuple[RAGResponse, Optional[str], Optional[Callable[[str], None]]]:
+        """Retrieve context for a query across several documents.
+
+        Returns the response filled with chunks, distances, per-chunk sources
+        and timings. When no LLM call is needed (nothing relevant, semantic
+        cache hit) it already carries the answer and the prompt is None.
+        """
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+        query_embedding = self.cpu_pool.call(self.embedding_engine.embed_query, query)
+        timings['embed_ms'] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        hits = self._search_documents(sorted(set(document_ids)), query, query_embedding, n_results)
+        timings['search_ms'] = (time.perf_counter() - started) * 1000
+
+        response = RAGResponse(
+            answer="",
+            chunks=[hit['text'] for hit in hits],
+            distances=[hit['distance'] for hit in hits],
+            sources=[{key: value for key, value in hit.items() if key != 'text'} for hit in hits],
+            timings=timings
+        )
+        if not hits:
+            response.answer = "No relevant information found in the documents."
+            return response, None, None
+
+        # Answers are cached per set of documents searched
+        cache_key = "docs_" + hashlib.sha256(
+            ",".join(str(document_id) for document_id in sorted(set(document_ids))).encode()
+        ).hexdigest()[:16]
+        chunk_ids = [hit['chunk_id'] for hit in hits]
+        if self.answer_cache:
+            cached_answer = self.answer_cache.lookup(cache_key, chunk_ids, query_embedding)
+            if cached_answer is not None:
+                response.answer = cached_answer
+                response.cached = True
+                return response, None, None
+
+        context = "\n\n".join(
+            f"[Document {hit['document_id']}" + (f", page {hit['page']}" if 'page' in hit else "") + f"]\n{hit['text']}"
+            for hit in hits
+        )
+        prompt = f"""Context information from several documents:
+{context}
+
+Question: {query}
 
+Provide a concise answer based on the context and mention which documents it comes from. If unsure, say you don't know."""
 
-    def _extract_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF files"""
-        text = []
+        def record(answer: str) -> None:
+            if self.answer_cache and answer:
+                self.answer_cache.store(cache_key, chunk_ids, query, query_embedding, answer)
+
+        return response, prompt, record
+
+    def get_multi_document_response(self, document_ids: List[int], query: str) -> RAGResponse:
+        """Answer a query from several documents with one query embedding.
+
+        ``sources`` lists every context chunk nearest first with its
+        ``document_id``, ``chunk_id``, ``distance`` and location metadata.
+        """
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text() or ""
-                    text.append(page_text)
-            return "\n".join(text)
+            response, prompt, record = self._prepare_multi_document_answer(document_ids, query)
+            if prompt is None:
+                return response
+
+            started = time.perf_counter()
+            llm_response = self.llm.invoke(prompt)
+            response.timings['llm_ms'] = (time.perf_counter() - started) * 1000
+            response.answer = llm_response.content.strip()
+            record(response.answer)
+            return response
+
         except Exception as e:
-            logger.error(f"PDF extraction failed: {str(e)}")
-            raise
+            logger.error(f"Multi-document response generation failed: {str(e)}")
+            return RAGResponse("An error occurred while processing your request.")
 
-    def _extract_from_spreadsheet(self, file_path: str, file_type: str) -> str:
-        """Extract text from spreadsheet files"""
+    def stream_multi_document_response(self, document_ids: List[int], query: str) -> RAGStream:
+        """Like get_multi_document_response, but yields the answer token by token"""
         try:
-            if file_type == 'csv':
-                df = pd.read_csv(file_path)
+            response, prompt, record = self._prepare_multi_document_answer(document_ids, query)
+        except Exception as e:
+            logger.error(f"Multi-document response generation failed: {str(e)}")
+            return RAGStream.from_response(RAGResponse("An error occurred while processing your request."))
+        if prompt is None:
+            return RAGStream.from_response(response)
+
+        tokens = (chunk.content for chunk in self.llm.stream(prompt))
+        return RAGStream(tokens, response, on_complete=record)
+
+    def cleanup_document(self, document_id: int) -> None:
+        try:
+            collection_name = self._collection_name(document_id)
+            self.retrieval_cache.invalidate(collection_name)
+            if self.answer_cache:
+                self.answer_cache.invalidate(collection_name)
+            self._set_completed_hash(document_id, None)
+            if self.lexical_store:
+                self.lexical_store.delete(collection_name)
+            if self.layout == "shared":
+                self._collection(document_id).delete(where=self._where(document_id))
             else:
-                df = pd.read_excel(file_path)
-            return df.to_string(index=False)
+                self.chroma_client.delete_collection(collection_name)
+            logger.info(f"Cleaned up document {document_id}")
         except Exception as e:
-            logger.error(f"Spreadsheet extraction failed: {str(e)}")
-            raise
\ No newline at end of file
+            logger.error(f"Cleanup failed: {str(e)}")
+
+    def migrate_to_shared_layout(self, batch_size: int = 1000, keep_source: bool = False,
+                                 progress_callback: Optional[Callable[[int, int, int], None]] = None) -> Dict[str, int]:
+        """Copy every ``doc_<id>`` collection into the shared collection.
+
+        Embeddings and chunk ids are copied as they are, with ``document_id``
+        added to each chunk's metadata, so nothing is re-embedded and
+        incremental re-ingestion keeps working. Source collections are deleted
+        once copied unless ``keep_source`` is set; running it again resumes
+        with the collections that are left. ``progress_callback`` receives
+        ``(document_id, collections_done, collections_total)``.
+        """
+        if self.layout != "shared":
+            raise ValueError("Migration target must be a RAGService with the shared layout")
+
+        names = [
+            collection if isinstance(collection, str) else collection.name
+            for collection in self.chroma_client.list_collections()
+        ]
+        document_ids = sorted(
+            int(name.split("_", 1)[1]) for name in names
+            if name.startswith("doc_") and name.split("_", 1)[1].isdigit()
+        )
+        target = self._collection(0)
+        batch_size = min(batch_size, self.chroma_client.get_max_batch_size())
+        chunks = 0
+
+        for done, document_id in enumerate(document_ids, start=1):
+            collection_name = self._collection_name(document_id)
+            source = self.chroma_client.get_collection(
+                name=collection_name,
+                embedding_function=self.embedding_function
+            )
+            offset = 0
+            while True:
+                items = source.get(
+                    include=["documents", "metadatas", "embeddings"],
+                    limit=batch_size,
+                    offset=offset
+                )
+                if not items['ids']:
+                    break
+                target.upsert(
+                    ids=items['ids'],
+                    documents=items['documents'],
+                    embeddings=items['embeddings'],
+                    metadatas=[{**(metadata or {}), 'document_id': document_id} for metadata in items['metadatas']]
+                )
+                chunks += len(items['ids'])
+                offset += len(items['ids'])
+
+            file_hash = self._legacy_file_hash(source)
+            if file_hash and self._completed_hash(document_id) is None:
+                self._set_completed_hash(document_id, file_hash)
+            if not keep_source:
+                self.chroma_client.delete_collection(collection_name)
+            self.retrieval_cache.invalidate(collection_name)
+            if progress_callback:
+                progress_callback(document_id, done, len(document_ids))
+
+        logger.info(f"Migrated {len(document_ids)} document collections with {chunks} chunks to the shared layout")
+        return {'documents': len(document_ids), 'chunks': chunks}
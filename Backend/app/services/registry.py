@@ -0,0 +1,131 @@
+from typing import Any, Callable, Dict, Iterable, Optional
+import threading
+import time
+import logging
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ServiceRegistry:
+    """Process-wide services built on first use.
+
+    Each service is registered with a factory that imports and constructs
+    it, so importing the API modules loads no models and opens no clients.
+    ``get`` builds an instance at most once per process even when several
+    requests ask for it concurrently; the ingestion worker processes get
+    their own instance the same way. ``warm_up`` builds services ahead of
+    the first request and runs their optional warm hooks (model loading).
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._warmers: Dict[str, Optional[Callable[[Any], None]]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._init_seconds: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any],
+                 warm: Optional[Callable[[Any], None]] = None) -> None:
+        with self._lock:
+            self._factories[name] = factory
+            self._warmers[name] = warm
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:
+                started = time.perf_counter()
+                instance = self._factories[name]()
+                self._init_seconds[name] = time.perf_counter() - started
+                self._instances[name] = instance
+                logger.info(f"Initialized {name} service in {self._init_seconds[name]:.2f}s")
+        return instance
+
+    def override(self, name: str, instance: Any) -> None:
+        """Replace a service instance, e.g. with a stub in tests"""
+        with self._locks[name]:
+            self._instances[name] = instance
+
+    def is_ready(self, name: str) -> bool:
+        return name in self._instances
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Build services and run their warm hooks; returns seconds per service"""
+        timings = {}
+        for name in names or list(self._factories):
+            started = time.perf_counter()
+            try:
+                instance = self.get(name)
+                warm = self._warmers.get(name)
+                if warm is not None:
+                    warm(instance)
+            except Exception as e:
+                logger.error(f"Warm-up of {name} service failed: {str(e)}")
+                continue
+            timings[name] = round(time.perf_counter() - started, 3)
+        logger.info(f"Warm-up finished: {timings}")
+        return timings
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "ready": name in self._instances,
+                "init_seconds": round(self._init_seconds[name], 3) if name in self._init_seconds else None,
+            }
+            for name in self._factories
+        }
+
+registry = ServiceRegistry()
+
+def _embedding_engine():
+    from .embedding import get_embedding_engine
+    return get_embedding_engine()
+
+def _rag_service():
+    from .rag import RAGService
+    return RAGService()
+
+def _web_rag_service():
+    from .web_rag import WebRAGService
+    return WebRAGService()
+
+def _tabular_service():
+    from .tabular import TabularService
+    return TabularService()
+
+def _nl_to_sql_service():
+    from .nl_to_sql import NLToSQLService
+    return NLToSQLService()
+
+def _load_models(service) -> None:
+    service.embedding_engine.model
+    if getattr(service, "reranker", None):
+        service.reranker.model
+
+registry.register("embedding", _embedding_engine, warm=lambda engine: engine.model)
+registry.register("rag", _rag_service, warm=_load_models)
+registry.register("web_rag", _web_rag_service, warm=_load_models)
+registry.register("tabular", _tabular_service)
+registry.register("nl_to_sql", _nl_to_sql_service)
+
+# FastAPI dependencies
+def get_embedding_engine():
+    return registry.get("embedding")
+
+def get_rag_service():
+    return registry.get("rag")
+
+def get_web_rag_service():
+    return registry.get("web_rag")
+
+def get_tabular_service():
+    return registry.get("tabular")
+
+def get_nl_to_sql_service():
+    return registry.get("nl_to_sql")
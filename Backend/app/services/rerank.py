@@ -0,0 +1,147 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from functools import lru_cache
+import threading
+import time
+import logging
+from ..config import settings
+from .cache import TTLCache, normalize_query
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def select_results(results: Dict, order: Sequence[int]) -> Dict:
+    """Chroma-shaped query results restricted to ``order`` (positions in the first query)"""
+    selected = {}
+    for key in ("ids", "documents", "metadatas", "distances"):
+        values = results.get(key)
+        if values is None:
+            continue
+        selected[key] = [[values[0][i] for i in order]]
+    return selected
+
+class CrossEncoderReranker:
+    """Rescore retrieved chunks against the question with a small cross-encoder.
+
+    Candidates are scored on CPU in batches of ``batch_size``. If scoring
+    the whole candidate list takes longer than ``budget_ms`` the remaining
+    batches are skipped and the retriever's order is kept for that request;
+    the scores already computed are cached, so a repeated question finishes
+    within budget. Scores are cached per (normalized question, chunk id),
+    and chunk ids change with chunk content, so a cached score never
+    outlives the text it was computed on.
+    """
+
+    def __init__(self, model_name: str, batch_size: int = 16, budget_ms: float = 150.0,
+                 score_cache: Optional[TTLCache] = None):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.budget = budget_ms / 1000.0
+        self.score_cache = score_cache
+        self._model = None
+        self._model_lock = threading.Lock()
+
+        # Counters
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._reranked = 0
+        self._over_budget = 0
+        self._pairs_scored = 0
+        self._busy_seconds = 0.0
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    logger.info(f"Loading reranking model {self.model_name}")
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    def rerank(self, query: str, chunk_ids: Sequence[str], texts: Sequence[str], n_results: int) -> Tuple[List[int], bool]:
+        """Positions of the best ``n_results`` candidates, best first.
+
+        The second value is False when the latency budget ran out and the
+        candidates' original order was kept.
+        """
+        fallback = list(range(min(n_results, len(chunk_ids))))
+        if len(chunk_ids) <= 1:
+            return fallback, True
+
+        # Loading the model is a one-off cost and is not charged to the budget
+        model = self.model
+        key_query = normalize_query(query)
+        scores: List[Optional[float]] = [None] * len(chunk_ids)
+        if self.score_cache is not None:
+            for i, chunk_id in enumerate(chunk_ids):
+                scores[i] = self.score_cache.get((key_query, chunk_id))
+        pending = [i for i, score in enumerate(scores) if score is None]
+
+        started = time.perf_counter()
+        scored = 0
+        for start in range(0, len(pending), self.batch_size):
+            if time.perf_counter() - started > self.budget:
+                break
+            batch = pending[start:start + self.batch_size]
+            batch_scores = model.predict(
+                [(query, texts[i]) for i in batch],
+                batch_size=self.batch_size,
+                show_progress_bar=False
+            )
+            for i, score in zip(batch, batch_scores):
+                scores[i] = float(score)
+                if self.score_cache is not None:
+                    self.score_cache.set((key_query, chunk_ids[i]), scores[i])
+            scored += len(batch)
+        elapsed = time.perf_counter() - started
+
+        # A batch that finished past the deadline still counts as over budget
+        within_budget = scored == len(pending) and elapsed <= self.budget
+        with self._stats_lock:
+            self._requests += 1
+            self._pairs_scored += scored
+            self._busy_seconds += elapsed
+            if within_budget:
+                self._reranked += 1
+            else:
+                self._over_budget += 1
+        if not within_budget:
+            logger.info(f"Rerank budget exceeded after {elapsed * 1000:.0f} ms; keeping retriever order")
+            return fallback, False
+
+        order = sorted(range(len(chunk_ids)), key=lambda i: scores[i], reverse=True)
+        return order[:n_results], True
+
+    def rerank_results(self, query: str, results: Dict, n_results: int) -> Dict:
+        """Rerank Chroma-shaped query results and keep the best ``n_results``"""
+        order, _ = self.rerank(query, results["ids"][0], results["documents"][0], n_results)
+        return select_results(results, order)
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            return {
+                "model_name": self.model_name,
+                "model_loaded": self._model is not None,
+                "budget_ms": self.budget * 1000,
+                "requests": self._requests,
+                "reranked": self._reranked,
+                "over_budget": self._over_budget,
+                "pairs_scored": self._pairs_scored,
+                "avg_ms": self._busy_seconds * 1000 / self._requests if self._requests else 0.0,
+                "score_cache": self.score_cache.stats() if self.score_cache is not None else None,
+            }
+
+@lru_cache()
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    if not settings.RERANK_ENABLED:
+        return None
+    return CrossEncoderReranker(
+        model_name=settings.RERANK_MODEL,
+        batch_size=settings.RERANK_BATCH_SIZE,
+        budget_ms=settings.RERANK_BUDGET_MS,
+        score_cache=TTLCache(
+            max_entries=settings.RERANK_CACHE_SIZE,
+            ttl_seconds=settings.RERANK_CACHE_TTL_SECONDS
+        )
+    )
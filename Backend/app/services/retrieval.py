@@ -0,0 +1,52 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+import time
+
+@dataclass
+class RAGResponse:
+    """Answer produced by a RAG service, with the context it was grounded on"""
+    answer: str
+    cached: bool = False
+    chunks: List[str] = field(default_factory=list)
+    distances: List[Optional[float]] = field(default_factory=list)  # None for chunks only BM25 found
+    sources: List[Dict[str, Any]] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)  # milliseconds per stage
+
+class RAGStream:
+    """Streamed answer produced by a RAG service.
+
+    Iterating yields answer tokens as they arrive; once the iterator is
+    exhausted ``response.answer`` holds the full text, ``response.timings``
+    includes the LLM time and ``on_complete`` has been called with the answer.
+    """
+
+    def __init__(self, tokens: Iterable[str], response: Optional[RAGResponse] = None,
+                 on_complete: Optional[Callable[[str], None]] = None):
+        self._tokens = tokens
+        self.response = response or RAGResponse("")
+        self.on_complete = on_complete
+
+    @classmethod
+    def from_response(cls, response: RAGResponse) -> "RAGStream":
+        return cls([response.answer], response)
+
+    @property
+    def answer(self) -> str:
+        return self.response.answer
+
+    @property
+    def cached(self) -> bool:
+        return self.response.cached
+
+    def __iter__(self) -> Iterator[str]:
+        parts = []
+        started = time.perf_counter()
+        for token in self._tokens:
+            if token:
+                parts.append(token)
+                yield token
+        self.response.answer = "".join(parts).strip()
+        if self.on_complete:
+            # Only streams that actually called the LLM carry a completion hook
+            self.response.timings["llm_ms"] = (time.perf_counter() - started) * 1000
+            self.on_complete(self.response.answer)
@@ -0,0 +1,134 @@
+from array import array
+from functools import lru_cache
+from operator import mul
+from typing import Dict, List, Optional, Set, Tuple
+import threading
+import math
+import re
+import logging
+from ..config import settings
+from .lexical import tokenize
+from .sql_schema import SchemaSnapshot, TableSchema
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_CAMEL_RE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+def _words(identifier: str) -> str:
+    """Identifier as lower-case words: InvoiceLine and invoice_line both become "invoice line" """
+    return _CAMEL_RE.sub(" ", identifier).replace("_", " ").lower()
+
+def _stem(term: str) -> str:
+    # Enough for "invoices" to match table "Invoice"
+    return term[:-1] if len(term) > 3 and term.endswith("s") else term
+
+def _normalized(vector: List[float]) -> array:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return array("f", (x / norm for x in vector))
+
+def describe(table: TableSchema) -> str:
+    """Text embedded for a table: its name, column names and sample values"""
+    columns = ", ".join(_words(column) for column, _ in table.columns)
+    text = f"{_words(table.name)}: {columns}"
+    samples = [value for values in table.samples.values() for value in values]
+    if samples:
+        text += "; e.g. " + ", ".join(samples)
+    return text
+
+class SchemaRetriever:
+    """Picks the tables of a large schema that a question is about.
+
+    Each table is described once by its name, column names and sample
+    values and embedded with the shared engine; its persistent cache keeps
+    the vectors across restarts, and the normalized vectors are memoized on
+    the schema snapshot, so the index is built once per schema version. A
+    question is embedded and tables are ranked by cosine similarity plus
+    ``name_weight`` times the share of their name terms it mentions. The
+    ``top_tables`` best are returned with the tables they reference or are
+    referenced by, best first, up to ``max_tables`` in schema order.
+    """
+
+    def __init__(self, top_tables: int = 5, max_tables: int = 15, name_weight: float = 0.3,
+                 embedding_engine=None):
+        self.top_tables = top_tables
+        self.max_tables = max(max_tables, top_tables)
+        self.name_weight = name_weight
+        self._embedding_engine = embedding_engine
+        self._lock = threading.Lock()
+        self._selections = 0
+        self._index_builds = 0
+        self._tables_total = 0
+        self._tables_selected = 0
+
+    @property
+    def embedding_engine(self):
+        if self._embedding_engine is None:
+            from .registry import get_embedding_engine
+            self._embedding_engine = get_embedding_engine()
+        return self._embedding_engine
+
+    def _index(self, snapshot: SchemaSnapshot) -> Tuple[List[str], List[array], List[Set[str]]]:
+        def build():
+            names = list(snapshot.tables)
+            vectors = self.embedding_engine.embed_documents([describe(snapshot.tables[name]) for name in names])
+            with self._lock:
+                self._index_builds += 1
+            logger.info(f"Indexed {len(names)} table descriptions for schema retrieval")
+            terms = [{_stem(term) for term in _words(name).split()} for name in names]
+            return names, [_normalized(vector) for vector in vectors], terms
+
+        return snapshot.memo(("table_index", self.embedding_engine.cache_key), build)
+
+    def _neighbours(self, snapshot: SchemaSnapshot) -> Dict[str, Set[str]]:
+        def build():
+            neighbours = {name: set() for name in snapshot.tables}
+            for table in snapshot.tables.values():
+                for _, target, _ in table.foreign_keys:
+                    if target in neighbours and target != table.name:
+                        neighbours[table.name].add(target)
+                        neighbours[target].add(table.name)
+            return neighbours
+
+        return snapshot.memo("table_neighbours", build)
+
+    def select(self, snapshot: SchemaSnapshot, question: str) -> List[str]:
+        names, vectors, name_terms = self._index(snapshot)
+        query = _normalized(self.embedding_engine.embed_query(question))
+        question_terms = {_stem(term) for term in tokenize(question)}
+        scores = {}
+        for name, vector, terms in zip(names, vectors, name_terms):
+            mentioned = len(terms & question_terms) / len(terms) if terms else 0.0
+            scores[name] = sum(map(mul, query, vector)) + self.name_weight * mentioned
+
+        selected = sorted(names, key=scores.__getitem__, reverse=True)[:self.top_tables]
+        neighbours = self._neighbours(snapshot)
+        # Join targets of the best tables, so the model sees both ends of every key it needs
+        candidates = set().union(*(neighbours[name] for name in selected)) - set(selected)
+        selected += sorted(candidates, key=scores.__getitem__, reverse=True)[:self.max_tables - len(selected)]
+
+        chosen = set(selected)
+        with self._lock:
+            self._selections += 1
+            self._tables_total += len(names)
+            self._tables_selected += len(chosen)
+        return [name for name in names if name in chosen]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "selections": self._selections,
+                "index_builds": self._index_builds,
+                "avg_tables_selected": self._tables_selected / self._selections if self._selections else 0.0,
+                "avg_tables_in_schema": self._tables_total / self._selections if self._selections else 0.0,
+            }
+
+@lru_cache()
+def get_schema_retriever() -> Optional[SchemaRetriever]:
+    if not settings.SQL_SCHEMA_SUBSET_ENABLED:
+        return None
+    return SchemaRetriever(
+        top_tables=settings.SQL_SCHEMA_SUBSET_TOP_TABLES,
+        max_tables=settings.SQL_SCHEMA_SUBSET_MAX_TABLES
+    )
@@ -0,0 +1,171 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import threading
+import sqlite3
+import os
+import logging
+from ..config import settings
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+@dataclass
+class TableSchema:
+    name: str
+    columns: List[Tuple[str, str]]  # (name, declared type)
+    foreign_keys: List[Tuple[str, str, str]] = field(default_factory=list)  # (column, table, column)
+    row_count: Optional[int] = None
+    samples: Dict[str, List[str]] = field(default_factory=dict)
+
+    def render(self) -> str:
+        """Prompt block for this table: one line per column with its type, references and sample values"""
+        references = {column: f"{table}.{target}" for column, table, target in self.foreign_keys}
+        header = f"Table {self.name}" + (f" ({self.row_count} rows)" if self.row_count is not None else "") + ":"
+        lines = [header]
+        for column, column_type in self.columns:
+            line = f"{column} ({column_type})"
+            if column in references:
+                line += f" -> {references[column]}"
+            if self.samples.get(column):
+                line += " e.g. " + ", ".join(repr(value) for value in self.samples[column])
+            lines.append(line)
+        return "\n".join(lines)
+
+class SchemaSnapshot:
+    """Introspected schema of one SQLite database, with its rendered prompt text memoized"""
+
+    def __init__(self, tables: List[TableSchema], schema_version: int):
+        self.tables = {table.name: table for table in tables}
+        self.schema_version = schema_version
+        self.blocks = {table.name: table.render() for table in tables}
+        self._memo: Dict[Hashable, Any] = {}
+        # Reentrant: a memoized value may be built from another one
+        self._lock = threading.RLock()
+
+    def render(self, names: Optional[List[str]] = None) -> str:
+        return "\n\n".join(self.blocks[name] for name in (names or list(self.blocks)))
+
+    def memo(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        """Value derived from this snapshot (e.g. a prompt prefix), built once per schema"""
+        with self._lock:
+            if key not in self._memo:
+                self._memo[key] = build()
+            return self._memo[key]
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+def introspect(conn: sqlite3.Connection, sample_values: int = 3, row_counts: bool = True) -> SchemaSnapshot:
+    """Read tables, columns, foreign keys and optionally row counts and sample values"""
+    schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    names = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY rowid"
+    )]
+    tables = []
+    for name in names:
+        table = _quote(name)
+        columns = [(row[1], row[2] or "ANY") for row in conn.execute(f"PRAGMA table_info({table})")]
+        foreign_keys = [(row[3], row[2], row[4]) for row in conn.execute(f"PRAGMA foreign_key_list({table})")]
+        schema = TableSchema(name, columns, foreign_keys)
+        if row_counts:
+            schema.row_count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if sample_values:
+            keys = {column for column, _, _ in foreign_keys}
+            for column, column_type in columns:
+                # Literal values matter for WHERE clauses on text; ids and numbers add nothing
+                if column in keys or not any(kind in column_type.upper() for kind in ("CHAR", "TEXT", "CLOB", "ANY")):
+                    continue
+                values = [
+                    str(row[0])[:40] for row in conn.execute(
+                        f"SELECT DISTINCT {_quote(column)} FROM {table} "
+                        f"WHERE {_quote(column)} IS NOT NULL AND {_quote(column)} != '' LIMIT ?",
+                        (sample_values,)
+                    )
+                ]
+                if values:
+                    schema.samples[column] = values
+        tables.append(schema)
+    return SchemaSnapshot(tables, schema_version)
+
+class SchemaCache:
+    """Process-wide schema snapshots of SQLite databases.
+
+    A request only stats the database file: while its size and mtime (and
+    those of its WAL file) are unchanged, the cached snapshot is returned
+    without opening a connection. When they change, ``PRAGMA
+    schema_version`` is read; data-only writes keep the snapshot and only a
+    schema change, or a replaced file, triggers a new introspection.
+    Row counts and sample values are therefore computed once per schema.
+    """
+
+    def __init__(self, sample_values: int = 3, row_counts: bool = True):
+        self.sample_values = sample_values
+        self.row_counts = row_counts
+        self._entries: Dict[str, Tuple[tuple, SchemaSnapshot]] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._revalidations = 0
+        self._introspections = 0
+
+    def _file_token(self, path: str) -> tuple:
+        token = []
+        for suffix in ("", "-wal"):
+            try:
+                stat = os.stat(path + suffix)
+                token.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                token.append(None)
+        return tuple(token)
+
+    def get(self, db_path: str) -> SchemaSnapshot:
+        path = os.path.abspath(db_path)
+        token = self._file_token(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry[0] == token:
+                self._hits += 1
+                return entry[1]
+
+        conn = sqlite3.connect(Path(path).as_uri() + "?mode=ro", uri=True)
+        try:
+            schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+            # A replaced file (new inode) is a different database even at the same schema_version
+            if entry and entry[0][0] and token[0] and entry[0][0][0] == token[0][0] \
+                    and entry[1].schema_version == schema_version:
+                snapshot = entry[1]
+                with self._lock:
+                    self._revalidations += 1
+            else:
+                snapshot = introspect(conn, self.sample_values, self.row_counts)
+                with self._lock:
+                    self._introspections += 1
+                logger.info(f"Introspected schema of {path}: {len(snapshot.tables)} tables")
+        finally:
+            conn.close()
+
+        with self._lock:
+            self._entries[path] = (token, snapshot)
+        return snapshot
+
+    def invalidate(self, db_path: str) -> None:
+        with self._lock:
+            self._entries.pop(os.path.abspath(db_path), None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "databases": len(self._entries),
+                "hits": self._hits,
+                "revalidations": self._revalidations,
+                "introspections": self._introspections,
+            }
+
+@lru_cache()
+def get_schema_cache() -> SchemaCache:
+    return SchemaCache(
+        sample_values=settings.SQL_SCHEMA_SAMPLE_VALUES,
+        row_counts=settings.SQL_SCHEMA_ROW_COUNTS
+    )
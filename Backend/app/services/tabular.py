@@ -0,0 +1,214 @@
+from datetime import date, datetime, time as dt_time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+import itertools
+import sqlite3
+import os
+import re
+import logging
+from ..config import settings
+from .nl_to_sql import NLToSQLService
+from .retrieval import RAGResponse, RAGStream
+from .tabular_extract import iter_sheets
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TABULAR_FILE_TYPES = ("csv", "xlsx", "xls")
+
+def uses_sql(file_type: str) -> bool:
+    """Whether documents of this type are answered with SQL instead of embeddings"""
+    return settings.TABULAR_SQL_ENABLED and file_type in TABULAR_FILE_TYPES
+
+def _identifier(name: Any, fallback: str, taken: set) -> str:
+    identifier = re.sub(r"\W+", "_", str(name or "")).strip("_").lower() or fallback
+    if identifier[0].isdigit():
+        identifier = f"{fallback}_{identifier}"
+    candidate, suffix = identifier, 2
+    while candidate in taken:
+        candidate = f"{identifier}_{suffix}"
+        suffix += 1
+    taken.add(candidate)
+    return candidate
+
+def _sql_value(value: Any) -> Any:
+    if value is None or value == "":
+        return None
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    if isinstance(value, float) and value != value:  # NaN
+        return None
+    return value
+
+def _affinity(values: Iterable[Any]) -> str:
+    """SQLite column type that fits every non-empty sampled value"""
+    affinity = "INTEGER"
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, bool) or isinstance(value, int):
+            continue
+        if isinstance(value, float):
+            affinity = "REAL"
+            continue
+        text = str(value).strip()
+        try:
+            int(text)
+            continue
+        except ValueError:
+            pass
+        try:
+            float(text)
+            affinity = "REAL"
+        except ValueError:
+            return "TEXT"
+    return affinity
+
+class TabularService:
+    """Spreadsheet documents stored as per-document SQLite databases.
+
+    At ingestion every sheet becomes a table (a CSV becomes ``data``) whose
+    column types are inferred from the first rows; chat questions are then
+    answered by NLToSQLService against that database, so aggregates are
+    exact and nothing is embedded.
+    """
+
+    SAMPLE_ROWS = 1000
+    INSERT_BATCH = 5000
+    PROMPT_VERSION = NLToSQLService.PROMPT_VERSION
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or settings.TABULAR_DB_DIR
+        os.makedirs(self.directory, exist_ok=True)
+
+    def db_path(self, document_id: int) -> str:
+        return os.path.join(self.directory, f"doc_{document_id}.sqlite")
+
+    def has_document(self, document_id: int) -> bool:
+        return os.path.exists(self.db_path(document_id))
+
+    def _load_sheet(self, conn: sqlite3.Connection, table_name: str, rows: Iterable[Sequence],
+                    on_rows: Callable[[int], None]) -> Optional[Dict[str, Any]]:
+        rows = iter(rows)
+        header = None
+        for row in rows:
+            if any(_sql_value(value) is not None for value in row):
+                header = list(row)
+                break
+        if header is None:
+            return None
+
+        taken: set = set()
+        columns = [_identifier(name, f"column_{i + 1}", taken) for i, name in enumerate(header)]
+        width = len(columns)
+
+        def normalize(row: Sequence) -> Optional[List[Any]]:
+            values = [_sql_value(value) for value in itertools.islice(row, width)]
+            if all(value is None for value in values):
+                return None
+            return values + [None] * (width - len(values))
+
+        # Infer column types from a sample, then stream the rest
+        sample = []
+        for row in rows:
+            values = normalize(row)
+            if values is not None:
+                sample.append(values)
+            if len(sample) >= self.SAMPLE_ROWS:
+                break
+        types = [_affinity(values[i] for values in sample) for i in range(width)]
+
+        column_defs = ", ".join(f'"{name}" {kind}' for name, kind in zip(columns, types))
+        conn.execute(f'CREATE TABLE "{table_name}" ({column_defs})')
+        insert = f'INSERT INTO "{table_name}" VALUES ({", ".join("?" * width)})'
+
+        row_count = 0
+        batch = sample
+        for row in rows:
+            values = normalize(row)
+            if values is None:
+                continue
+            batch.append(values)
+            if len(batch) >= self.INSERT_BATCH:
+                conn.executemany(insert, batch)
+                row_count += len(batch)
+                on_rows(row_count)
+                batch = []
+        if batch:
+            conn.executemany(insert, batch)
+            row_count += len(batch)
+            on_rows(row_count)
+
+        return {"table": table_name, "columns": columns, "rows": row_count}
+
+    def load_document(self, document_id: int, file_path: str, file_type: str,
+                      progress_callback: Optional[Callable[[str, int, Optional[int]], None]] = None) -> List[Dict[str, Any]]:
+        """Build the document's SQLite database from a CSV or Excel file.
+
+        ``progress_callback`` receives ``("extracting", rows_loaded, None)``
+        as rows are inserted. The database is written to a temporary file and
+        swapped in when complete, so readers never see a partial load.
+        """
+        path = self.db_path(document_id)
+        tmp_path = path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        loaded_rows = 0
+        def on_rows(sheet_rows: int):
+            if progress_callback:
+                progress_callback("extracting", loaded_rows + sheet_rows, None)
+
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            tables = []
+            taken: set = set()
+            for sheet, rows in iter_sheets(file_path, file_type):
+                table_name = _identifier(sheet or "data", "sheet", taken)
+                table = self._load_sheet(conn, table_name, rows, on_rows)
+                if table is not None:
+                    if sheet is not None:
+                        table["sheet"] = sheet
+                    tables.append(table)
+                    loaded_rows += table["rows"]
+            conn.commit()
+        except Exception:
+            conn.close()
+            os.remove(tmp_path)
+            raise
+        conn.close()
+
+        if not tables:
+            os.remove(tmp_path)
+            raise ValueError("No tabular data found in the file")
+
+        os.replace(tmp_path, path)
+        logger.info(f"Loaded document {document_id} into {len(tables)} tables with {loaded_rows} rows")
+        return tables
+
+    def remove_document(self, document_id: int) -> None:
+        for path in (self.db_path(document_id), self.db_path(document_id) + ".tmp"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def get_response(self, document_id: int, query: str) -> RAGResponse:
+        if not self.has_document(document_id):
+            return RAGResponse("Document not found in the database")
+        try:
+            service = NLToSQLService(db_path=self.db_path(document_id), examples=False)
+            sql_query, results, total_rows, natural_response = service.answer(query)
+            logger.info(f"Answered question on document {document_id} with SQL: {sql_query}")
+            return RAGResponse(natural_response, sources=[{
+                "sql": sql_query, "rows": total_rows, "rows_shown": len(results)
+            }])
+        except Exception as e:
+            logger.error(f"Tabular query failed for document {document_id}: {str(e)}")
+            return RAGResponse("An error occurred while processing your request.")
+
+    def stream_response(self, document_id: int, query: str) -> RAGStream:
+        """The SQL answer is produced in one piece, so it streams as a single token"""
+        return RAGStream.from_response(self.get_response(document_id, query))
@@ -0,0 +1,112 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import csv
+import logging
+import pandas as pd
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+Metadata = Dict[str, Union[str, int]]
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return ""
+        if value.is_integer():
+            return str(int(value))
+    text = str(value)
+    # Keep one row per line in the chunk text
+    return text.replace("\n", " ").replace("\r", " ").strip()
+
+def _row_groups(rows: Iterable[Sequence], sheet: Optional[str], max_chars: int,
+                max_rows: int) -> Iterator[Tuple[str, Metadata]]:
+    """Group rows of one table into chunks that each repeat the header.
+
+    The first non-empty row is the header. Rows are rendered as compact
+    comma-separated values and packed until a chunk reaches ``max_chars``
+    or ``max_rows``. Row numbers are 1-based as in the source file.
+    """
+    header: Optional[str] = None
+    prefix = ""
+    lines: List[str] = []
+    size = 0
+    row_start = row_end = 0
+
+    def emit() -> Tuple[str, Metadata]:
+        metadata: Metadata = {"row_start": row_start, "row_end": row_end}
+        if sheet is not None:
+            metadata["sheet"] = sheet
+        return prefix + "\n".join(lines), metadata
+
+    for row_number, row in enumerate(rows, start=1):
+        cells = [_cell(value) for value in row]
+        while cells and not cells[-1]:
+            cells.pop()
+        if not cells:
+            continue
+        line = ", ".join(cells)
+
+        if header is None:
+            header = line
+            prefix = (f"Sheet: {sheet}\n" if sheet is not None else "") + f"Columns: {header}\n"
+            continue
+
+        if lines and (size + len(line) > max_chars or len(lines) >= max_rows):
+            yield emit()
+            lines, size = [], 0
+        if not lines:
+            row_start = row_number
+        lines.append(line)
+        size += len(line) + 1
+        row_end = row_number
+
+    if lines:
+        yield emit()
+
+def _csv_rows(file_path: str) -> Iterator[List[str]]:
+    with open(file_path, newline="", encoding="utf-8-sig", errors="replace") as file:
+        yield from csv.reader(file)
+
+def iter_sheets(file_path: str, file_type: str) -> Iterator[Tuple[Optional[str], Iterable[Sequence]]]:
+    """Yield (sheet name, row iterator) for each table in a CSV or Excel file.
+
+    Files are streamed: CSV rows are read incrementally and workbooks one
+    sheet at a time (xlsx in openpyxl read-only mode), so memory does not
+    grow with the number of rows. CSV files have a single unnamed sheet.
+    """
+    if file_type == "csv":
+        yield None, _csv_rows(file_path)
+
+    elif file_type == "xlsx":
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for worksheet in workbook.worksheets:
+                yield worksheet.title, worksheet.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    elif file_type == "xls":
+        # Legacy workbooks have no streaming reader; load one sheet at a time
+        with pd.ExcelFile(file_path) as workbook:
+            for sheet_name in workbook.sheet_names:
+                frame = workbook.parse(sheet_name, header=None, dtype=object)
+                yield str(sheet_name), frame.itertuples(index=False, name=None)
+                del frame
+
+    else:
+        raise ValueError(f"Unsupported spreadsheet type: {file_type}")
+
+def iter_table_chunks(file_path: str, file_type: str, max_chars: int = 800,
+                      max_rows: int = 50) -> Iterator[Tuple[str, Metadata]]:
+    """Yield (chunk text, metadata) row groups from a CSV or Excel file.
+
+    Metadata carries ``row_start``/``row_end`` and, for workbooks, the
+    ``sheet`` name.
+    """
+    for sheet, rows in iter_sheets(file_path, file_type):
+        yield from _row_groups(rows, sheet, max_chars, max_rows)
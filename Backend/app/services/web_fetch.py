@@ -0,0 +1,68 @@
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import asyncio
+import logging
+import httpx
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class AsyncFetcher:
+    """Concurrent page downloads over one pooled, keep-alive HTTP client.
+
+    At most ``max_concurrency`` requests are in flight overall and at most
+    ``per_host`` against any single host, so a batch dominated by one site
+    neither hammers it nor starves the other hosts. Use as an async context
+    manager; connections are reused for the lifetime of the block.
+    """
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, max_concurrency: int = 16,
+                 per_host: int = 4, timeout: float = 10.0):
+        self.headers = headers or {}
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._global: Optional[asyncio.Semaphore] = None
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+
+    async def __aenter__(self) -> "AsyncFetcher":
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency
+            )
+        )
+        self._global = asyncio.Semaphore(self.max_concurrency)
+        self._hosts = {}
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._client.aclose()
+        self._client = None
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc.lower()
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.per_host)
+        return self._hosts[host]
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """GET a URL, raising for transport errors and 4xx/5xx responses.
+
+        Extra ``headers`` (e.g. conditional request validators) are merged
+        into the client defaults; a 304 is returned, not raised.
+        """
+        # Wait for the host slot first so queued requests to a busy host do
+        # not hold global slots that other hosts could use
+        async with self._host_semaphore(url):
+            async with self._global:
+                response = await self._client.get(url, headers=headers)
+        # httpx also raises for 3xx, which would reject a 304 Not Modified
+        if response.status_code >= 400:
+            response.raise_for_status()
+        return response
@@ -1,52 +1,57 @@
-from typing import Optional, List, Dict, Union
+from typing import Optional, List, Dict, Union, Callable, Tuple
+from functools import lru_cache, partial
 import requests
-from bs4 import BeautifulSoup
 import urllib.parse
 import logging
-import uuid
 import hashlib
+import asyncio
+import time
 import os
+from datetime import datetime, timedelta
 import chromadb
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_groq import ChatGroq
-from ..config import Settings
-from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from ..config import settings
+from ..database import SessionLocal
+from ..models.web import IndexedURL
+from .embedding import SentenceTransformerEmbedding, get_embedding_engine
+from .cache import get_retrieval_cache
+from .answer_cache import get_answer_cache
+from .retrieval import RAGResponse, RAGStream
+from .web_fetch import AsyncFetcher
+from .html_extract import HTMLExtractor, ExtractedPage
+from .chunking import chunk_ids, diff_chunk_ids
+from .lexical import get_lexical_index_store, index_collection, fuse_results
+from .rerank import get_reranker
+from .llm import get_llm_gateway
+from .executors import get_cpu_executor, get_io_executor
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class SentenceTransformerEmbedding(EmbeddingFunction):
-    _instance = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance.model = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2",
-                model_kwargs={'device': 'cpu'}
-            )
-        return cls._instance
-
-    def __call__(self, input: Documents) -> Embeddings:
-        if not input:
-            return []
-        return self.model.embed_documents(input)
-
 class WebRAGService:
-    def __init__(self, persist_directory: str = "web_chroma_db"):
+    # Part of the request coalescing key; bump it when the prompt changes
+    PROMPT_VERSION = 1
+
+    def __init__(self, persist_directory: str = "web_chroma_db", llm=None):
         self.persist_directory = persist_directory
         os.makedirs(self.persist_directory, exist_ok=True)
         self.collection_name_template = "web_{user_id}"
         
         # Initialize components
-        self.embedding_function = SentenceTransformerEmbedding()
-        self.llm = ChatGroq(
-            temperature=0.3,
-            model_name="llama3-70b-8192",
-            groq_api_key=Settings().GROQ_API_KEY,
-            max_tokens=1024
+        self.embedding_engine = get_embedding_engine()
+        self.embedding_function = SentenceTransformerEmbedding(self.embedding_engine)
+        self.retrieval_cache = get_retrieval_cache()
+        self.answer_cache = get_answer_cache()
+        self.lexical_store = get_lexical_index_store()
+        self.reranker = get_reranker()
+        # Shared with the API handlers; batch work waits for slots instead of failing
+        self.cpu_pool = get_cpu_executor()
+        self.io_pool = get_io_executor()
+        self.llm = llm or get_llm_gateway().chat_model("llama3-70b-8192", temperature=0.3, max_tokens=1024)
+        self.html_extractor = HTMLExtractor(
+            backend=settings.WEB_HTML_PARSER,
+            readability=settings.WEB_READABILITY
         )
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=500,
@@ -77,27 +82,13 @@ class WebRAGService:
     def _collection_name(self, user_id: int) -> str:
         return self.collection_name_template.format(user_id=user_id)
     
-    def _extract_text_from_html(self, html_content: str) -> str:
-        """Extract main content text from HTML"""
+    def _extract_page(self, html_content: str) -> ExtractedPage:
+        """Extract title, main content text and links from HTML in one parse"""
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Remove script and style elements
-            for script_or_style in soup(['script', 'style', 'nav', 'footer', 'header']):
-                script_or_style.decompose()
-            
-            # Get text
-            text = soup.get_text(separator='\n')
-            
-            # Clean up whitespace
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = '\n'.join(chunk for chunk in chunks if chunk)
-            
-            return text
+            return self.html_extractor.extract(html_content)
         except Exception as e:
             logger.error(f"HTML extraction failed: {str(e)}")
-            return ""
+            return ExtractedPage(title=None, text="")
 
     def _calculate_url_hash(self, url: str) -> str:
         """Calculate SHA-256 hash of URL"""
@@ -105,31 +96,38 @@ class WebRAGService:
         hash_sha256.update(url.encode('utf-8'))
         return hash_sha256.hexdigest()
     
+    def _normalize_url(self, url: str) -> str:
+        # Ensure URL has protocol
+        if not url.startswith(('http://', 'https://')):
+            url = 'https://' + url
+        return url
+    
+    def _parse_page(self, url: str, html_content: str) -> Dict[str, Union[str, bool]]:
+        """Extract the title and main text of a downloaded page"""
+        page = self._extract_page(html_content)
+        title = page.title or url
+        
+        return {
+            "success": True,
+            "url": url,
+            "title": title,
+            "text": page.text,
+            "links": page.links,
+            "hash": self._calculate_url_hash(url)
+        }
+    
     def scrape_url(self, url: str) -> Dict[str, Union[str, bool]]:
         """Scrape content from a URL"""
         try:
-            # Ensure URL has protocol
-            if not url.startswith(('http://', 'https://')):
-                url = 'https://' + url
+            url = self._normalize_url(url)
                 
             # Fetch the URL
             response = requests.get(url, headers=self.headers, timeout=10)
             response.raise_for_status()
             
-            # Extract text
-            text = self._extract_text_from_html(response.text)
-            
-            # Get page title
-            soup = BeautifulSoup(response.text, 'html.parser')
-            title = soup.title.string if soup.title else url
-            
-            return {
-                "success": True,
-                "url": url,
-                "title": title,
-                "text": text,
-                "hash": self._calculate_url_hash(url)
-            }
+            page = self.cpu_pool.call(self._parse_page, url, response.text)
+            page.update(self._response_validators(response))
+            return page
         except Exception as e:
             logger.error(f"Failed to scrape URL {url}: {str(e)}")
             return {
@@ -138,6 +136,115 @@ class WebRAGService:
                 "error": str(e)
             }
     
+    def _response_validators(self, response) -> Dict[str, Optional[str]]:
+        """HTTP cache validators and body fingerprint of a fetched page"""
+        return {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_hash": hashlib.sha256(response.content).hexdigest()
+        }
+    
+    def _chunk_metadata(self, page: Dict, index: int) -> Dict[str, Union[str, int]]:
+        return {
+            "url": page["url"],
+            "title": page["title"],
+            "url_hash": page["hash"],
+            "chunk_index": index
+        }
+    
+    def _sync_page_chunks(self, collection, page: Dict) -> Dict[str, int]:
+        """Make the stored chunks of a page match ``page["chunks"]``.
+
+        Chunk ids are content hashes, so chunks that survived an edit keep
+        their id and vector; only new chunks are embedded and only vanished
+        ones are deleted.
+        """
+        chunks = page["chunks"]
+        ids = chunk_ids(page["url"], chunks)
+        existing = collection.get(where={"url_hash": page["hash"]}, include=[])["ids"]
+        added, removed, kept = diff_chunk_ids(existing, ids)
+        
+        positions = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        lexical_index = self.lexical_store.get(collection.name) if self.lexical_store else None
+        if removed:
+            collection.delete(ids=removed)
+            if lexical_index:
+                lexical_index.remove(removed)
+        if kept:
+            # Positions and the title may have moved even if the text did not
+            collection.update(
+                ids=kept,
+                metadatas=[self._chunk_metadata(page, positions[chunk_id]) for chunk_id in kept]
+            )
+        if added:
+            added_chunks = [chunks[positions[chunk_id]] for chunk_id in added]
+            collection.add(
+                documents=added_chunks,
+                embeddings=self.embedding_engine.embed_documents(added_chunks),
+                ids=added,
+                metadatas=[self._chunk_metadata(page, positions[chunk_id]) for chunk_id in added]
+            )
+            if lexical_index:
+                lexical_index.add(added, added_chunks)
+        
+        return {
+            "chunks_added": len(added),
+            "chunks_removed": len(removed),
+            "chunks_kept": len(kept)
+        }
+    
+    def _save_url_records(self, user_id: int, pages: List[Dict]) -> None:
+        """Create or update the metadata rows for fetched pages.
+
+        Pages carrying ``content_hash`` were downloaded and have their
+        validators replaced; the others (304 or unchanged) only get their
+        fetch time bumped.
+        """
+        if not pages:
+            return
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            for page in pages:
+                record = db.query(IndexedURL).filter(
+                    IndexedURL.user_id == user_id,
+                    IndexedURL.url_hash == page["hash"]
+                ).first()
+                if record is None:
+                    record = IndexedURL(user_id=user_id, url=page["url"], url_hash=page["hash"])
+                    db.add(record)
+                if page.get("title"):
+                    record.title = page["title"]
+                if "content_hash" in page:
+                    record.etag = page["etag"]
+                    record.last_modified = page["last_modified"]
+                    record.content_hash = page["content_hash"]
+                if "chunks" in page:
+                    record.chunks_count = len(page["chunks"])
+                if page.get("changed"):
+                    record.last_changed_at = now
+                record.last_fetched_at = now
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to save URL metadata for user {user_id}: {str(e)}")
+        finally:
+            db.close()
+    
+    def _delete_url_records(self, user_id: int, url_hash: Optional[str] = None) -> None:
+        db = SessionLocal()
+        try:
+            records = db.query(IndexedURL).filter(IndexedURL.user_id == user_id)
+            if url_hash is not None:
+                records = records.filter(IndexedURL.url_hash == url_hash)
+            records.delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to delete URL metadata for user {user_id}: {str(e)}")
+        finally:
+            db.close()
+    
     def add_url_to_collection(self, user_id: int, url: str) -> Dict[str, Union[str, bool]]:
         """Add a URL to a user's collection"""
         try:
@@ -145,26 +252,14 @@ class WebRAGService:
             collection_name = self._collection_name(user_id)
             
             # Create or get the collection
-            try:
-                collection = self.chroma_client.get_collection(
-                    name=collection_name,
-                    embedding_function=self.embedding_function
-                )
-            except Exception:
-                collection = self.chroma_client.create_collection(
-                    name=collection_name,
-                    embedding_function=self.embedding_function
-                )
+            collection = self._get_or_create_collection(collection_name)
             
-            # Scrape the URL
-            url_data = self.scrape_url(url)
-            if not url_data["success"]:
-                return url_data
-            
-            # Check if URL already exists in collection
-            url_hash = url_data["hash"]
+            # Check if URL already exists in collection before downloading it
+            url = self._normalize_url(url)
+            url_hash = self._calculate_url_hash(url)
             existing_items = collection.get(
                 where={"url_hash": url_hash},
+                limit=1,
                 include=["metadatas"]
             )
             
@@ -175,43 +270,40 @@ class WebRAGService:
                     "success": True,
                     "message": "URL already indexed",
                     "url": url,
-                    "title": url_data["title"],
+                    "title": existing_items["metadatas"][0].get("title"),
                     "is_new": False
                 }
             
+            # Scrape the URL
+            url_data = self.scrape_url(url)
+            if not url_data["success"]:
+                return url_data
+            
             # Split the text into chunks
-            chunks = self.text_splitter.split_text(url_data["text"])
+            url_data["chunks"] = self.cpu_pool.call(self.text_splitter.split_text, url_data["text"])
             
-            if not chunks:
+            if not url_data["chunks"]:
                 return {
                     "success": False,
                     "url": url,
                     "error": "No content could be extracted from the URL"
                 }
             
-            # Add chunks to collection
-            batch_ids = [str(uuid.uuid4()) for _ in chunks]
-            batch_metadata = [{
-                "url": url,
-                "title": url_data["title"],
-                "url_hash": url_hash,
-                "chunk_index": i
-            } for i in range(len(chunks))]
+            # Add chunks to collection (embedding the new ones)
+            self.cpu_pool.call(self._sync_page_chunks, collection, url_data)
+            self.retrieval_cache.invalidate(collection_name)
+            url_data["changed"] = True
+            self._save_url_records(user_id, [url_data])
             
-            collection.add(
-                documents=chunks,
-                ids=batch_ids,
-                metadatas=batch_metadata
-            )
-            
-            logger.info(f"Added URL {url} to collection for user {user_id} with {len(chunks)} chunks")
+            chunks_count = len(url_data["chunks"])
+            logger.info(f"Added URL {url} to collection for user {user_id} with {chunks_count} chunks")
             
             return {
                 "success": True,
                 "message": "URL indexed successfully",
                 "url": url,
                 "title": url_data["title"],
-                "chunks_count": len(chunks),
+                "chunks_count": chunks_count,
                 "is_new": True
             }
             
@@ -223,13 +315,277 @@ class WebRAGService:
                 "error": str(e)
             }
     
-    def add_multiple_urls(self, user_id: int, urls: List[str]) -> List[Dict[str, Union[str, bool]]]:
-        """Add multiple URLs to a user's collection"""
-        results = []
-        for url in urls:
-            result = self.add_url_to_collection(user_id, url)
-            results.append(result)
-        return results
+    def _get_or_create_collection(self, collection_name: str):
+        try:
+            return self.chroma_client.get_collection(
+                name=collection_name,
+                embedding_function=self.embedding_function
+            )
+        except Exception:
+            return self.chroma_client.create_collection(
+                name=collection_name,
+                embedding_function=self.embedding_function
+            )
+    
+    async def _fetch_and_prepare(self, fetcher: AsyncFetcher, url: str) -> Dict:
+        """Download, parse, chunk and embed one page.
+
+        Parsing and embedding run on the CPU pool, so while one page is
+        being embedded the event loop keeps downloading the others; the
+        embedding engine batches the concurrent calls together.
+        """
+        try:
+            response = await fetcher.get(url)
+            page = await self.cpu_pool.run_waiting(self._parse_page, url, response.text)
+            page.update(self._response_validators(response))
+            chunks = await self.cpu_pool.run_waiting(self.text_splitter.split_text, page["text"])
+            if not chunks:
+                return {
+                    "success": False,
+                    "url": url,
+                    "error": "No content could be extracted from the URL"
+                }
+            embeddings = await self.cpu_pool.run_waiting(self.embedding_engine.embed_documents, chunks)
+            page["chunks"] = chunks
+            page["embeddings"] = embeddings
+            return page
+        except Exception as e:
+            logger.error(f"Failed to scrape URL {url}: {str(e)}")
+            return {
+                "success": False,
+                "url": url,
+                "error": str(e)
+            }
+    
+    async def add_multiple_urls(self, user_id: int, urls: List[str]) -> List[Dict[str, Union[str, bool]]]:
+        """Add multiple URLs to a user's collection.
+
+        Pages are fetched concurrently (bounded globally and per host) and
+        their chunks are written to Chroma in one batch at the end. Returns
+        one result per input URL, in input order.
+        """
+        collection_name = self._collection_name(user_id)
+        normalized = [self._normalize_url(url) for url in urls]
+        unique_urls = list(dict.fromkeys(normalized))
+        results: Dict[str, Dict] = {}
+        
+        try:
+            collection = self._get_or_create_collection(collection_name)
+            
+            # Skip the download for URLs that are already indexed
+            hashes = {url: self._calculate_url_hash(url) for url in unique_urls}
+            existing = collection.get(
+                where={"url_hash": {"$in": list(hashes.values())}},
+                include=["metadatas"]
+            )
+            indexed_titles = {
+                metadata["url_hash"]: metadata.get("title")
+                for metadata in existing["metadatas"]
+            }
+            to_fetch = []
+            for url in unique_urls:
+                if hashes[url] in indexed_titles:
+                    results[url] = {
+                        "success": True,
+                        "message": "URL already indexed",
+                        "url": url,
+                        "title": indexed_titles[hashes[url]],
+                        "is_new": False
+                    }
+                else:
+                    to_fetch.append(url)
+            
+            async with AsyncFetcher(
+                headers=self.headers,
+                max_concurrency=settings.WEB_FETCH_CONCURRENCY,
+                per_host=settings.WEB_FETCH_PER_HOST,
+                timeout=settings.WEB_FETCH_TIMEOUT_SECONDS
+            ) as fetcher:
+                pages = await asyncio.gather(
+                    *(self._fetch_and_prepare(fetcher, url) for url in to_fetch)
+                )
+            
+            # Single batched write for every page that was fetched successfully
+            documents, embeddings, ids, metadatas = [], [], [], []
+            for page in pages:
+                if not page["success"]:
+                    results[page["url"]] = page
+                    continue
+                url = page["url"]
+                documents.extend(page["chunks"])
+                embeddings.extend(page["embeddings"])
+                ids.extend(chunk_ids(url, page["chunks"]))
+                metadatas.extend(self._chunk_metadata(page, i) for i in range(len(page["chunks"])))
+                page["changed"] = True
+                results[url] = {
+                    "success": True,
+                    "message": "URL indexed successfully",
+                    "url": url,
+                    "title": page["title"],
+                    "chunks_count": len(page["chunks"]),
+                    "is_new": True
+                }
+            
+            if documents:
+                max_batch = self.chroma_client.get_max_batch_size()
+                for i in range(0, len(documents), max_batch):
+                    await self.io_pool.run_waiting(
+                        collection.add,
+                        documents=documents[i:i + max_batch],
+                        embeddings=embeddings[i:i + max_batch],
+                        ids=ids[i:i + max_batch],
+                        metadatas=metadatas[i:i + max_batch]
+                    )
+                if self.lexical_store:
+                    await self.io_pool.run_waiting(self.lexical_store.get(collection_name).add, ids, documents)
+                self.retrieval_cache.invalidate(collection_name)
+                await self.io_pool.run_waiting(
+                    self._save_url_records, user_id, [page for page in pages if page["success"]]
+                )
+            
+            logger.info(
+                f"Added {len(to_fetch)} URLs ({len(documents)} chunks) to collection for user {user_id}"
+            )
+            
+        except Exception as e:
+            logger.error(f"Failed to add URLs to collection: {str(e)}")
+            for url in unique_urls:
+                # Pages were not written if the batch failed
+                if url not in results or results[url].get("is_new"):
+                    results[url] = {
+                        "success": False,
+                        "url": url,
+                        "error": str(e)
+                    }
+        
+        return [results[url] for url in normalized]
+    
+    async def _revalidate(self, fetcher: AsyncFetcher, collection, known: Dict) -> Dict:
+        """Conditionally re-fetch one indexed page and re-index it if it changed"""
+        url = known["url"]
+        base = {"url": url, "hash": known["hash"], "title": known.get("title")}
+        result = dict(base)
+        headers = {}
+        if known.get("etag"):
+            headers["If-None-Match"] = known["etag"]
+        if known.get("last_modified"):
+            headers["If-Modified-Since"] = known["last_modified"]
+        
+        try:
+            response = await fetcher.get(url, headers=headers)
+            if response.status_code == 304:
+                result["status"] = "unchanged"
+                return result
+            
+            result.update(self._response_validators(response))
+            if result["content_hash"] == known.get("content_hash"):
+                result["status"] = "unchanged"
+                return result
+            
+            page = await self.cpu_pool.run_waiting(self._parse_page, url, response.text)
+            page["chunks"] = await self.cpu_pool.run_waiting(self.text_splitter.split_text, page["text"])
+            if not page["chunks"]:
+                # Keep the previously indexed content rather than emptying the page
+                return {**base, "status": "failed", "error": "No content could be extracted from the URL"}
+            
+            counts = await self.cpu_pool.run_waiting(self._sync_page_chunks, collection, page)
+            result.update(counts)
+            result.update(title=page["title"], chunks=page["chunks"], changed=True, status="updated")
+            return result
+            
+        except Exception as e:
+            logger.error(f"Failed to refresh URL {url}: {str(e)}")
+            return {**base, "status": "failed", "error": str(e)}
+    
+    def _load_url_validators(self, user_id: int) -> Dict[str, Dict]:
+        """Known validators of every indexed URL of a user, keyed by URL hash"""
+        db = SessionLocal()
+        try:
+            known = {
+                record.url_hash: {
+                    "url": record.url,
+                    "hash": record.url_hash,
+                    "title": record.title,
+                    "etag": record.etag,
+                    "last_modified": record.last_modified,
+                    "content_hash": record.content_hash
+                }
+                for record in db.query(IndexedURL).filter(IndexedURL.user_id == user_id)
+            }
+        finally:
+            db.close()
+        
+        # URLs indexed before metadata was tracked are fetched unconditionally
+        for item in self.get_indexed_urls(user_id):
+            if item["url_hash"] not in known:
+                known[item["url_hash"]] = {"url": item["url"], "hash": item["url_hash"], "title": item["title"]}
+        return known
+    
+    async def refresh_urls(self, user_id: int) -> Dict:
+        """Revalidate every URL in a user's collection.
+
+        Each page is fetched with If-None-Match/If-Modified-Since from the
+        URL metadata store; a 304 or an identical body skips parsing and
+        embedding entirely, and changed pages only re-embed changed chunks.
+        """
+        collection_name = self._collection_name(user_id)
+        try:
+            collection = self.chroma_client.get_collection(
+                name=collection_name,
+                embedding_function=self.embedding_function
+            )
+        except Exception:
+            return {
+                "success": False,
+                "message": "No indexed URLs found for this user"
+            }
+        
+        known = await self.io_pool.run_waiting(self._load_url_validators, user_id)
+        
+        async with AsyncFetcher(
+            headers=self.headers,
+            max_concurrency=settings.WEB_FETCH_CONCURRENCY,
+            per_host=settings.WEB_FETCH_PER_HOST,
+            timeout=settings.WEB_FETCH_TIMEOUT_SECONDS
+        ) as fetcher:
+            results = await asyncio.gather(
+                *(self._revalidate(fetcher, collection, page) for page in known.values())
+            )
+        
+        if any(result["status"] == "updated" for result in results):
+            self.retrieval_cache.invalidate(collection_name)
+        # Failed pages keep their old validators but still count as checked,
+        # so the scheduler does not retry them on every pass
+        await self.io_pool.run_waiting(self._save_url_records, user_id, results)
+        
+        summary = {status: sum(1 for result in results if result["status"] == status)
+                   for status in ("unchanged", "updated", "failed")}
+        logger.info(f"Refreshed {len(results)} URLs for user {user_id}: {summary}")
+        
+        return {
+            "success": True,
+            "checked": len(results),
+            **summary,
+            "results": [
+                {key: value for key, value in result.items() if key not in ("hash", "chunks", "changed", "content_hash")}
+                for result in results
+            ]
+        }
+    
+    def users_due_for_refresh(self, max_age: timedelta) -> List[int]:
+        """Users with at least one indexed URL not fetched within ``max_age``"""
+        cutoff = datetime.utcnow() - max_age
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(IndexedURL.user_id)
+                .filter((IndexedURL.last_fetched_at == None) | (IndexedURL.last_fetched_at < cutoff))  # noqa: E711
+                .distinct()
+                .all()
+            )
+            return [row.user_id for row in rows]
+        finally:
+            db.close()
     
     def get_indexed_urls(self, user_id: int) -> List[Dict[str, str]]:
         """Get a list of all indexed URLs for a user"""
@@ -303,6 +659,10 @@ class WebRAGService:
             
             # Delete all chunks for this URL using the IDs we got
             collection.delete(ids=matching_items["ids"])
+            if self.lexical_store:
+                self.lexical_store.get(collection_name).remove(matching_items["ids"])
+            self.retrieval_cache.invalidate(collection_name)
+            self._delete_url_records(user_id, url_hash)
             
             logger.info(f"Removed URL {url} from collection for user {user_id}")
             
@@ -325,6 +685,12 @@ class WebRAGService:
             
             try:
                 self.chroma_client.delete_collection(collection_name)
+                if self.lexical_store:
+                    self.lexical_store.delete(collection_name)
+                self.retrieval_cache.invalidate(collection_name)
+                self._delete_url_records(user_id)
+                if self.answer_cache:
+                    self.answer_cache.invalidate(collection_name)
                 logger.info(f"Deleted collection for user {user_id}")
                 
                 return {
@@ -344,95 +710,213 @@ class WebRAGService:
                 "error": str(e)
             }
     
-    def get_response(self, user_id: int, query: str, chat_history: Optional[List[tuple]] = None) -> str:
-        """Get a response to a query using the user's indexed URLs - consistent with document RAG"""
-        try:
-            collection_name = self._collection_name(user_id)
-            
-            try:
+    def _query_collection(self, collection_name: str, query: str, n_results: Optional[int] = None,
+                          timings: Optional[Dict[str, float]] = None,
+                          embed_query: Optional[Callable[[], List[float]]] = None) -> Optional[Dict]:
+        """Top-k search over a collection, served from the retrieval cache when possible.
+
+        With hybrid search the dense candidates are fused with BM25 hits by
+        reciprocal rank fusion, and the optional cross-encoder then picks the
+        final ``n_results``. Returns None when the collection does not exist.
+        Embedding, search, lexical and rerank times in milliseconds are
+        written into ``timings`` when given. ``embed_query`` supplies the
+        query embedding when the caller needs it too.
+        """
+        timings = timings if timings is not None else {}
+        timings.setdefault("embed_ms", 0.0)
+        timings.setdefault("search_ms", 0.0)
+        n_results = n_results or settings.WEB_TOP_K
+        n_rerank = max(n_results, settings.RERANK_CANDIDATES) if self.reranker else n_results
+        n_candidates = max(n_rerank, settings.HYBRID_CANDIDATES) if self.lexical_store else n_rerank
+        collection = None
+        
+        def get_collection():
+            nonlocal collection
+            if collection is None:
                 collection = self.chroma_client.get_collection(
                     name=collection_name,
                     embedding_function=self.embedding_function
                 )
+            return collection
+        
+        cache_version = self.retrieval_cache.version(collection_name)
+        results = self.retrieval_cache.get(collection_name, query, n_candidates)
+        if results is None:
+            try:
+                get_collection()
             except Exception:
-                raise Exception("No indexed URLs found. Please add URLs first.")
+                return None
             
-            # Query collection
+            started = time.perf_counter()
+            embed_query = embed_query or partial(self.cpu_pool.call, self.embedding_engine.embed_query, query)
+            query_embedding = embed_query()
+            timings["embed_ms"] = (time.perf_counter() - started) * 1000
+            
+            started = time.perf_counter()
             results = collection.query(
-                query_texts=[query],
-                n_results=5
+                query_embeddings=[query_embedding],
+                n_results=n_candidates,
+                include=["documents", "metadatas", "distances"]
             )
+            timings["search_ms"] = (time.perf_counter() - started) * 1000
             
-            if not results["documents"][0]:
-                raise Exception("No relevant information found in the indexed URLs.")
-            
-            # Prepare context
-            context_chunks = results["documents"][0]
-            context = "\n".join(context_chunks)
-            
-            # Build conversation history context
-            history_context = ""
-            if chat_history:
-                history_parts = []
-                for user_msg, assistant_msg in chat_history[-5:]:  # Last 5 exchanges
-                    history_parts.append(f"User: {user_msg}")
-                    history_parts.append(f"Assistant: {assistant_msg}")
-                history_context = "\n".join(history_parts) + "\n\n"
-            
-            # Generate response with consistent format
-            prompt = f"""{history_context}Context information from indexed web pages:
+            self.retrieval_cache.set(collection_name, query, n_candidates, results, cache_version)
+        
+        if self.lexical_store:
+            started = time.perf_counter()
+            if not self.lexical_store.exists(collection_name):
+                # Indexed before hybrid search was enabled
+                index_collection(self.lexical_store.get(collection_name), get_collection())
+            results = fuse_results(
+                results,
+                self.lexical_store.get(collection_name).search(query, n_candidates),
+                lambda ids: get_collection().get(ids=ids, include=["documents", "metadatas"]),
+                n_rerank,
+                k=settings.RRF_K
+            )
+            timings["lexical_ms"] = (time.perf_counter() - started) * 1000
+        if self.reranker:
+            started = time.perf_counter()
+            results = self.cpu_pool.call(self.reranker.rerank_results, query, results, n_results)
+            timings["rerank_ms"] = (time.perf_counter() - started) * 1000
+        return results
+    
+    def _sources_from_results(self, results: Dict) -> List[Dict[str, Union[str, float]]]:
+        """Unique source pages of a search, each with its best chunk distance"""
+        sources = []
+        by_url = {}
+        distances = results.get("distances") or [[None] * len(results["metadatas"][0])]
+        
+        for metadata, distance in zip(results["metadatas"][0], distances[0]):
+            url = metadata.get("url")
+            if not url:
+                continue
+            if url not in by_url:
+                by_url[url] = {
+                    "url": url,
+                    "title": metadata.get("title"),
+                    "distance": distance
+                }
+                sources.append(by_url[url])
+            elif distance is not None and (by_url[url]["distance"] is None or distance < by_url[url]["distance"]):
+                by_url[url]["distance"] = distance
+        
+        return sources
+    
+    def _prepare_answer(self, user_id: int, query: str,
+                        chat_history: Optional[List[tuple]] = None) -> Tuple[RAGResponse, Optional[str], Optional[Callable[[str], None]]]:
+        """Run the single retrieval pass for a query.
+
+        Returns the response filled with context, distances, sources and
+        timings. On a semantic cache hit it already carries the answer and
+        the prompt is None; otherwise the caller sends the prompt to the LLM
+        and passes the answer to the returned callback.
+        """
+        collection_name = self._collection_name(user_id)
+        timings: Dict[str, float] = {}
+        
+        # Embedded at most once, and only if the search or the answer cache needs it
+        embed_query = lru_cache(maxsize=None)(partial(self.cpu_pool.call, self.embedding_engine.embed_query, query))
+        
+        # Query collection
+        results = self._query_collection(collection_name, query, timings=timings, embed_query=embed_query)
+        if results is None:
+            raise Exception("No indexed URLs found. Please add URLs first.")
+        
+        if not results["documents"][0]:
+            raise Exception("No relevant information found in the indexed URLs.")
+        
+        # Prepare context
+        context_chunks = results["documents"][0]
+        response = RAGResponse(
+            answer="",
+            chunks=context_chunks,
+            distances=(results.get("distances") or [[]])[0],
+            sources=self._sources_from_results(results),
+            timings=timings
+        )
+        
+        # Build conversation history context
+        history_context = ""
+        if chat_history:
+            history_parts = []
+            for user_msg, assistant_msg in chat_history[-5:]:  # Last 5 exchanges
+                history_parts.append(f"User: {user_msg}")
+                history_parts.append(f"Assistant: {assistant_msg}")
+            history_context = "\n".join(history_parts) + "\n\n"
+        
+        chunk_ids = results["ids"][0]
+        if self.answer_cache:
+            # A follow-up like "tell me more" depends on the conversation, not only on the chunks
+            cached_answer = self.answer_cache.lookup(collection_name, chunk_ids, embed_query(), history_context)
+            if cached_answer is not None:
+                response.answer = cached_answer
+                response.cached = True
+                return response, None, None
+        
+        context = "\n".join(context_chunks)
+        
+        # Generate response with consistent format
+        prompt = f"""{history_context}Context information from indexed web pages:
 {context}
 
 Current question: {query}
 
 Provide a helpful and accurate answer based on the context from the web pages. If the information isn't available in the context, say you don't know. Be conversational and natural in your response."""
+        
+        def record(answer: str) -> None:
+            if self.answer_cache and answer:
+                self.answer_cache.store(collection_name, chunk_ids, query, embed_query(), answer, history_context)
+        
+        return response, prompt, record
+    
+    def get_response(self, user_id: int, query: str, chat_history: Optional[List[tuple]] = None) -> RAGResponse:
+        """Answer a query from the user's indexed URLs with one retrieval pass.
+
+        The result carries the answer together with the context chunks, their
+        distances, de-duplicated sources and per-stage timings.
+        """
+        try:
+            response, prompt, record = self._prepare_answer(user_id, query, chat_history)
+            if prompt is None:
+                return response
             
-            response = self.llm.invoke(prompt)
-            return response.content.strip()
+            started = time.perf_counter()
+            llm_response = self.llm.invoke(prompt)
+            response.timings["llm_ms"] = (time.perf_counter() - started) * 1000
+            response.answer = llm_response.content.strip()
+            record(response.answer)
+            return response
             
         except Exception as e:
             logger.error(f"Failed to get response: {str(e)}")
             raise Exception(str(e))
     
-    def get_sources_for_query(self, user_id: int, query: str) -> List[Dict[str, str]]:
+    def stream_response(self, user_id: int, query: str, chat_history: Optional[List[tuple]] = None) -> RAGStream:
+        """Like get_response, but yields the answer token by token"""
+        try:
+            response, prompt, record = self._prepare_answer(user_id, query, chat_history)
+        except Exception as e:
+            logger.error(f"Failed to get response: {str(e)}")
+            raise Exception(str(e))
+        if prompt is None:
+            return RAGStream.from_response(response)
+        
+        tokens = (chunk.content for chunk in self.llm.stream(prompt))
+        return RAGStream(tokens, response, on_complete=record)
+    
+    def get_sources_for_query(self, user_id: int, query: str) -> List[Dict[str, Union[str, float]]]:
         """Get sources used for a query - for reference/citation purposes"""
         try:
             collection_name = self._collection_name(user_id)
             
-            try:
-                collection = self.chroma_client.get_collection(
-                    name=collection_name,
-                    embedding_function=self.embedding_function
-                )
-            except Exception:
-                return []
-            
             # Query collection
-            results = collection.query(
-                query_texts=[query],
-                n_results=5
-            )
-            
-            if not results["documents"][0]:
+            results = self._query_collection(collection_name, query)
+            if results is None or not results["documents"][0]:
                 return []
             
-            # Extract unique sources
-            sources = []
-            seen_urls = set()
-            
-            for metadata in results["metadatas"][0]:
-                url = metadata.get("url")
-                title = metadata.get("title")
-                
-                if url and url not in seen_urls:
-                    seen_urls.add(url)
-                    sources.append({
-                        "url": url,
-                        "title": title
-                    })
-            
-            return sources
+            return self._sources_from_results(results)
             
         except Exception as e:
             logger.error(f"Failed to get sources: {str(e)}")
-            return []
\ No newline at end of file
+            return []
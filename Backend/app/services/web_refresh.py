@@ -0,0 +1,59 @@
+from datetime import timedelta
+from typing import Callable, Optional
+import asyncio
+import logging
+from .executors import get_io_executor
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class WebRefreshScheduler:
+    """Background task that keeps every user's indexed URLs fresh.
+
+    Every ``check_seconds`` it asks the WebRAG service which users have URLs
+    that were not fetched within ``interval_minutes`` and refreshes their
+    collections one user at a time. Since staleness comes from the URL
+    metadata store, the schedule survives restarts. An interval of 0
+    disables the scheduler. The service is resolved through
+    ``get_web_rag_service`` only when a check runs, so starting the
+    scheduler loads nothing.
+    """
+
+    def __init__(self, get_web_rag_service: Callable[[], object], interval_minutes: int, check_seconds: float = 300):
+        self.get_web_rag_service = get_web_rag_service
+        self.interval = timedelta(minutes=interval_minutes)
+        self.check_seconds = min(check_seconds, self.interval.total_seconds()) if interval_minutes > 0 else check_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.interval <= timedelta(0) or self._task is not None:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info(f"Web refresh scheduler started (every {self.interval})")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_seconds)
+            try:
+                io_pool = get_io_executor()
+                web_rag_service = await io_pool.run_waiting(self.get_web_rag_service)
+                user_ids = await io_pool.run_waiting(web_rag_service.users_due_for_refresh, self.interval)
+            except Exception as e:
+                logger.error(f"Could not list URLs due for refresh: {str(e)}")
+                continue
+            for user_id in user_ids:
+                try:
+                    await web_rag_service.refresh_urls(user_id)
+                except Exception as e:
+                    logger.error(f"Scheduled refresh failed for user {user_id}: {str(e)}")
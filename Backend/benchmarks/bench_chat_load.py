@@ -0,0 +1,90 @@
+"""Load test the chat endpoints with concurrent users.
+
+Usage (from the Backend directory, against a running server):
+
+    python -m benchmarks.bench_chat_load --document-id ID [--users 50] [--requests 5]
+    python -m benchmarks.bench_chat_load --web [--users 50] [--requests 5]
+
+Every virtual user sends its requests one after another, and all users run
+at once. The benchmark logs in with --email/--password, registering the
+account first if needed. With --document-id it posts to /chat/ about that
+document (upload it beforehand with the same account); with --web it posts
+to /webrag/chat. Questions get a per-request suffix unless --same-question
+is given, so the answer cache does not serve them all. The report gives
+latency percentiles of successful requests, the number of 503 rejections
+from saturated pools, and the pool counters from /metrics/executors.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import httpx
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post("/api/login", data={"username": email, "password": password})
+    if response.status_code == 401:
+        username = email.split("@")[0]
+        await client.post("/api/register", json={"username": username, "email": email, "password": password})
+        response = await client.post("/api/login", data={"username": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+async def virtual_user(client: httpx.AsyncClient, user: int, args, results: list) -> None:
+    path = "/webrag/chat" if args.web else "/chat/"
+    for i in range(args.requests):
+        question = args.question if args.same_question else f"{args.question} (user {user}, request {i})"
+        body = {"message": question} if args.web else {"document_id": args.document_id, "message": question}
+        started = time.perf_counter()
+        try:
+            response = await client.post(path, json=body)
+            status = response.status_code
+        except httpx.HTTPError:
+            status = None
+        results.append((status, time.perf_counter() - started))
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+async def run(args) -> None:
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        token = await login(client, args.email, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        results = []
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_user(client, user, args, results) for user in range(args.users)))
+        elapsed = time.perf_counter() - started
+        pools = (await client.get("/metrics/executors")).json()
+
+    ok = [seconds * 1000 for status, seconds in results if status == 200]
+    rejected = sum(1 for status, _ in results if status == 503)
+    failed = len(results) - len(ok) - rejected
+    print(f"{args.users} users x {args.requests} requests in {elapsed:.1f}s "
+          f"({len(results) / elapsed:.1f} req/s)")
+    print(f"ok {len(ok)}, rejected (503) {rejected}, failed {failed}")
+    if ok:
+        print(f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'mean ms':>10}")
+        print(f"{percentile(ok, 50):>10.0f}{percentile(ok, 95):>10.0f}{percentile(ok, 99):>10.0f}"
+              f"{max(ok):>10.0f}{statistics.mean(ok):>10.0f}")
+    print(json.dumps(pools, indent=2))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--document-id", type=int)
+    target.add_argument("--web", action="store_true")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--question", default="What are the main points of this content?")
+    parser.add_argument("--same-question", action="store_true")
+    parser.add_argument("--email", default="loadtest@example.org")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--timeout", type=float, default=120)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Benchmark the torch, onnx and onnx-int8 embedding backends.
+
+Usage (from the Backend directory):
+
+    python -m benchmarks.bench_embedding_backend [FILE ...] [--queries N] [--k N]
+
+FILEs are .txt, .md or .pdf files chunked like document ingestion; without
+them the fixture corpus is the repository readme plus every docstring under
+app/. Each backend runs in its own subprocess so load time and peak RSS are
+measured independently. Queries are the opening words of sampled chunks.
+Recall@k is the overlap of each backend's top-k with the torch backend's,
+and cosine is the mean similarity of its chunk vectors to the torch ones.
+"""
+from pathlib import Path
+import argparse
+import ast
+import json
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+def fixture_texts():
+    backend_dir = Path(__file__).resolve().parent.parent
+    texts = [(backend_dir.parent / "readme.md").read_text(encoding="utf-8")]
+    for path in sorted((backend_dir / "app").rglob("*.py")):
+        tree = ast.parse(path.read_text(encoding="utf-8"))
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                docstring = ast.get_docstring(node)
+                if docstring:
+                    texts.append(docstring)
+    return texts
+
+def load_corpus(files):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=500,
+        chunk_overlap=50,
+        separators=["\n\n", "\n", ".", " ", ""]
+    )
+    if not files:
+        texts = fixture_texts()
+    else:
+        texts = []
+        for file in files:
+            if file.lower().endswith(".pdf"):
+                from app.services.pdf_extract import iter_pdf_pages
+                texts.extend(text for _, text in iter_pdf_pages(file))
+            else:
+                texts.append(Path(file).read_text(encoding="utf-8"))
+    return [chunk for text in texts for chunk in splitter.split_text(text) if len(chunk.split()) >= 5]
+
+def run_one(backend: str, corpus_path: str) -> None:
+    from app.services.embedding import EmbeddingEngine
+
+    data = json.loads(Path(corpus_path).read_text())
+    engine = EmbeddingEngine(data["model"], backend=backend)
+    started = time.perf_counter()
+    engine.model.embed_documents(["warm up"])
+    load_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    chunk_vectors = []
+    for i in range(0, len(data["chunks"]), 64):
+        chunk_vectors.extend(engine.model.embed_documents(data["chunks"][i:i + 64]))
+    embed_seconds = time.perf_counter() - started
+
+    query_vectors, latencies = [], []
+    for query in data["queries"]:
+        started = time.perf_counter()
+        query_vectors.append(engine.model.embed_query(query))
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    # ru_maxrss is in KiB on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({
+        "load_seconds": load_seconds,
+        "chunks_per_second": len(chunk_vectors) / embed_seconds,
+        "query_p50_ms": statistics.median(latencies),
+        "peak_rss_mb": peak_rss_mb,
+        "dimensions": len(chunk_vectors[0]),
+        "chunk_vectors": chunk_vectors,
+        "query_vectors": query_vectors,
+    }))
+
+def dot(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+def top_k(query_vector, chunk_vectors, k):
+    scores = [dot(query_vector, vector) for vector in chunk_vectors]
+    return set(sorted(range(len(scores)), key=scores.__getitem__, reverse=True)[:k])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--run", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(args.run, args.files[0])
+        return
+
+    chunks = load_corpus(args.files)
+    rng = random.Random(args.seed)
+    queries = [" ".join(rng.choice(chunks).split()[:12]) for _ in range(args.queries)]
+    print(f"{len(chunks)} chunks, {len(queries)} queries, k={args.k}\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_path = str(Path(tmp) / "corpus.json")
+        Path(corpus_path).write_text(json.dumps({"model": args.model, "chunks": chunks, "queries": queries}))
+
+        results = {}
+        for backend in BACKENDS:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_embedding_backend", corpus_path, "--run", backend],
+                capture_output=True, text=True, check=True
+            ).stdout
+            results[backend] = json.loads(output.strip().splitlines()[-1])
+
+    reference = results["torch"]
+    print(f"{'backend':<12}{'dims':>6}{'load s':>9}{'chunks/s':>10}{'query p50 ms':>14}"
+          f"{'peak RSS MiB':>14}{'recall@k':>10}{'cosine':>8}")
+    for backend, result in results.items():
+        hits = sum(
+            len(top_k(query, result["chunk_vectors"], args.k) & top_k(expected, reference["chunk_vectors"], args.k))
+            for query, expected in zip(result["query_vectors"], reference["query_vectors"])
+        )
+        cosine = statistics.mean(
+            dot(a, b) for a, b in zip(result["chunk_vectors"], reference["chunk_vectors"])
+        )
+        print(f"{backend:<12}{result['dimensions']:>6}{result['load_seconds']:>9.1f}"
+              f"{result['chunks_per_second']:>10.0f}{result['query_p50_ms']:>14.2f}{result['peak_rss_mb']:>14.0f}"
+              f"{hits / (args.k * len(queries)):>10.3f}{cosine:>8.4f}")
+
+if __name__ == "__main__":
+    main()
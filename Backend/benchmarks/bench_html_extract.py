@@ -0,0 +1,101 @@
+"""Benchmark HTML extraction backends against the old BeautifulSoup path.
+
+Usage (from the Backend directory):
+
+    python -m benchmarks.bench_html_extract [PAGES_DIR] [--repeat N]
+
+PAGES_DIR holds saved pages (*.html / *.htm). Without it a synthetic corpus
+of article-like pages with navigation, sidebars and comments is generated.
+"""
+from pathlib import Path
+import argparse
+import random
+import time
+from app.services.html_extract import HTMLExtractor, available_backends
+
+def beautifulsoup_baseline(html: str):
+    """The extraction WebRAGService did before: two parses, multi-pass cleanup"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for script_or_style in soup(['script', 'style', 'nav', 'footer', 'header']):
+        script_or_style.decompose()
+    text = soup.get_text(separator='\n')
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = '\n'.join(chunk for chunk in chunks if chunk)
+
+    soup = BeautifulSoup(html, 'html.parser')
+    title = soup.title.string if soup.title else None
+    return title, text
+
+def synthetic_corpus(pages: int = 50, seed: int = 7):
+    rng = random.Random(seed)
+    words = ("vector index latency cache embedding retrieval document query answer "
+             "model batch chunk context token stream server client page").split()
+
+    def sentence():
+        return " ".join(rng.choice(words) for _ in range(rng.randint(8, 20))).capitalize() + "."
+
+    corpus = []
+    for i in range(pages):
+        nav = "".join(f'<li><a href="/section/{j}">Section {j}</a></li>' for j in range(30))
+        paragraphs = "".join(
+            f"<p>{' '.join(sentence() for _ in range(5))} <a href='/ref/{j}'>ref</a></p>"
+            for j in range(rng.randint(20, 60))
+        )
+        comments = "".join(
+            f'<div class="comment"><span>user{j}</span><p>{sentence()}</p></div>' for j in range(20)
+        )
+        corpus.append(f"""<!DOCTYPE html><html><head><title>Article {i}</title>
+<style>body {{ font-family: sans-serif; }}</style><script>var tracking = {i};</script></head>
+<body><header><h1>Site</h1></header><nav><ul>{nav}</ul></nav>
+<div class="sidebar"><ul>{nav}</ul></div>
+<article><h2>Article {i}</h2>{paragraphs}</article>
+<section id="comments">{comments}</section><footer>Copyright</footer></body></html>""")
+    return corpus
+
+def load_corpus(directory: str):
+    paths = sorted(p for p in Path(directory).rglob("*") if p.suffix.lower() in (".html", ".htm"))
+    return [p.read_text(encoding="utf-8", errors="replace") for p in paths]
+
+def bench(name, fn, corpus, repeat):
+    best = float("inf")
+    text_chars = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        text_chars = sum(len(fn(html)) for html in corpus)
+        best = min(best, time.perf_counter() - started)
+    per_page_ms = best / len(corpus) * 1000
+    return name, per_page_ms, text_chars
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages_dir", nargs="?")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.pages_dir) if args.pages_dir else synthetic_corpus()
+    if not corpus:
+        raise SystemExit(f"No .html files found in {args.pages_dir}")
+    total_kb = sum(len(html) for html in corpus) / 1024
+    print(f"{len(corpus)} pages, {total_kb:.0f} KiB, best of {args.repeat} runs\n")
+
+    rows = []
+    try:
+        rows.append(bench("beautifulsoup (old)", lambda html: beautifulsoup_baseline(html)[1], corpus, args.repeat))
+    except ImportError:
+        print("bs4 not installed, skipping the baseline\n")
+    for backend in available_backends():
+        for readability in (False, True):
+            extractor = HTMLExtractor(backend, readability)
+            label = backend + (" +readability" if readability else "")
+            rows.append(bench(label, lambda html: extractor.extract(html).text, corpus, args.repeat))
+
+    baseline = rows[0][1]
+    print(f"{'extractor':<28}{'ms/page':>10}{'speedup':>10}{'text chars':>14}")
+    for name, per_page_ms, text_chars in rows:
+        print(f"{name:<28}{per_page_ms:>10.2f}{baseline / per_page_ms:>9.1f}x{text_chars:>14}")
+
+if __name__ == "__main__":
+    main()
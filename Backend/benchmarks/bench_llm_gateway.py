@@ -0,0 +1,197 @@
+"""Benchmark LLM calls through the shared gateway against per-call requests.post.
+
+Usage (from the Backend directory):
+
+    python -m benchmarks.bench_llm_gateway [--calls N] [--concurrency N] [--latency-ms MS] [--error-rate P]
+    python -m benchmarks.bench_llm_gateway --serve PORT
+
+The benchmark starts a local mock of the OpenAI-compatible chat completions
+API that answers after --latency-ms and fails a fraction --error-rate of
+requests with 429. "requests" is the old NLToSQLService path: one
+requests.post per call, without a session. "gateway" calls
+LLMGateway.complete from worker threads, as the services do on the I/O
+pool. "gateway-async" awaits LLMGateway.acomplete from one event loop.
+Connections counts the TCP connections the mock accepted; over HTTPS each
+one is also a TLS handshake. --serve runs the mock on its own so the API
+can be pointed at it with LLM_API_BASE=http://127.0.0.1:PORT/v1.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from typing import Tuple
+
+class MockChatServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, port: int, latency: float, error_rate: float):
+        super().__init__(("127.0.0.1", port), MockChatHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.connections = set()
+        self.requests = 0
+        self.lock = threading.Lock()
+
+class MockChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        self._send(200, json.dumps({"connections": len(server.connections), "requests": server.requests}).encode())
+
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.connections.add(self.client_address)
+            server.requests += 1
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(server.latency)
+        if random.random() < server.error_rate:
+            self._send(429, b'{"error": "rate limited"}', headers={"Retry-After": "0"})
+            return
+
+        answer = f"Mock answer to: {payload['messages'][-1]['content'][:40]}"
+        if not payload.get("stream"):
+            body = {"choices": [{"index": 0, "message": {"role": "assistant", "content": answer}}]}
+            self._send(200, json.dumps(body).encode())
+            return
+        events = [
+            f"data: {json.dumps({'choices': [{'index': 0, 'delta': {'content': word + ' '}}]})}\n\n"
+            for word in answer.split()
+        ]
+        self._send(200, ("".join(events) + "data: [DONE]\n\n").encode(), "text/event-stream")
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_mock(args) -> Tuple[subprocess.Popen, str]:
+    """Run the mock in its own process so it does not compete with the client for the GIL"""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_llm_gateway", "--serve", str(port),
+         "--latency-ms", str(args.latency_ms), "--error-rate", str(args.error_rate)],
+        stdout=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return process, f"http://127.0.0.1:{port}"
+
+MESSAGES = [{"role": "user", "content": "How many albums did AC/DC release?"}]
+
+def run_requests(base_url: str, args) -> list:
+    import requests
+
+    def call(_):
+        started = time.perf_counter()
+        for attempt in range(4):
+            response = requests.post(f"{base_url}/chat/completions", json={"model": "mock", "messages": MESSAGES})
+            if response.status_code != 429:
+                break
+        response.raise_for_status()
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        return list(pool.map(call, range(args.calls)))
+
+def make_gateway(base_url: str, args):
+    from app.services.llm import LLMGateway
+    return LLMGateway(base_url, "mock-key", max_concurrency=args.concurrency,
+                      max_connections=args.concurrency, backoff_base=0.01)
+
+def run_gateway(base_url: str, args) -> list:
+    gateway = make_gateway(base_url, args)
+
+    def call(_):
+        started = time.perf_counter()
+        gateway.complete(MESSAGES, "mock")
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        latencies = list(pool.map(call, range(args.calls)))
+    gateway.close()
+    return latencies
+
+def run_gateway_async(base_url: str, args) -> list:
+    gateway = make_gateway(base_url, args)
+
+    async def call():
+        started = time.perf_counter()
+        await gateway.acomplete(MESSAGES, "mock")
+        return time.perf_counter() - started
+
+    async def main():
+        return await asyncio.gather(*(call() for _ in range(args.calls)))
+
+    latencies = asyncio.run(main())
+    gateway.close()
+    return latencies
+
+VARIANTS = {"requests": run_requests, "gateway": run_gateway, "gateway-async": run_gateway_async}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--serve", type=int, metavar="PORT")
+    args = parser.parse_args()
+
+    if args.serve:
+        server = MockChatServer(args.serve, args.latency_ms / 1000, args.error_rate)
+        print(f"Mock chat completions API on http://127.0.0.1:{args.serve}/v1", flush=True)
+        server.serve_forever()
+        return
+
+    # Per-request and retry log lines would drown the table
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("app.services.llm").setLevel(logging.ERROR)
+    print(f"{args.calls} calls, concurrency {args.concurrency}, latency {args.latency_ms:.0f} ms, "
+          f"429 rate {args.error_rate:.0%}\n")
+    print(f"{'variant':<15}{'calls/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'connections':>13}{'requests':>10}")
+    for name, run in VARIANTS.items():
+        process, server_url = start_mock(args)
+        try:
+            started = time.perf_counter()
+            latencies = sorted(seconds * 1000 for seconds in run(f"{server_url}/v1", args))
+            elapsed = time.perf_counter() - started
+            with urllib.request.urlopen(f"{server_url}/stats") as response:
+                counts = json.loads(response.read())
+        finally:
+            process.terminate()
+            process.wait()
+        print(f"{name:<15}{len(latencies) / elapsed:>9.0f}{statistics.median(latencies):>9.1f}"
+              f"{latencies[int(0.99 * (len(latencies) - 1))]:>9.1f}{counts['connections']:>13}{counts['requests']:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark spreadsheet chunking: DataFrame.to_string vs streamed row groups.
+
+Usage (from the Backend directory):
+
+    python -m benchmarks.bench_spreadsheet_ingest [FILE] [--rows N] [--cols N]
+
+FILE is a .csv or .xlsx file; without it a CSV with ``--rows`` rows is
+generated in a temporary directory. Each path runs in its own subprocess so
+peak RSS is measured independently. Token counts are estimated as
+characters / 4; the embedding step itself is not timed.
+"""
+from pathlib import Path
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+def old_path(file_path: str, file_type: str):
+    import pandas as pd
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=500,
+        chunk_overlap=50,
+        separators=["\n\n", "\n", ".", " ", ""]
+    )
+    df = pd.read_csv(file_path) if file_type == "csv" else pd.read_excel(file_path)
+    chunks = splitter.split_text(df.to_string(index=False))
+    return len(chunks), sum(len(chunk) for chunk in chunks)
+
+def new_path(file_path: str, file_type: str):
+    from app.services.tabular_extract import iter_table_chunks
+
+    count = chars = 0
+    for chunk, _ in iter_table_chunks(file_path, file_type):
+        count += 1
+        chars += len(chunk)
+    return count, chars
+
+def run_one(path_name: str, file_path: str) -> None:
+    file_type = Path(file_path).suffix.lstrip(".").lower()
+    started = time.perf_counter()
+    chunks, chars = (old_path if path_name == "old" else new_path)(file_path, file_type)
+    elapsed = time.perf_counter() - started
+    # ru_maxrss is in KiB on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"seconds": elapsed, "chunks": chunks, "chars": chars, "peak_rss_mb": peak_rss_mb}))
+
+def generate_csv(path: Path, rows: int, cols: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    regions = ["north", "south", "east", "west"]
+    with open(path, "w") as file:
+        file.write(",".join(["order_id", "region", "customer"] + [f"metric_{i}" for i in range(cols - 3)]) + "\n")
+        for i in range(rows):
+            values = [str(i), rng.choice(regions), f"customer_{rng.randint(1, 5000)}"]
+            values += [f"{rng.uniform(0, 1000):.2f}" for _ in range(cols - 3)]
+            file.write(",".join(values) + "\n")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", nargs="?")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--cols", type=int, default=12)
+    parser.add_argument("--run", choices=["old", "new"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(args.run, args.file)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = args.file
+        if file_path is None:
+            file_path = str(Path(tmp) / "bench.csv")
+            generate_csv(Path(file_path), args.rows, args.cols)
+        size_mb = Path(file_path).stat().st_size / 1024 / 1024
+        print(f"{file_path}: {size_mb:.1f} MiB\n")
+
+        print(f"{'path':<22}{'seconds':>10}{'chunks':>10}{'est. tokens':>14}{'peak RSS MiB':>14}")
+        for name, label in (("old", "to_string + splitter"), ("new", "row groups")):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_spreadsheet_ingest", file_path, "--run", name],
+                capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{label:<22}{result['seconds']:>10.2f}{result['chunks']:>10}"
+                  f"{result['chars'] // 4:>14}{result['peak_rss_mb']:>14.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Microbenchmark the NL-to-SQL request path up to the LLM call.
+
+Usage (from the Backend directory, with a configured .env):
+
+    python -m benchmarks.bench_sql_schema [--db PATH | --tables N] [--iterations N]
+
+Times what every /query request did before calling the model: "before"
+reproduces the old get_table_schema (a new connection, sqlite_master and
+one PRAGMA table_info per table) plus formatting the prompt; "after" is
+NLToSQLService.build_sql_prompt on a warm schema cache, which stats the
+file and appends the question to a precomputed prefix. "cold" is the first
+call, which introspects foreign keys, row counts and sample values. --db
+defaults to Chinook.db; --tables N benchmarks a generated database with N
+tables of 12 columns instead.
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+QUESTION = "How many albums did AC/DC release?"
+
+def legacy_prompt(db_path: str, question: str) -> str:
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+    schema_info = []
+    for (table_name,) in cursor.fetchall():
+        cursor.execute(f'PRAGMA table_info("{table_name}");')
+        columns_info = [f"{col[1]} ({col[2]})" for col in cursor.fetchall()]
+        schema_info.append(f"Table {table_name}:\n" + "\n".join(columns_info))
+    conn.close()
+    schema = "\n\n".join(schema_info)
+    return f"""You are an SQL expert. Convert this natural language query to a valid SQLite query using this schema:
+
+{schema}
+
+Query to convert: "{question}"
+
+Return the SQL query:"""
+
+def generate_database(path: str, tables: int) -> None:
+    conn = sqlite3.connect(path)
+    for i in range(tables):
+        columns = ", ".join(
+            [f"id INTEGER PRIMARY KEY", f"parent_id INTEGER REFERENCES t{max(i - 1, 0)}(id)"]
+            + [f"name_{j} TEXT" for j in range(5)] + [f"value_{j} REAL" for j in range(5)]
+        )
+        conn.execute(f"CREATE TABLE t{i} ({columns})")
+        conn.executemany(
+            f"INSERT INTO t{i} (parent_id, name_0, name_1, value_0) VALUES (?, ?, ?, ?)",
+            [(row, f"name {row}", f"label {row % 7}", row * 1.5) for row in range(100)]
+        )
+    conn.commit()
+    conn.close()
+
+def timed(fn, iterations: int):
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - started) * 1e6)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="Chinook.db")
+    parser.add_argument("--tables", type=int)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    from app.services.nl_to_sql import NLToSQLService
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db
+        if args.tables:
+            db_path = os.path.join(tmp, "generated.db")
+            generate_database(db_path, args.tables)
+
+        service = NLToSQLService(db_path=db_path, examples=False)
+        started = time.perf_counter()
+        prompt = service.build_sql_prompt(QUESTION)
+        cold_ms = (time.perf_counter() - started) * 1000
+
+        tables = len(service.schema_cache.get(db_path).tables)
+        legacy_chars = len(legacy_prompt(db_path, QUESTION))
+        before = timed(lambda: legacy_prompt(db_path, QUESTION), args.iterations)
+        after = timed(lambda: service.build_sql_prompt(QUESTION), args.iterations)
+
+    print(f"{tables} tables, prompt {legacy_chars} chars before and {len(prompt)} after "
+          f"(keys, row counts, samples), cold introspection {cold_ms:.1f} ms\n")
+    print(f"{'path':<8}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}")
+    for name, latencies in (("before", before), ("after", after)):
+        latencies.sort()
+        print(f"{name:<8}{statistics.mean(latencies):>10.1f}{statistics.median(latencies):>10.1f}"
+              f"{latencies[int(0.99 * (len(latencies) - 1))]:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Compare NL-to-SQL prompts built from the whole schema and from a retrieved subset.
+
+Usage (from the Backend directory, with a configured .env):
+
+    python -m benchmarks.bench_sql_subset [--tables N] [--iterations N] [--llm]
+
+Generates a warehouse-like database of --tables tables (20 entities such
+as orders, invoices and tickets repeated per business unit, joined by
+foreign keys) and builds the SQL prompt for a fixed set of questions in
+both modes: "full" sends every table, "subset" the tables SchemaRetriever
+picks plus their foreign key neighbours. Reports tables and tokens per
+prompt (tiktoken's cl100k_base when installed, else characters / 4), the
+time to build a prompt on a warm index, and recall, the share of the
+tables each question needs that made it into the prompt. The first subset
+prompt also embeds every table description; that is reported as the index
+build. --llm additionally times generate_sql_query end to end (SQL
+generation, execution and the natural language answer) against the
+configured LLM API.
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+ENTITIES = {
+    "customers": ["customer_name TEXT", "email TEXT", "country TEXT", "segment TEXT"],
+    "orders": ["customer_id INTEGER REFERENCES {unit}_customers(id)", "order_date TEXT", "status TEXT",
+               "total_amount REAL"],
+    "order_items": ["order_id INTEGER REFERENCES {unit}_orders(id)",
+                    "product_id INTEGER REFERENCES {unit}_products(id)", "quantity INTEGER", "unit_price REAL"],
+    "products": ["product_name TEXT", "category TEXT", "list_price REAL"],
+    "invoices": ["order_id INTEGER REFERENCES {unit}_orders(id)", "invoice_date TEXT", "amount_due REAL"],
+    "payments": ["invoice_id INTEGER REFERENCES {unit}_invoices(id)", "paid_at TEXT", "amount REAL",
+                 "method TEXT"],
+    "refunds": ["payment_id INTEGER REFERENCES {unit}_payments(id)", "reason TEXT", "amount REAL"],
+    "shipments": ["order_id INTEGER REFERENCES {unit}_orders(id)",
+                  "warehouse_id INTEGER REFERENCES {unit}_warehouses(id)", "carrier TEXT", "shipped_at TEXT"],
+    "warehouses": ["warehouse_name TEXT", "city TEXT"],
+    "stock_levels": ["product_id INTEGER REFERENCES {unit}_products(id)",
+                     "warehouse_id INTEGER REFERENCES {unit}_warehouses(id)", "on_hand INTEGER"],
+    "suppliers": ["supplier_name TEXT", "country TEXT"],
+    "purchase_orders": ["supplier_id INTEGER REFERENCES {unit}_suppliers(id)", "ordered_at TEXT",
+                        "total_cost REAL"],
+    "employees": ["employee_name TEXT", "title TEXT", "hired_at TEXT"],
+    "tickets": ["customer_id INTEGER REFERENCES {unit}_customers(id)",
+                "employee_id INTEGER REFERENCES {unit}_employees(id)", "priority TEXT", "opened_at TEXT"],
+    "campaigns": ["campaign_name TEXT", "channel TEXT", "budget REAL"],
+    "sessions": ["customer_id INTEGER REFERENCES {unit}_customers(id)",
+                 "campaign_id INTEGER REFERENCES {unit}_campaigns(id)", "started_at TEXT", "page_views INTEGER"],
+    "contracts": ["customer_id INTEGER REFERENCES {unit}_customers(id)", "start_date TEXT", "end_date TEXT",
+                  "annual_value REAL"],
+    "budgets": ["department TEXT", "fiscal_year INTEGER", "amount REAL"],
+    "regions": ["region_name TEXT", "country TEXT"],
+    "returns": ["order_item_id INTEGER REFERENCES {unit}_order_items(id)", "reason TEXT", "returned_at TEXT"],
+}
+
+UNITS = ["retail", "wholesale", "emea", "apac", "americas", "online", "b2b", "outlet", "franchise", "marketplace",
+         "subscription", "enterprise", "education", "government", "healthcare", "travel", "media", "gaming",
+         "energy", "logistics"]
+
+# Columns every warehouse table carries from the load pipeline
+AUDIT_COLUMNS = ["created_at TEXT", "updated_at TEXT", "source_system TEXT", "batch_id INTEGER",
+                 "is_deleted INTEGER", "etl_loaded_at TEXT"]
+
+QUESTIONS = [
+    ("What was the total refund amount per reason in the gaming business?", {"gaming_refunds"}),
+    ("Which healthcare suppliers received the most purchase orders?",
+     {"healthcare_suppliers", "healthcare_purchase_orders"}),
+    ("How many tickets did each employee handle in emea?", {"emea_tickets", "emea_employees"}),
+    ("List the top 5 online products by quantity sold", {"online_products", "online_order_items"}),
+    ("Average page views per session for each media campaign channel", {"media_sessions", "media_campaigns"}),
+    ("Current retail stock on hand per warehouse city", {"retail_stock_levels", "retail_warehouses"}),
+]
+
+def generate_database(path: str, tables: int) -> None:
+    conn = sqlite3.connect(path)
+    names = [(unit, entity) for unit in UNITS for entity in ENTITIES][:tables]
+    for unit, entity in names:
+        columns = ["id INTEGER PRIMARY KEY"] + [column.format(unit=unit) for column in ENTITIES[entity]] + AUDIT_COLUMNS
+        conn.execute(f"CREATE TABLE {unit}_{entity} ({', '.join(columns)})")
+        text_columns = [column.split()[0] for column in ENTITIES[entity] if column.endswith("TEXT")]
+        if text_columns:
+            conn.executemany(
+                f"INSERT INTO {unit}_{entity} ({', '.join(text_columns)}) VALUES ({', '.join('?' * len(text_columns))})",
+                [tuple(f"{column.split('_')[0]} {row}" for column in text_columns) for row in range(20)]
+            )
+    conn.commit()
+    conn.close()
+
+def token_counter():
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text)), "tokens"
+    except ImportError:
+        return lambda text: len(text) // 4, "~tokens"
+
+def percentile(values, fraction: float) -> float:
+    values = sorted(values)
+    return values[int(fraction * (len(values) - 1))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=400)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--llm", action="store_true")
+    args = parser.parse_args()
+
+    from app.services.nl_to_sql import NLToSQLService
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    count_tokens, unit = token_counter()
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "warehouse.db")
+        generate_database(db_path, args.tables)
+
+        for mode in ("full", "subset"):
+            service = NLToSQLService(db_path=db_path, examples=False, schema_subset=mode == "subset")
+            started = time.perf_counter()
+            service.build_sql_prompt(QUESTIONS[0][0])
+            cold_ms = (time.perf_counter() - started) * 1000
+            # Per-question selections would drown the table
+            logging.getLogger().setLevel(logging.WARNING)
+
+            tables, tokens, recall, build_ms = [], [], [], []
+            for question, needed in QUESTIONS:
+                snapshot = service.schema_cache.get(db_path)
+                selected = service.select_tables(snapshot, question) or list(snapshot.tables)
+                prompt = service.build_sql_prompt(question)
+                tables.append(len(selected))
+                tokens.append(count_tokens(prompt))
+                recall.append(len(needed & set(selected)) / len(needed))
+                for _ in range(args.iterations):
+                    started = time.perf_counter()
+                    service.build_sql_prompt(question)
+                    build_ms.append((time.perf_counter() - started) * 1000)
+
+            end_to_end_ms, errors = [], 0
+            if args.llm:
+                for question, _ in QUESTIONS:
+                    started = time.perf_counter()
+                    try:
+                        service.generate_sql_query(question)
+                    except Exception:
+                        # Still a full round trip; the generated SQL did not run on this schema
+                        errors += 1
+                    end_to_end_ms.append((time.perf_counter() - started) * 1000)
+            logging.getLogger().setLevel(logging.INFO)
+            rows.append((mode, tables, tokens, recall, build_ms, cold_ms, end_to_end_ms, errors))
+
+    print(f"{args.tables} tables, {len(QUESTIONS)} questions\n")
+    header = f"{'mode':<8}{'tables':>8}{unit:>10}{'recall':>8}{'build p50 ms':>14}{'cold ms':>9}"
+    if args.llm:
+        header += f"{'e2e p50 ms':>12}{'e2e p95 ms':>12}{'errors':>8}"
+    print(header)
+    for mode, tables, tokens, recall, build_ms, cold_ms, end_to_end_ms, errors in rows:
+        line = (f"{mode:<8}{statistics.mean(tables):>8.1f}{statistics.mean(tokens):>10.0f}"
+                f"{statistics.mean(recall):>8.0%}{statistics.median(build_ms):>14.2f}{cold_ms:>9.1f}")
+        if args.llm:
+            line += (f"{statistics.median(end_to_end_ms):>12.0f}{percentile(end_to_end_ms, 0.95):>12.0f}"
+                     f"{errors:>8}")
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Benchmark API cold start: import time, first request and service warm-up.
+
+Usage (from the Backend directory, with a configured .env):
+
+    python -m benchmarks.bench_startup [--repeat N]
+
+Every measurement runs in a fresh subprocess. "eager" reproduces the old
+import path, which built RAGService twice, WebRAGService, NLToSQLService
+and two TabularServices while importing the routers. "lazy" is the current
+path: importing app.main builds nothing, and the first request that needs
+a service pays for it (reported as first rag/web_rag, including the
+embedding model load). "warm" calls ServiceRegistry.warm_up, as
+WARMUP_ON_STARTUP or POST /warmup do.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+MODES = ("eager", "lazy", "warm")
+
+def run_one(mode: str) -> None:
+    result = {}
+    started = time.perf_counter()
+    from app.main import app
+    result["import_s"] = time.perf_counter() - started
+
+    from app.services.registry import registry
+    if mode == "eager":
+        started = time.perf_counter()
+        from app.services.rag import RAGService
+        from app.services.web_rag import WebRAGService
+        from app.services.nl_to_sql import NLToSQLService
+        from app.services.tabular import TabularService
+        RAGService(), RAGService(), WebRAGService(), NLToSQLService(), TabularService(), TabularService()
+        result["import_s"] += time.perf_counter() - started
+
+    from fastapi.testclient import TestClient
+    with TestClient(app) as client:
+        started = time.perf_counter()
+        client.get("/")
+        result["first_request_s"] = time.perf_counter() - started
+
+        if mode == "warm":
+            started = time.perf_counter()
+            registry.warm_up()
+            result["warm_up_s"] = time.perf_counter() - started
+
+        # What the first chat and web chat requests pay before retrieval
+        for name in ("rag", "web_rag"):
+            started = time.perf_counter()
+            registry.get(name).embedding_engine.embed_query("warm up")
+            result[f"first_{name}_s"] = time.perf_counter() - started
+    print(json.dumps(result))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--run", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(args.run)
+        return
+
+    columns = ("import_s", "first_request_s", "warm_up_s", "first_rag_s", "first_web_rag_s")
+    print(f"{'mode':<8}" + "".join(f"{column:>17}" for column in columns))
+    for mode in MODES:
+        runs = []
+        for _ in range(args.repeat):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_startup", "--run", mode],
+                capture_output=True, text=True, check=True
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        row = f"{mode:<8}"
+        for column in columns:
+            values = [run[column] for run in runs if column in run]
+            row += f"{statistics.median(values):>17.3f}" if values else f"{'-':>17}"
+        print(row)
+
+if __name__ == "__main__":
+    main()
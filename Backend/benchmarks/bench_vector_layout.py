@@ -0,0 +1,120 @@
+"""Benchmark the per-document and shared Chroma layouts.
+
+Usage (from the Backend directory):
+
+    python -m benchmarks.bench_vector_layout [--documents N] [--chunks N] [--queries N]
+
+Builds the same synthetic corpus (random unit vectors, no embedding model)
+in both layouts under a temporary directory and reports build time, disk
+footprint, ``list_collections`` time and per-request query latency. A
+per-document request pays for ``get_collection`` plus the query, as
+RAGService does; a shared request is one query filtered on ``document_id``.
+Recall is measured against exact top-k within the document.
+"""
+from pathlib import Path
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import chromadb
+
+DIMENSIONS = 384
+
+def unit_vector(rng: random.Random):
+    vector = [rng.gauss(0, 1) for _ in range(DIMENSIONS)]
+    norm = sum(value * value for value in vector) ** 0.5
+    return [value / norm for value in vector]
+
+def disk_mb(path: str) -> float:
+    return sum(file.stat().st_size for file in Path(path).rglob("*") if file.is_file()) / 1024 / 1024
+
+def exact_top_k(vectors, query, k):
+    distances = [sum((a - b) ** 2 for a, b in zip(vector, query)) for vector in vectors]
+    return sorted(range(len(vectors)), key=distances.__getitem__)[:k]
+
+def build(layout: str, path: str, corpus, batch_size: int) -> float:
+    client = chromadb.PersistentClient(path=path, settings=chromadb.Settings(anonymized_telemetry=False))
+    started = time.perf_counter()
+    if layout == "shared":
+        collection = client.get_or_create_collection("documents")
+        ids, embeddings, metadatas = [], [], []
+        for document_id, vectors in enumerate(corpus):
+            for index, vector in enumerate(vectors):
+                ids.append(f"{document_id}-{index}")
+                embeddings.append(vector)
+                metadatas.append({"document_id": document_id})
+            if len(ids) >= batch_size:
+                collection.add(ids=ids, embeddings=embeddings, metadatas=metadatas)
+                ids, embeddings, metadatas = [], [], []
+        if ids:
+            collection.add(ids=ids, embeddings=embeddings, metadatas=metadatas)
+    else:
+        for document_id, vectors in enumerate(corpus):
+            collection = client.get_or_create_collection(f"doc_{document_id}")
+            collection.add(
+                ids=[f"{document_id}-{index}" for index in range(len(vectors))],
+                embeddings=vectors,
+                metadatas=[{"document_id": document_id}] * len(vectors)
+            )
+    return time.perf_counter() - started
+
+def measure(layout: str, path: str, corpus, queries, k: int):
+    # A fresh client, as a new server process would have
+    client = chromadb.PersistentClient(path=path, settings=chromadb.Settings(anonymized_telemetry=False))
+    started = time.perf_counter()
+    collections = client.list_collections()
+    list_ms = (time.perf_counter() - started) * 1000
+
+    latencies, hits, expected = [], 0, 0
+    for document_id, query in queries:
+        started = time.perf_counter()
+        if layout == "shared":
+            collection = client.get_collection("documents")
+            results = collection.query(query_embeddings=[query], n_results=k, where={"document_id": document_id})
+        else:
+            collection = client.get_collection(f"doc_{document_id}")
+            results = collection.query(query_embeddings=[query], n_results=k)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        exact = {f"{document_id}-{index}" for index in exact_top_k(corpus[document_id], query, k)}
+        hits += len(exact & set(results["ids"][0]))
+        expected += len(exact)
+
+    latencies.sort()
+    return {
+        "collections": len(collections),
+        "list_ms": list_ms,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "recall": hits / expected,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=10_000)
+    parser.add_argument("--chunks", type=int, default=20, help="chunks per document")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [[unit_vector(rng) for _ in range(args.chunks)] for _ in range(args.documents)]
+    queries = [(rng.randrange(args.documents), unit_vector(rng)) for _ in range(args.queries)]
+    print(f"{args.documents} documents x {args.chunks} chunks, {args.queries} queries, k={args.k}\n")
+
+    print(f"{'layout':<14}{'build s':>9}{'disk MiB':>10}{'collections':>13}{'list ms':>9}"
+          f"{'p50 ms':>8}{'p95 ms':>8}{'recall':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for layout in ("per_document", "shared"):
+            path = os.path.join(tmp, layout)
+            build_seconds = build(layout, path, corpus, batch_size=5000)
+            result = measure(layout, path, corpus, queries, args.k)
+            print(f"{layout:<14}{build_seconds:>9.1f}{disk_mb(path):>10.1f}{result['collections']:>13}"
+                  f"{result['list_ms']:>9.1f}{result['p50_ms']:>8.2f}{result['p95_ms']:>8.2f}{result['recall']:>8.3f}")
+
+if __name__ == "__main__":
+    main()
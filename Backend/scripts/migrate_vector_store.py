@@ -0,0 +1,40 @@
+"""Move per-document Chroma collections into the shared collection.
+
+Usage (from the Backend directory, with the server stopped):
+
+    python -m scripts.migrate_vector_store [--persist-directory chroma_db] [--keep-source]
+
+Every ``doc_<id>`` collection is copied with its embeddings into the
+``documents`` collection and then deleted, unless --keep-source is given.
+Nothing is re-embedded, and running the command again resumes with the
+collections that are left. Set VECTOR_STORE_LAYOUT=shared afterwards.
+"""
+import argparse
+import time
+
+from app.services.rag import RAGService
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persist-directory", default="chroma_db")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--keep-source", action="store_true", help="keep the per-document collections")
+    args = parser.parse_args()
+
+    # The LLM is never called during migration
+    service = RAGService(persist_directory=args.persist_directory, llm=object(), layout="shared")
+
+    started = time.perf_counter()
+    def on_progress(document_id: int, done: int, total: int):
+        print(f"[{done}/{total}] document {document_id}")
+
+    result = service.migrate_to_shared_layout(
+        batch_size=args.batch_size,
+        keep_source=args.keep_source,
+        progress_callback=on_progress
+    )
+    print(f"Migrated {result['documents']} documents ({result['chunks']} chunks) "
+          f"in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional
+import threading
+import tempfile
+import time
+import os
+import pytest
+
+# Settings without defaults. A file database, because streamed responses are saved from another thread
+TEST_DATABASE = os.path.join(tempfile.gettempdir(), f"docmind-test-{os.getpid()}.db")
+for name, value in {
+    "DATABASE_URL": f"sqlite:///{TEST_DATABASE}",
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "GROQ_API_KEY": "test-key",
+    "DATABASE_QUERY_URL": "sqlite://",
+}.items():
+    os.environ.setdefault(name, value)
+
+def pytest_sessionfinish(session, exitstatus):
+    if os.path.exists(TEST_DATABASE):
+        os.remove(TEST_DATABASE)
+
+class FakeChatModel:
+    """Chat model with the ``invoke``/``stream`` interface that answers with fixed tokens.
+
+    With ``fail_after`` set, streaming raises after that many tokens.
+    """
+
+    def __init__(self, tokens: List[str], fail_after: Optional[int] = None):
+        self.tokens = tokens
+        self.fail_after = fail_after
+        self.prompts: List[str] = []
+
+    def invoke(self, prompt: str):
+        from app.services.llm import LLMMessage
+        self.prompts.append(prompt)
+        return LLMMessage("".join(self.tokens))
+
+    def stream(self, prompt: str) -> Iterator:
+        from app.services.llm import LLMError, LLMMessage
+        self.prompts.append(prompt)
+        for index, token in enumerate(self.tokens):
+            if index == self.fail_after:
+                raise LLMError("model failed mid-stream")
+            yield LLMMessage(token)
+
+@dataclass
+class FakeResponse:
+    status: int = 200
+    body: bytes = b""
+    headers: Dict[str, str] = field(default_factory=dict)
+    delay: float = 0.0
+
+@dataclass
+class RecordedRequest:
+    method: str
+    path: str
+    headers: Dict[str, str]
+    body: bytes
+    received_at: float
+
+class FakeServer(ThreadingHTTPServer):
+    """Local HTTP server whose answers are produced by ``respond(request)``.
+
+    Records every request and the peak number of concurrent requests,
+    overall and per Host header.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _FakeHandler)
+        self.respond: Callable[[RecordedRequest], FakeResponse] = lambda request: FakeResponse(404)
+        self.requests: List[RecordedRequest] = []
+        self.lock = threading.Lock()
+        self.in_flight: Dict[str, int] = {}
+        self.max_in_flight = 0
+        self.max_in_flight_per_host: Dict[str, int] = {}
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def script(self, *responses: FakeResponse) -> None:
+        """Answer with ``responses`` in order, repeating the last one"""
+        queue = list(responses)
+
+        def respond(request):
+            with self.lock:
+                return queue.pop(0) if len(queue) > 1 else queue[0]
+        self.respond = respond
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _handle(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        request = RecordedRequest(self.command, self.path, dict(self.headers), self.rfile.read(length), time.monotonic())
+        host = self.headers.get("Host", "").split(":")[0]
+        with server.lock:
+            server.requests.append(request)
+            server.in_flight[host] = server.in_flight.get(host, 0) + 1
+            server.max_in_flight = max(server.max_in_flight, sum(server.in_flight.values()))
+            server.max_in_flight_per_host[host] = max(
+                server.max_in_flight_per_host.get(host, 0), server.in_flight[host]
+            )
+        try:
+            response = server.respond(request)
+            time.sleep(response.delay)
+            self.send_response(response.status)
+            headers = {"Content-Type": "application/json", **response.headers}
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(response.body)))
+            self.end_headers()
+            self.wfile.write(response.body)
+        finally:
+            with server.lock:
+                server.in_flight[host] -= 1
+
+    do_GET = do_POST = _handle
+
+@pytest.fixture
+def fake_server():
+    server = FakeServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def rag_service(tmp_path):
+    """RAGService on a temporary Chroma directory, without models or an LLM"""
+    chromadb = pytest.importorskip("chromadb")
+    pytest.importorskip("langchain")
+    pytest.importorskip("pandas")
+    from app.services.cache import RetrievalCache
+    from app.services.rag import RAGService
+
+    service = RAGService.__new__(RAGService)
+    service.persist_directory = str(tmp_path)
+    service.collection_name_template = "doc_{document_id}"
+    service.layout = "per_document"
+    service.manifest_directory = str(tmp_path / "manifests")
+    os.makedirs(service.manifest_directory)
+    service._shared_collection = None
+    service.embedding_function = None
+    service.lexical_store = None
+    service.reranker = None
+    service.answer_cache = None
+    service.retrieval_cache = RetrievalCache(str(tmp_path / "retrieval"))
+    service.chroma_client = chromadb.PersistentClient(
+        path=str(tmp_path / "chroma"), settings=chromadb.Settings(anonymized_telemetry=False)
+    )
+    return service
@@ -0,0 +1,125 @@
+from types import SimpleNamespace
+import json
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import chat, web_chat
+from app.database import Base, SessionLocal, engine
+from app.models.chat import ChatHistory, WebChatHistory
+from app.models import document, query, user  # noqa: F401  (every mapped class, for the relationships)
+from app.services.auth import AuthService
+from app.services.registry import get_rag_service, get_tabular_service, get_web_rag_service
+from app.services.retrieval import RAGResponse, RAGStream
+from conftest import FakeChatModel
+
+SOURCES = [{"url": "https://example.com/a", "title": "A", "distance": 0.1}]
+
+class FakeRAGService:
+    """Streams answers from a fake chat model, as the RAG services do from the LLM"""
+
+    def __init__(self, model: FakeChatModel, sources=None):
+        self.model = model
+        self.sources = sources or []
+        self.completed = []
+
+    def stream_response(self, query: str, **kwargs) -> RAGStream:
+        tokens = (chunk.content for chunk in self.model.stream(query))
+        return RAGStream(tokens, RAGResponse("", sources=list(self.sources)), on_complete=self.completed.append)
+
+class FakeTabularService:
+    def has_document(self, document_id: int) -> bool:
+        return False
+
+def parse_events(body: str):
+    events = []
+    for message in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in message.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+@pytest.fixture
+def client():
+    Base.metadata.create_all(bind=engine)
+    app = FastAPI()
+    app.include_router(chat.router)
+    app.include_router(web_chat.router)
+    app.dependency_overrides[AuthService.get_current_user] = lambda: SimpleNamespace(id=1)
+    app.dependency_overrides[get_tabular_service] = FakeTabularService
+    with TestClient(app) as test_client:
+        yield test_client, app
+    db = SessionLocal()
+    db.query(ChatHistory).delete()
+    db.query(WebChatHistory).delete()
+    db.commit()
+    db.close()
+
+def saved_rows(model):
+    db = SessionLocal()
+    try:
+        return db.query(model).all()
+    finally:
+        db.close()
+
+def test_chat_stream_sends_tokens_in_order_then_done(client):
+    test_client, app = client
+    service = FakeRAGService(FakeChatModel(["Hello", ",", " world"]))
+    app.dependency_overrides[get_rag_service] = lambda: service
+
+    response = test_client.post("/chat/stream", json={"document_id": 7, "message": "Say hello"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    assert events[:-1] == [("token", {"content": "Hello"}), ("token", {"content": ","}),
+                           ("token", {"content": " world"})]
+    kind, done = events[-1]
+    assert kind == "done"
+    assert done["response"] == "Hello, world"
+    assert done["document_id"] == 7
+    assert service.completed == ["Hello, world"]
+    assert [row.response for row in saved_rows(ChatHistory)] == ["Hello, world"]
+
+def test_chat_stream_error_event_when_the_model_fails(client):
+    test_client, app = client
+    service = FakeRAGService(FakeChatModel(["partial", " answer", " lost"], fail_after=2))
+    app.dependency_overrides[get_rag_service] = lambda: service
+
+    response = test_client.post("/chat/stream", json={"document_id": 7, "message": "Say hello"})
+
+    events = parse_events(response.text)
+    assert events[:2] == [("token", {"content": "partial"}), ("token", {"content": " answer"})]
+    assert events[2][0] == "error"
+    assert "mid-stream" in events[2][1]["detail"]
+    assert len(events) == 3
+    assert service.completed == []
+    assert saved_rows(ChatHistory) == []
+
+def test_web_chat_stream_ends_with_sources(client):
+    test_client, app = client
+    service = FakeRAGService(FakeChatModel(["From", " the", " web"]), sources=SOURCES)
+    app.dependency_overrides[get_web_rag_service] = lambda: service
+
+    response = test_client.post("/webrag/chat/stream", json={"message": "What does the page say?"})
+
+    events = parse_events(response.text)
+    assert [data["content"] for kind, data in events if kind == "token"] == ["From", " the", " web"]
+    kind, done = events[-1]
+    assert kind == "done"
+    assert done["response"] == "From the web"
+    assert done["sources"] == SOURCES
+    assert saved_rows(WebChatHistory)[0].sources == SOURCES
+
+def test_web_chat_stream_error_event_when_the_model_fails(client):
+    test_client, app = client
+    service = FakeRAGService(FakeChatModel(["From", " the", " web"], fail_after=1), sources=SOURCES)
+    app.dependency_overrides[get_web_rag_service] = lambda: service
+
+    response = test_client.post("/webrag/chat/stream", json={"message": "What does the page say?"})
+
+    events = parse_events(response.text)
+    assert [kind for kind, _ in events] == ["token", "error"]
+    assert saved_rows(WebChatHistory) == []
@@ -0,0 +1,83 @@
+from app.services.embedding_cache import EmbeddingCache
+
+MODEL = "test-model"
+
+def vectors(texts):
+    return [[float(len(text)), 0.5] for text in texts]
+
+def last_used(cache, text):
+    key = EmbeddingCache._key(MODEL, text)
+    return cache._connection().execute("SELECT last_used FROM embeddings WHERE key = ?", (key,)).fetchone()[0]
+
+def age(cache, seconds):
+    cache._connection().execute("UPDATE embeddings SET last_used = last_used - ?", (seconds,))
+    cache._connection().commit()
+
+def test_hits_do_not_write(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"))
+    cache.put_many(MODEL, ["a", "b"], vectors(["a", "b"]))
+    conn = cache._connection()
+    changes = conn.total_changes
+
+    for _ in range(10):
+        assert cache.get_many(MODEL, ["a", "b", "c"]) == [[1.0, 0.5], [1.0, 0.5], None]
+
+    assert conn.total_changes == changes
+    assert cache.stats()["hits"] == 20
+
+def test_stale_hits_are_touched_with_the_next_put(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"), touch_interval=60)
+    cache.put_many(MODEL, ["a", "b"], vectors(["a", "b"]))
+    age(cache, 120)
+    before = last_used(cache, "a")
+
+    cache.get_many(MODEL, ["a"])
+    assert last_used(cache, "a") == before
+
+    cache.put_many(MODEL, ["c"], vectors(["c"]))
+    assert last_used(cache, "a") > before + 100
+    assert last_used(cache, "b") == before
+
+def test_touches_are_written_once_the_interval_passes(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"), touch_interval=60)
+    cache.put_many(MODEL, ["a"], vectors(["a"]))
+    age(cache, 120)
+    before = last_used(cache, "a")
+
+    cache.get_many(MODEL, ["a"])
+    cache._touched_at -= 120
+    cache.get_many(MODEL, ["a"])
+
+    assert last_used(cache, "a") > before + 100
+
+def test_row_count_is_checked_every_few_puts(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"), max_entries=100)
+    counts = []
+    cache._connection().set_trace_callback(
+        lambda statement: counts.append(statement) if "COUNT(*)" in statement else None
+    )
+
+    for i in range(4):
+        cache.put_many(MODEL, [f"text {i}"], vectors([f"text {i}"]))
+    assert counts == []
+    cache.put_many(MODEL, ["text 4"], vectors(["text 4"]))
+    assert len(counts) == 1
+
+def test_eviction_keeps_the_most_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"), max_entries=100, touch_interval=0)
+    old = [f"old {i}" for i in range(50)]
+    cache.put_many(MODEL, old, vectors(old))
+    age(cache, 60)
+    # Hit half of the old entries so they are recent again
+    cache.get_many(MODEL, old[:25])
+
+    for start in range(0, 70, 10):
+        new = [f"new {i}" for i in range(start, start + 10)]
+        cache.put_many(MODEL, new, vectors(new))
+
+    stats = cache.stats()
+    assert stats["entries"] <= 100
+    assert stats["evictions"] > 0
+    assert all(vector is not None for vector in cache.get_many(MODEL, old[:25]))
+    # Trimmed to 90 entries once 110 were stored: the 20 least recently used go
+    assert cache.get_many(MODEL, old[25:]).count(None) == 20
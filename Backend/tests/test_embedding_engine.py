@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("chromadb")
+
+from app.services.cache import TTLCache
+from app.services.embedding import EmbeddingEngine
+
+def tokenizer(lowercase: bool):
+    def tokenize(text):
+        return {"input_ids": [ord(c) for c in (text.lower() if lowercase else text)]}
+    return tokenize
+
+def engine_with(model) -> EmbeddingEngine:
+    engine = EmbeddingEngine("test-model", query_cache=TTLCache(max_entries=16, ttl_seconds=60))
+    engine._model = model
+    engine.embedded = []
+
+    def submit(texts):
+        engine.embedded.extend(texts)
+        return [[float(len(engine.embedded))] for _ in texts]
+    engine._submit = submit
+    return engine
+
+def test_uncased_model_shares_vectors_across_case():
+    engine = engine_with(SimpleNamespace(tokenizer=tokenizer(lowercase=True)))
+
+    assert engine.embed_query("What is  RAG?") == engine.embed_query("what is rag?")
+    assert engine.embedded == ["What is  RAG?"]
+
+def test_cased_model_keys_on_whitespace_only():
+    # Sentence-transformers models keep their tokenizer on the wrapped client
+    engine = engine_with(SimpleNamespace(_client=SimpleNamespace(tokenizer=tokenizer(lowercase=False))))
+
+    first = engine.embed_query("Apple stock")
+    assert engine.embed_query("apple stock") != first
+    assert engine.embed_query("Apple   stock ") == first
+    assert engine.embedded == ["Apple stock", "apple stock"]
+
+def test_model_without_a_tokenizer_is_treated_as_cased():
+    engine = engine_with(SimpleNamespace())
+
+    assert engine.uncased is False
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.services.executors import BoundedExecutor, PoolSaturated
+
+@pytest.fixture
+def pool():
+    executor = BoundedExecutor("test", max_workers=2, max_queue=0)
+    yield executor
+    executor.shutdown()
+
+def test_run_rejects_when_full(pool):
+    async def main():
+        first = asyncio.ensure_future(pool.run(time.sleep, 0.1))
+        second = asyncio.ensure_future(pool.run(time.sleep, 0.1))
+        await asyncio.sleep(0)
+        with pytest.raises(PoolSaturated) as error:
+            await pool.run(time.sleep, 0)
+        await asyncio.gather(first, second)
+        return error.value
+
+    error = asyncio.run(main())
+    assert error.status_code == 503
+    assert pool.stats()["rejected"] == 1
+
+def test_run_waiting_waits_in_arrival_order(pool):
+    started = []
+
+    async def main():
+        async def job(index):
+            await pool.run_waiting(lambda: started.append(index) or time.sleep(0.02))
+        await asyncio.gather(*(job(index) for index in range(8)))
+
+    asyncio.run(main())
+    # Two workers start their calls in pairs, but a waiter never overtakes an earlier one by more
+    assert sorted(started) == list(range(8))
+    assert all(abs(position - index) <= 1 for position, index in enumerate(started))
+    assert pool.stats()["waiting"] == 0
+
+def test_run_does_not_overtake_waiters(pool):
+    async def main():
+        busy = [asyncio.ensure_future(pool.run_waiting(time.sleep, 0.1)) for _ in range(2)]
+        waiting = asyncio.ensure_future(pool.run_waiting(time.sleep, 0))
+        await asyncio.sleep(0.01)
+        with pytest.raises(PoolSaturated):
+            await pool.run(time.sleep, 0)
+        await asyncio.gather(*busy, waiting)
+
+    asyncio.run(main())
+
+def test_cancelled_waiter_releases_its_slot(pool):
+    async def main():
+        busy = [asyncio.ensure_future(pool.run_waiting(time.sleep, 0.05)) for _ in range(2)]
+        cancelled = asyncio.ensure_future(pool.run_waiting(time.sleep, 0))
+        later = asyncio.ensure_future(pool.run_waiting(lambda: "ran"))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        await asyncio.gather(*busy)
+        return await asyncio.wait_for(later, 1)
+
+    async def fill():
+        return await asyncio.gather(*(pool.run(lambda: 1) for _ in range(2)))
+
+    assert asyncio.run(main()) == "ran"
+    # Every slot is free again
+    assert asyncio.run(fill()) == [1, 1]
+
+def test_call_blocks_for_a_slot_and_runs_inline_on_its_own_threads(pool):
+    names = []
+
+    def nested():
+        names.append(threading.current_thread().name)
+        # Would deadlock if it waited for a slot of the pool it is running on
+        return pool.call(lambda: threading.current_thread().name)
+
+    threads = [threading.Thread(target=lambda: names.append(pool.call(nested))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+
+    assert len(names) == 8
+    assert all(name.startswith("test-pool") for name in names)
+    assert pool.stats()["completed"] == 4
@@ -0,0 +1,107 @@
+import queue
+import threading
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("langchain")
+pytest.importorskip("pandas")
+
+from app.services.document_chunks import (
+    ChunkBatch, iter_chunk_batches, make_text_splitter, pdf_extract_workers, stream_chunk_batches
+)
+
+class FakeEmbeddingEngine:
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0, 0.0] for text in texts]
+
+@pytest.fixture
+def table(tmp_path):
+    path = tmp_path / "table.csv"
+    path.write_text("name,score\n" + "".join(f"row{i},{i}\n" for i in range(250)))
+    return str(path)
+
+def test_process_document_writes_batches_from_a_worker(rag_service, table):
+    service = rag_service
+    calls = []
+
+    def chunk_batches(namespace, file_hash, existing_ids):
+        calls.append((namespace, existing_ids))
+        yield ChunkBatch(["a", "b"], ["first", "second"], [{"document_id": 1, "file_hash": file_hash}] * 2,
+                         embeddings=[[0.1, 0.2, 0.3], [0.3, 0.2, 0.1]])
+
+    stats = service.process_document(1, table, "csv", chunk_batches=chunk_batches)
+
+    assert calls == [("doc_1", set())]
+    assert stats == {"chunks_total": 2, "chunks_added": 2, "chunks_reused": 0, "chunks_removed": 0}
+    stored = service.chroma_client.get_collection("doc_1").get(include=["documents", "embeddings"])
+    assert sorted(stored["documents"]) == ["first", "second"]
+
+    def changed_batches(namespace, file_hash, existing_ids):
+        # "a" is kept and only gets new metadata; "b" is gone
+        yield ChunkBatch(["a"], ["first"], [{"document_id": 1, "file_hash": file_hash, "page": 2}])
+        yield ChunkBatch(["c"], ["third"], [{"document_id": 1, "file_hash": file_hash}], embeddings=[[1.0, 0.0, 0.0]])
+
+    with open(table, "a") as f:
+        f.write("row30,30\n")
+    stats = service.process_document(1, table, "csv", chunk_batches=changed_batches)
+
+    assert stats == {"chunks_total": 2, "chunks_added": 1, "chunks_reused": 1, "chunks_removed": 1}
+    stored = service.chroma_client.get_collection("doc_1").get(ids=["a", "c"])
+    assert stored["metadatas"][stored["ids"].index("a")]["page"] == 2
+    assert service.chroma_client.get_collection("doc_1").count() == 2
+
+def test_iter_chunk_batches_only_embeds_new_chunks(table):
+    engine = FakeEmbeddingEngine()
+    first = list(iter_chunk_batches(1, "doc_1", table, "csv", "h1", set(), engine, make_text_splitter()))
+    ids = {chunk_id for batch in first for chunk_id in batch.ids}
+    assert all(batch.embeddings is not None for batch in first)
+
+    engine.embedded.clear()
+    again = list(iter_chunk_batches(1, "doc_1", table, "csv", "h2", ids, engine, make_text_splitter()))
+
+    assert engine.embedded == []
+    assert all(batch.embeddings is None for batch in again)
+    assert {chunk_id for batch in again for chunk_id in batch.ids} == ids
+    assert all(metadata["file_hash"] == "h2" for batch in again for metadata in batch.metadatas)
+
+def test_stream_chunk_batches_stops_when_the_reader_does(table, monkeypatch):
+    monkeypatch.setattr("app.services.embedding.get_embedding_engine", FakeEmbeddingEngine)
+    monkeypatch.setattr("app.config.settings.TABULAR_CHUNK_MAX_ROWS", 1)
+    batches = queue.Queue(maxsize=1)
+    stop = threading.Event()
+    worker = threading.Thread(target=stream_chunk_batches,
+                              args=(batches, stop, 1, "doc_1", table, "csv", "h1", set()))
+    worker.start()
+
+    kind, batch = batches.get(timeout=5)
+    # 250 chunks make three batches; the worker is blocked on the second
+    stop.set()
+    worker.join(5)
+
+    assert kind == "batch" and len(batch.ids) == 100
+    assert not worker.is_alive()
+    assert batches.qsize() <= 1
+
+def test_stream_chunk_batches_reports_errors(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.embedding.get_embedding_engine", FakeEmbeddingEngine)
+    batches = queue.Queue()
+
+    stream_chunk_batches(batches, threading.Event(), 1, "doc_1", str(tmp_path / "notes.txt"), "txt", "h1", set())
+
+    kind, message = batches.get_nowait()
+    assert kind == "error"
+    assert "Unsupported file type" in message
+
+def test_pdf_extract_workers_split_the_cores_between_ingestion_workers(monkeypatch):
+    monkeypatch.setattr("os.cpu_count", lambda: 8)
+    monkeypatch.setattr("app.config.settings.PDF_EXTRACT_WORKERS", 0)
+    monkeypatch.setattr("app.config.settings.INGESTION_WORKERS", 3)
+    assert pdf_extract_workers() == 2
+    monkeypatch.setattr("app.config.settings.INGESTION_WORKERS", 16)
+    assert pdf_extract_workers() == 1
+    monkeypatch.setattr("app.config.settings.PDF_EXTRACT_WORKERS", 5)
+    assert pdf_extract_workers() == 5
@@ -0,0 +1,118 @@
+from collections import Counter
+import pytest
+
+from app.services.lexical import BM25Index, fuse_results, reciprocal_rank_fusion, tokenize
+
+def assert_consistent(index: BM25Index):
+    """Posting lists and stats agree with the chunks table"""
+    conn = index._connection()
+    chunks = {ordinal: (length, terms.split()) for ordinal, length, terms in
+              conn.execute("SELECT ordinal, length, terms FROM chunks")}
+    expected = Counter(term for _, terms in chunks.values() for term in terms)
+    postings = 0
+    for term, ordinals, freqs, lengths in conn.execute("SELECT term, ordinals, freqs, lengths FROM postings"):
+        ordinals = BM25Index._unpack("I", ordinals).tolist()
+        lengths = BM25Index._unpack("I", lengths).tolist()
+        assert ordinals == sorted(ordinals)
+        assert len(ordinals) == len(BM25Index._unpack("H", freqs)) == len(lengths) == expected[term]
+        for ordinal, length in zip(ordinals, lengths):
+            assert term in chunks[ordinal][1]
+            assert length == chunks[ordinal][0]
+        postings += len(ordinals)
+    assert postings == sum(expected.values())
+    assert conn.execute("SELECT chunks, total_length FROM stats").fetchone() == (
+        len(chunks), sum(length for length, _ in chunks.values())
+    )
+
+@pytest.fixture
+def index(tmp_path):
+    index = BM25Index(str(tmp_path / "index.bm25"))
+    yield index
+    index.close()
+
+def test_tokenize_keeps_compound_identifiers_and_their_parts():
+    assert tokenize("Order AB-1234 shipped") == ["order", "ab-1234", "ab", "1234", "shipped"]
+    assert tokenize("snake_case") == ["snake_case", "snake", "case"]
+
+def test_add_remove_round_trip_keeps_postings_and_stats_consistent(index):
+    texts = {
+        "a": "the quick brown fox",
+        "b": "the lazy dog sleeps",
+        "c": "quick quick dog",
+    }
+    assert index.add(list(texts), list(texts.values())) == 3
+    assert_consistent(index)
+    # Already indexed ids are skipped
+    assert index.add(["a", "d"], ["ignored", "a brown dog"]) == 1
+    assert index.count() == 4
+    assert_consistent(index)
+
+    assert index.remove(["b", "missing"]) == 1
+    assert_consistent(index)
+    assert "b" not in [chunk_id for chunk_id, _ in index.search("lazy sleeps")]
+
+    assert index.remove(["a", "c", "d"]) == 3
+    assert_consistent(index)
+    assert index.count() == 0
+    assert index._connection().execute("SELECT COUNT(*) FROM postings").fetchone()[0] == 0
+    assert index.search("quick") == []
+
+    # Re-adding a removed id indexes it again
+    assert index.add(["a"], ["the quick brown fox"]) == 1
+    assert [chunk_id for chunk_id, _ in index.search("fox")] == ["a"]
+    assert_consistent(index)
+
+def test_search_ranks_by_bm25(index):
+    index.add(["a", "b", "c"], ["quick quick dog", "quick cat", "slow turtle"])
+
+    results = index.search("quick dog")
+
+    assert [chunk_id for chunk_id, _ in results] == ["a", "b"]
+    assert results[0][1] > results[1][1] > 0
+    assert index.search("quick dog", n_results=1) == results[:1]
+
+@pytest.mark.parametrize("query", ["ab-1234", "AB-1234", "1234", "ab"])
+def test_compound_identifier_matches(index, query):
+    index.add(["part", "other"], ["Replace part AB-1234 yearly", "Replace part CD-5678 yearly"])
+
+    assert [chunk_id for chunk_id, _ in index.search(query)] == ["part"]
+
+def test_reciprocal_rank_fusion_order():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+
+    # Found by both retrievers beats first place in one; rank breaks the rest
+    assert [item for item, _ in fused] == ["b", "a", "d", "c"]
+    scores = dict(fused)
+    assert scores["b"] == pytest.approx(1 / 62 + 1 / 61)
+    assert scores["a"] == pytest.approx(1 / 61)
+    assert scores["c"] == pytest.approx(1 / 63)
+
+def test_fuse_results_fetches_lexical_only_hits():
+    dense = {
+        "ids": [["a", "b"]],
+        "documents": [["doc a", "doc b"]],
+        "metadatas": [[{"page": 1}, {"page": 2}]],
+        "distances": [[0.1, 0.2]],
+    }
+    fetched = []
+
+    def fetch(ids):
+        fetched.append(ids)
+        return {"ids": ids, "documents": [f"doc {chunk_id}" for chunk_id in ids],
+                "metadatas": [{"page": 9} for _ in ids]}
+
+    fused = fuse_results(dense, [("c", 7.0), ("a", 3.0)], fetch, n_results=3, k=60)
+
+    assert fetched == [["c"]]
+    assert fused["ids"] == [["a", "c", "b"]]
+    assert fused["documents"] == [["doc a", "doc c", "doc b"]]
+    assert fused["metadatas"] == [[{"page": 1}, {"page": 9}, {"page": 2}]]
+    assert fused["distances"] == [[0.1, None, 0.2]]
+
+def test_fuse_results_skips_hits_that_can_no_longer_be_fetched():
+    dense = {"ids": [["a"]], "documents": [["doc a"]], "metadatas": [[None]], "distances": [[0.1]]}
+
+    fused = fuse_results(dense, [("gone", 1.0)], lambda ids: {"ids": [], "documents": [], "metadatas": []}, 5)
+
+    assert fused["ids"] == [["a"]]
+    assert fused["distances"] == [[0.1]]
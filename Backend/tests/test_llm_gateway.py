@@ -0,0 +1,148 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import time
+import pytest
+from app.services.llm import LLMError, LLMGateway
+from conftest import FakeResponse
+
+MESSAGES = [{"role": "user", "content": "How many albums did AC/DC release?"}]
+
+def completion(content: str) -> FakeResponse:
+    return FakeResponse(body=json.dumps({"choices": [{"index": 0, "message": {"content": content}}]}).encode())
+
+def events(*tokens: str, done: bool = True) -> FakeResponse:
+    lines = [f"data: {json.dumps({'choices': [{'index': 0, 'delta': {'content': token}}]})}\n\n" for token in tokens]
+    if done:
+        lines.append("data: [DONE]\n\n")
+    return FakeResponse(body="".join(lines).encode(), headers={"Content-Type": "text/event-stream"})
+
+@pytest.fixture
+def make_gateway(fake_server):
+    gateways = []
+
+    def make(**kwargs):
+        options = {"backoff_base": 0.001, "backoff_max": 1.0, "http2": False, "timeout": 5.0}
+        options.update(kwargs)
+        gateway = LLMGateway(f"{fake_server.url}/v1", "test-key", **options)
+        gateways.append(gateway)
+        return gateway
+
+    yield make
+    for gateway in gateways:
+        gateway.close()
+
+def test_complete_retries_429_then_succeeds(fake_server, make_gateway):
+    fake_server.script(FakeResponse(429, b'{"error": "rate limited"}'), completion("SELECT 1;"))
+    gateway = make_gateway()
+
+    assert gateway.complete(MESSAGES, "test-model") == "SELECT 1;"
+    assert len(fake_server.requests) == 2
+    assert fake_server.requests[0].path == "/v1/chat/completions"
+    assert fake_server.requests[0].headers["Authorization"] == "Bearer test-key"
+    assert json.loads(fake_server.requests[0].body)["model"] == "test-model"
+    assert gateway.stats()["retries"] == 1
+
+def test_non_retryable_status_fails_without_retry(fake_server, make_gateway):
+    fake_server.script(FakeResponse(400, b'{"error": "bad request"}'))
+    gateway = make_gateway()
+
+    with pytest.raises(LLMError, match="HTTP 400"):
+        gateway.complete(MESSAGES, "test-model")
+    assert len(fake_server.requests) == 1
+
+def test_server_errors_are_retried_until_the_deadline(fake_server, make_gateway):
+    fake_server.script(FakeResponse(503, b'{"error": "unavailable"}', delay=0.05))
+    gateway = make_gateway(max_retries=100, backoff_base=0.05, backoff_max=0.1)
+
+    started = time.monotonic()
+    with pytest.raises(LLMError, match="deadline exceeded"):
+        gateway.complete(MESSAGES, "test-model", timeout=0.6)
+    elapsed = time.monotonic() - started
+
+    assert 0.3 < elapsed < 1.5
+    assert 2 <= len(fake_server.requests) < 100
+    stats = gateway.stats()
+    assert stats["deadline_exceeded"] == 1
+    assert stats["failures"] == 1
+
+def test_retry_after_is_honoured(fake_server, make_gateway):
+    fake_server.script(FakeResponse(429, b"{}", headers={"Retry-After": "0.4"}), completion("ok"))
+    gateway = make_gateway(backoff_base=0.001)
+
+    assert gateway.complete(MESSAGES, "test-model") == "ok"
+    first, second = fake_server.requests
+    # Jittered backoff alone would retry within a few milliseconds
+    assert second.received_at - first.received_at >= 0.35
+
+def test_retry_after_past_the_deadline_fails_fast(fake_server, make_gateway):
+    fake_server.script(FakeResponse(429, b"{}", headers={"Retry-After": "5"}))
+    gateway = make_gateway(backoff_max=10.0)
+
+    started = time.monotonic()
+    with pytest.raises(LLMError, match="deadline exceeded"):
+        gateway.complete(MESSAGES, "test-model", timeout=1.0)
+    assert time.monotonic() - started < 0.5
+    assert len(fake_server.requests) == 1
+
+def test_concurrency_is_capped(fake_server, make_gateway):
+    fake_server.script(FakeResponse(body=completion("ok").body, delay=0.1))
+    gateway = make_gateway(max_concurrency=2)
+
+    with ThreadPoolExecutor(8) as pool:
+        answers = list(pool.map(lambda _: gateway.complete(MESSAGES, "test-model"), range(8)))
+
+    assert answers == ["ok"] * 8
+    assert fake_server.max_in_flight == 2
+
+def test_stream_yields_tokens_and_stops_at_done(fake_server, make_gateway):
+    response = events("SELECT", " 1", ";")
+    # Anything after the terminator is ignored
+    response.body += b'data: {"choices": [{"delta": {"content": "extra"}}]}\n\n'
+    fake_server.script(response)
+    gateway = make_gateway()
+
+    assert list(gateway.stream(MESSAGES, "test-model")) == ["SELECT", " 1", ";"]
+    assert json.loads(fake_server.requests[0].body)["stream"] is True
+
+def test_stream_skips_comments_and_empty_deltas(fake_server, make_gateway):
+    response = events("a", "b")
+    response.body = b": keep-alive\n\n" + b'data: {"choices": [{"delta": {"role": "assistant"}}]}\n\n' + response.body
+    fake_server.script(response)
+    gateway = make_gateway()
+
+    assert list(gateway.stream(MESSAGES, "test-model")) == ["a", "b"]
+
+def test_stream_ends_when_the_connection_closes_without_done(fake_server, make_gateway):
+    fake_server.script(events("a", "b", done=False))
+    gateway = make_gateway()
+
+    assert list(gateway.stream(MESSAGES, "test-model")) == ["a", "b"]
+
+def test_stream_retries_before_the_first_token(fake_server, make_gateway):
+    fake_server.script(FakeResponse(502, b"{}"), events("ok"))
+    gateway = make_gateway()
+
+    assert list(gateway.stream(MESSAGES, "test-model")) == ["ok"]
+    assert len(fake_server.requests) == 2
+
+def test_astream_and_acomplete(fake_server, make_gateway):
+    gateway = make_gateway()
+
+    async def run():
+        fake_server.script(events("x", "y"))
+        tokens = [token async for token in gateway.astream(MESSAGES, "test-model")]
+        fake_server.script(completion("z"))
+        return tokens, await gateway.acomplete(MESSAGES, "test-model")
+
+    assert asyncio.run(run()) == (["x", "y"], "z")
+
+def test_chat_model_interface(fake_server, make_gateway):
+    fake_server.script(completion("answer"))
+    model = make_gateway().chat_model("test-model", temperature=0.2, max_tokens=64)
+
+    assert model.invoke("question").content == "answer"
+    payload = json.loads(fake_server.requests[0].body)
+    assert payload["messages"] == [{"role": "user", "content": "question"}]
+    assert payload["temperature"] == 0.2
+    assert payload["max_tokens"] == 64
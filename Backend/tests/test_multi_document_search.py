@@ -0,0 +1,79 @@
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("langchain")
+pytest.importorskip("pandas")
+
+from app.services.document_chunks import ChunkBatch
+from app.services.lexical import LexicalIndexStore
+
+QUERY_EMBEDDING = [1.0, 0.0, 0.0]
+
+class FakeReranker:
+    """Keeps the candidates it was given in reverse order"""
+
+    def __init__(self):
+        self.candidates = []
+
+    def rerank_results(self, query, results, n_results):
+        self.candidates = list(results["ids"][0])
+        order = list(reversed(range(len(self.candidates))))[:n_results]
+        return {key: [[values[0][i] for i in order]] for key, values in results.items()}
+
+class InlinePool:
+    def call(self, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+def store(service, document_id, chunks):
+    def chunk_batches(namespace, file_hash, existing_ids):
+        yield ChunkBatch(
+            [chunk_id for chunk_id, _, _ in chunks],
+            [text for _, text, _ in chunks],
+            [{"document_id": document_id, "file_hash": file_hash}] * len(chunks),
+            embeddings=[embedding for _, _, embedding in chunks]
+        )
+    service.process_document(document_id, __file__, "py", chunk_batches=chunk_batches)
+
+@pytest.fixture
+def service(rag_service, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.config.settings.HYBRID_CANDIDATES", 4)
+    monkeypatch.setattr("app.config.settings.RERANK_CANDIDATES", 3)
+    rag_service.cpu_pool = InlinePool()
+    rag_service.lexical_store = LexicalIndexStore(str(tmp_path / "lexical"))
+    store(rag_service, 1, [
+        ("a1", "apples grow on trees", [1.0, 0.0, 0.0]),
+        ("a2", "apples are red or green", [0.9, 0.1, 0.0]),
+        ("a3", "apple pie needs apples", [0.8, 0.2, 0.0]),
+    ])
+    store(rag_service, 2, [
+        ("z1", "the zebra has stripes", [0.0, 0.0, 1.0]),
+        ("z2", "horses and donkeys", [0.5, 0.5, 0.0]),
+    ])
+    return rag_service
+
+def test_lexical_hits_of_every_document_are_fused_in(service):
+    hits = service._search_documents([1, 2], "zebra", QUERY_EMBEDDING, 2)
+
+    # Too far from the query embedding to be a dense candidate, but the only BM25 match
+    assert {hit["chunk_id"] for hit in hits} == {"a1", "z1"}
+    zebra = next(hit for hit in hits if hit["chunk_id"] == "z1")
+    assert zebra["document_id"] == 2
+    assert zebra["text"] == "the zebra has stripes"
+    assert zebra["distance"] is None
+
+def test_fused_candidates_are_reranked(service):
+    service.reranker = FakeReranker()
+
+    hits = service._search_documents([1, 2], "zebra", QUERY_EMBEDDING, 2)
+
+    candidates = service.reranker.candidates
+    assert sorted(candidates) == ["a1", "a2", "z1"]
+    assert [hit["chunk_id"] for hit in hits] == candidates[::-1][:2]
+
+def test_dense_only_search_keeps_the_closest_chunks(service):
+    service.lexical_store = None
+
+    hits = service._search_documents([1, 2, 3], "zebra", QUERY_EMBEDDING, 2)
+
+    assert [hit["chunk_id"] for hit in hits] == ["a1", "a2"]
+    assert hits[0]["distance"] <= hits[1]["distance"]
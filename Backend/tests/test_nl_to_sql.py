@@ -0,0 +1,52 @@
+import sqlite3
+import pytest
+
+from app.services.nl_to_sql import NLToSQLService
+
+class FakeLLM:
+    """Answers the SQL prompt with a fixed query and records the answer prompt"""
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.prompts = []
+
+    def complete(self, messages, model, temperature=0.0):
+        self.prompts.append(messages[-1]["content"])
+        return self.sql if len(self.prompts) == 1 else "The answer"
+
+@pytest.fixture
+def orders(tmp_path):
+    path = tmp_path / "orders.sqlite"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE orders (id INTEGER, region TEXT)")
+    conn.executemany("INSERT INTO orders VALUES (?, ?)", [(i, "north" if i % 2 else "south") for i in range(500)])
+    conn.commit()
+    conn.close()
+    return str(path)
+
+def service_for(db_path: str, sql: str) -> NLToSQLService:
+    service = NLToSQLService(db_path=db_path, examples=False, schema_subset=False)
+    service.llm = FakeLLM(sql)
+    return service
+
+def test_large_results_are_truncated_and_counted(orders, monkeypatch):
+    monkeypatch.setattr("app.config.settings.SQL_RESULT_MAX_ROWS", 10)
+    service = service_for(orders, "SELECT id FROM orders WHERE region = 'north' ORDER BY id;")
+
+    sql, results, total_rows, answer = service.answer("List the orders from the north")
+
+    assert len(results) == 10
+    assert total_rows == 250
+    assert answer == "The answer"
+    assert "first 10 of 250 rows" in service.llm.prompts[-1]
+    assert "{'id': 21}" not in service.llm.prompts[-1]
+
+def test_small_results_are_sent_whole(orders, monkeypatch):
+    monkeypatch.setattr("app.config.settings.SQL_RESULT_MAX_ROWS", 10)
+    service = service_for(orders, "SELECT COUNT(*) AS n FROM orders")
+
+    sql, results, natural_response = service.generate_sql_query("How many orders are there?")
+
+    assert results == [{"n": 500}]
+    assert "Query results: [{'n': 500}]" in service.llm.prompts[-1]
+    assert "first" not in service.llm.prompts[-1]
@@ -0,0 +1,59 @@
+import pytest
+
+pytest.importorskip("chromadb")
+
+from app.services.document_chunks import ChunkBatch
+
+class CountingEmbeddingEngine:
+    def __init__(self):
+        self.queries = []
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return [1.0, 0.0, 0.0]
+
+class InlinePool:
+    def call(self, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+class FakeAnswerCache:
+    def __init__(self):
+        self.embeddings = []
+
+    def lookup(self, collection, chunk_ids, query_embedding, history=""):
+        self.embeddings.append(query_embedding)
+        return None
+
+    def store(self, collection, chunk_ids, query, query_embedding, answer, history=""):
+        self.embeddings.append(query_embedding)
+
+@pytest.fixture
+def service(rag_service):
+    rag_service.cpu_pool = InlinePool()
+    rag_service.embedding_engine = CountingEmbeddingEngine()
+
+    def chunk_batches(namespace, file_hash, existing_ids):
+        yield ChunkBatch(["a"], ["apples grow on trees"], [{"document_id": 1, "file_hash": file_hash}],
+                         embeddings=[[1.0, 0.0, 0.0]])
+    rag_service.process_document(1, __file__, "py", chunk_batches=chunk_batches)
+    return rag_service
+
+def test_query_is_embedded_once_for_search_and_answer_cache(service):
+    service.answer_cache = FakeAnswerCache()
+
+    prompt, record = service._prepare_answer(1, "Where do apples grow?")
+    record("On trees")
+
+    assert service.embedding_engine.queries == ["Where do apples grow?"]
+    assert service.answer_cache.embeddings == [[1.0, 0.0, 0.0]] * 2
+
+def test_query_is_not_embedded_without_a_search_or_answer_cache(service):
+    service._prepare_answer(1, "Where do apples grow?")
+    service.embedding_engine.queries.clear()
+
+    # Served from the retrieval cache, and no answer cache to look up
+    prompt, record = service._prepare_answer(1, "Where do apples grow?")
+    record("On trees")
+
+    assert "apples grow on trees" in prompt
+    assert service.embedding_engine.queries == []
@@ -0,0 +1,58 @@
+import pytest
+
+pytest.importorskip("chromadb")
+
+from app.services.document_chunks import ChunkBatch, calculate_file_hash
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "table.csv"
+    path.write_text("name,score\nalpha,1\n")
+    return str(path)
+
+def legacy_collection(service, file_hash):
+    # Chunks as the original ingestion stored them: only the file hash in their metadata
+    collection = service.chroma_client.create_collection("doc_1")
+    collection.add(
+        ids=["doc_1_chunk_0", "doc_1_chunk_1"], documents=["alpha", "beta"],
+        embeddings=[[0.1, 0.2, 0.3], [0.3, 0.2, 0.1]], metadatas=[{"file_hash": file_hash}] * 2
+    )
+    return collection
+
+def failing_batches(namespace, file_hash, existing_ids):
+    raise RuntimeError("worker crashed")
+    yield
+
+def test_unchanged_legacy_document_is_not_reprocessed(rag_service, document):
+    legacy_collection(rag_service, calculate_file_hash(document))
+
+    stats = rag_service.process_document(1, document, "csv", chunk_batches=failing_batches)
+
+    assert stats == {"chunks_total": 2, "chunks_added": 0, "chunks_reused": 2, "chunks_removed": 0}
+
+def test_failed_reingest_keeps_a_legacy_index(rag_service, document):
+    legacy_collection(rag_service, "hash of an older version")
+
+    with pytest.raises(RuntimeError):
+        rag_service.process_document(1, document, "csv", chunk_batches=failing_batches)
+
+    assert rag_service.chroma_client.get_collection("doc_1").count() == 2
+
+def test_interrupted_run_is_not_mistaken_for_a_finished_one(rag_service, document):
+    current_hash = calculate_file_hash(document)
+    # A run that was killed after writing a batch: its chunks carry the new hash, but no manifest was written
+    rag_service.chroma_client.create_collection("doc_1").add(
+        ids=["a"], documents=["alpha"], embeddings=[[0.1, 0.2, 0.3]],
+        metadatas=[{"document_id": 1, "file_hash": current_hash}]
+    )
+    calls = []
+
+    def finish(namespace, file_hash, existing_ids):
+        calls.append(existing_ids)
+        yield ChunkBatch(["a"], ["alpha"], [{"document_id": 1, "file_hash": file_hash}])
+        yield ChunkBatch(["b"], ["beta"], [{"document_id": 1, "file_hash": file_hash}], embeddings=[[0.3, 0.2, 0.1]])
+
+    stats = rag_service.process_document(1, document, "csv", chunk_batches=finish)
+
+    assert calls == [{"a"}]
+    assert stats == {"chunks_total": 2, "chunks_added": 1, "chunks_reused": 1, "chunks_removed": 0}
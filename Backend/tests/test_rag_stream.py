@@ -0,0 +1,50 @@
+import pytest
+from app.services.llm import LLMError
+from app.services.retrieval import RAGResponse, RAGStream
+from conftest import FakeChatModel
+
+def model_stream(model: FakeChatModel, prompt: str = "prompt"):
+    # What the RAG services hand to RAGStream
+    return (chunk.content for chunk in model.stream(prompt))
+
+def test_tokens_are_yielded_in_order_and_joined():
+    completed = []
+    model = FakeChatModel(["The", " answer", "", " is", " 42. "])
+    stream = RAGStream(model_stream(model), RAGResponse("", sources=[{"url": "https://example.com"}]),
+                       on_complete=completed.append)
+
+    assert list(stream) == ["The", " answer", " is", " 42. "]
+    assert stream.answer == "The answer is 42."
+    assert completed == ["The answer is 42."]
+    assert stream.response.sources == [{"url": "https://example.com"}]
+    assert "llm_ms" in stream.response.timings
+    assert not stream.cached
+
+def test_answer_is_empty_until_the_stream_is_exhausted():
+    stream = RAGStream(model_stream(FakeChatModel(["a", "b"])))
+    tokens = iter(stream)
+
+    assert next(tokens) == "a"
+    assert stream.answer == ""
+    assert list(tokens) == ["b"]
+    assert stream.answer == "ab"
+
+def test_cached_response_is_streamed_as_one_token():
+    stream = RAGStream.from_response(RAGResponse("Cached answer", cached=True, sources=[{"url": "u"}]))
+
+    assert list(stream) == ["Cached answer"]
+    assert stream.cached
+    assert "llm_ms" not in stream.response.timings
+
+def test_model_error_mid_stream_propagates_without_completing():
+    completed = []
+    stream = RAGStream(model_stream(FakeChatModel(["a", "b", "c"], fail_after=2)), on_complete=completed.append)
+    received = []
+
+    with pytest.raises(LLMError, match="mid-stream"):
+        for token in stream:
+            received.append(token)
+
+    assert received == ["a", "b"]
+    assert completed == []
+    assert stream.answer == ""
@@ -0,0 +1,32 @@
+from app.services.cache import RetrievalCache
+
+RESULTS = {"ids": [["chunk-1"]], "documents": [["text"]]}
+
+def test_results_are_served_until_invalidated(tmp_path):
+    cache = RetrievalCache(str(tmp_path))
+    version = cache.version("doc_1")
+    cache.set("doc_1", "What is DocMind?", 5, RESULTS, version)
+
+    assert cache.get("doc_1", "  what is docmind? ", 5) == RESULTS
+    cache.invalidate("doc_1")
+    assert cache.get("doc_1", "What is DocMind?", 5) is None
+    assert cache.stats()["stale"] == 1
+
+def test_query_overlapping_an_invalidation_is_not_cached(tmp_path):
+    cache = RetrievalCache(str(tmp_path))
+    version = cache.version("doc_1")
+    # A writer changes the collection while the query runs
+    cache.invalidate("doc_1")
+    cache.set("doc_1", "What is DocMind?", 5, RESULTS, version)
+
+    assert cache.get("doc_1", "What is DocMind?", 5) is None
+    assert cache.stats()["entries"] == 0
+
+def test_invalidation_is_per_collection(tmp_path):
+    cache = RetrievalCache(str(tmp_path))
+    for name in ("doc_1", "doc_2"):
+        cache.set(name, "question", 5, RESULTS, cache.version(name))
+    cache.invalidate("doc_1")
+
+    assert cache.get("doc_1", "question", 5) is None
+    assert cache.get("doc_2", "question", 5) == RESULTS
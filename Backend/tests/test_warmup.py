@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("chromadb")
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.auth import AuthService
+
+def test_warmup_requires_a_signed_in_user(monkeypatch):
+    warmed = []
+    monkeypatch.setattr("app.main.registry.warm_up", lambda: warmed.append(True) or {})
+
+    response = TestClient(app).post("/warmup")
+
+    assert response.status_code == 401
+    assert warmed == []
+
+def test_warmup_builds_the_services(monkeypatch):
+    monkeypatch.setattr("app.main.registry.warm_up", lambda: {"rag": 1.0})
+    app.dependency_overrides[AuthService.get_current_user] = lambda: SimpleNamespace(id=1)
+    try:
+        response = TestClient(app).post("/warmup")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json() == {"rag": 1.0}
@@ -0,0 +1,102 @@
+import asyncio
+import httpx
+import pytest
+from app.services.web_fetch import AsyncFetcher
+from conftest import FakeResponse
+
+PAGE = b"<html><head><title>Fixture</title></head><body><p>Fixture page</p></body></html>"
+
+def page(delay: float = 0.0) -> FakeResponse:
+    return FakeResponse(body=PAGE, headers={"Content-Type": "text/html"}, delay=delay)
+
+async def fetch_all(fetcher: AsyncFetcher, urls):
+    async with fetcher:
+        return await asyncio.gather(*(fetcher.get(url) for url in urls))
+
+def test_global_concurrency_cap(fake_server):
+    fake_server.script(page(delay=0.1))
+    urls = [f"{fake_server.url}/page/{i}" for i in range(10)]
+
+    responses = asyncio.run(fetch_all(AsyncFetcher(max_concurrency=3, per_host=10), urls))
+
+    assert [response.status_code for response in responses] == [200] * 10
+    assert responses[0].text == PAGE.decode()
+    assert fake_server.max_in_flight == 3
+
+def test_per_host_concurrency_cap(fake_server):
+    fake_server.script(page(delay=0.1))
+    port = fake_server.server_address[1]
+    # Two host names for the same server
+    urls = [f"http://{host}:{port}/page/{i}" for i in range(6) for host in ("127.0.0.1", "localhost")]
+
+    asyncio.run(fetch_all(AsyncFetcher(max_concurrency=10, per_host=2), urls))
+
+    assert fake_server.max_in_flight_per_host == {"127.0.0.1": 2, "localhost": 2}
+    # A busy host does not hold global slots the other host could use
+    assert fake_server.max_in_flight == 4
+
+@pytest.mark.parametrize("status", [400, 404, 500])
+def test_error_status_raises(fake_server, status):
+    fake_server.script(FakeResponse(status, b"error"))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(fetch_all(AsyncFetcher(), [f"{fake_server.url}/missing"]))
+
+def test_not_modified_is_returned(fake_server):
+    def respond(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            return FakeResponse(304)
+        return FakeResponse(body=PAGE, headers={"ETag": '"v1"'})
+    fake_server.respond = respond
+
+    async def run():
+        async with AsyncFetcher(headers={"User-Agent": "test"}) as fetcher:
+            first = await fetcher.get(f"{fake_server.url}/page")
+            second = await fetcher.get(f"{fake_server.url}/page", headers={"If-None-Match": first.headers["ETag"]})
+            return first, second
+
+    first, second = asyncio.run(run())
+    assert first.status_code == 200
+    assert second.status_code == 304
+    # Per-request headers are merged into the client defaults
+    assert fake_server.requests[1].headers["User-Agent"] == "test"
+
+def test_add_multiple_urls_skips_indexed_urls(fake_server, tmp_path):
+    chromadb = pytest.importorskip("chromadb")
+    pytest.importorskip("langchain")
+    from app.services.web_rag import WebRAGService
+
+    fake_server.script(page())
+    indexed_url = f"{fake_server.url}/indexed"
+    new_url = f"{fake_server.url}/new"
+
+    # Only what add_multiple_urls touches when no page is written
+    service = WebRAGService.__new__(WebRAGService)
+    service.collection_name_template = "web_{user_id}"
+    service.headers = {}
+    service.embedding_function = None
+    service.chroma_client = chromadb.PersistentClient(
+        path=str(tmp_path), settings=chromadb.Settings(anonymized_telemetry=False)
+    )
+    collection = service.chroma_client.create_collection("web_1")
+    collection.add(
+        ids=["indexed-0"], documents=["Indexed page"], embeddings=[[0.1, 0.2, 0.3]],
+        metadatas=[{"url": indexed_url, "url_hash": service._calculate_url_hash(indexed_url), "title": "Indexed"}]
+    )
+
+    fetched = []
+
+    async def fetch_and_prepare(fetcher, url):
+        fetched.append(url)
+        await fetcher.get(url)
+        return {"success": False, "url": url, "error": "not indexed in this test"}
+    service._fetch_and_prepare = fetch_and_prepare
+
+    results = asyncio.run(service.add_multiple_urls(1, [indexed_url, new_url, indexed_url]))
+
+    assert fetched == [new_url]
+    assert [request.path for request in fake_server.requests] == ["/new"]
+    assert results[0] == results[2] == {
+        "success": True, "message": "URL already indexed", "url": indexed_url, "title": "Indexed", "is_new": False
+    }
+    assert results[1]["success"] is False
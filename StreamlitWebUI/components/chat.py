@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from utils.api import send_chat_message, get_chat_history, clear_chat_history
+from utils.api import stream_chat_message, get_chat_history, clear_chat_history
 from utils.helpers import check_authentication
 
 def chat_interface(document_id: int, document_name: str):
@@ -35,24 +35,38 @@ def chat_interface(document_id: int, document_name: str):
         # Send user message
         st.chat_message("human").write(prompt)
         
-        # Get AI response
-        response = send_chat_message(
-            document_id=document_id,
-            message=prompt,
-            token=st.session_state.access_token
-        )
+        # Stream AI response
+        result = {}
         
-        if response.status_code == 200:
-            result = response.json()
-            st.chat_message("assistant").write(result.get('response'))
-            
+        def tokens():
+            for event, data in stream_chat_message(
+                document_id=document_id,
+                message=prompt,
+                token=st.session_state.access_token
+            ):
+                if event == "token":
+                    yield data["content"]
+                elif event == "done":
+                    result.update(data)
+                elif event == "error":
+                    result["error"] = data.get("detail", "Unknown error")
+        
+        try:
+            with st.chat_message("assistant"):
+                st.write_stream(tokens())
+                if result.get('cached'):
+                    st.caption("⚡ Served from cache")
+        except Exception as e:
+            result["error"] = str(e)
+        
+        if result.get("error") or "response" not in result:
+            st.error("Failed to get response")
+        else:
             # Update chat history
             st.session_state[chat_key].append({
                 'message': prompt,
                 'response': result.get('response')
             })
-        else:
-            st.error("Failed to get response")
     
     # Action buttons
     col1, col2 = st.columns(2)
@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from utils.api import get_user_documents, delete_document, upload_document
+from utils.api import get_user_documents, delete_document, upload_document, get_document_status
 from utils.helpers import check_authentication
 
 def show_document_upload():
@@ -36,14 +36,14 @@ def show_document_upload():
 
 def _upload_document(uploaded_file):
     """Helper function to handle document upload"""
-    with st.spinner("Processing document..."):
+    with st.spinner("Uploading document..."):
         response = upload_document(
             file=uploaded_file,
             token=st.session_state.access_token
         )
         
         if response.status_code == 200:
-            st.success(f"✅ {uploaded_file.name} uploaded successfully!")
+            st.success(f"✅ {uploaded_file.name} uploaded! Processing continues in the background.")
             # Clear cached document list to refresh
             if "document_list" in st.session_state:
                 del st.session_state.document_list
@@ -106,9 +106,10 @@ def show_document_list():
     # Perform actions
     if chat_btn and len(selected_docs) == 1:
         selected_doc = next(doc for doc in documents if doc["id"] == selected_docs[0])
-        st.session_state.selected_document = selected_doc
-        st.session_state.current_page = "Chat"
-        st.rerun()
+        if _is_document_ready(selected_doc["id"]):
+            st.session_state.selected_document = selected_doc
+            st.session_state.current_page = "Chat"
+            st.rerun()
 
     if delete_btn and selected_docs:
         _delete_documents(selected_docs)
@@ -120,6 +121,24 @@ def show_document_list():
         hide_index=True
     )
 
+def _is_document_ready(document_id: int) -> bool:
+    """Check that a document has finished background processing"""
+    response = get_document_status(document_id, st.session_state.access_token)
+    if response.status_code != 200:
+        # Documents uploaded before background processing have no job
+        return True
+    
+    job = response.json()
+    if job["status"] == "completed":
+        return True
+    if job["status"] == "failed":
+        st.error(f"Processing failed: {job.get('error') or 'Unknown error'}")
+    else:
+        total = job.get("chunks_total")
+        progress = f"{job['chunks_done']}/{total} chunks" if total else "starting"
+        st.info(f"⏳ Document is still processing ({job['status']}, {progress}). Try again shortly.")
+    return False
+
 def _delete_documents(document_ids):
     """Helper function to delete selected documents"""
     with st.spinner("Deleting documents..."):
@@ -3,13 +3,25 @@ import pandas as pd
 from datetime import datetime
 from utils.api import (
     add_url_to_webrag, add_multiple_urls_to_webrag, get_indexed_urls,
-    remove_url_from_webrag, clear_all_webrag_urls, send_web_chat_message,
+    remove_url_from_webrag, clear_all_webrag_urls, stream_web_chat_message,
     get_web_chat_history, clear_web_chat_history
 )
 from utils.helpers import check_authentication
 import validators
 import re
 
+def format_source(source) -> str:
+    """Markdown bullet for a source URL or a source dict with url/title/distance"""
+    if isinstance(source, str):
+        return f"- [{source}]({source})"
+    if isinstance(source, dict) and source.get('url'):
+        label = source.get('title') or source['url']
+        line = f"- [{label}]({source['url']})"
+        if source.get('distance') is not None:
+            line += f" · distance {source['distance']:.3f}"
+        return line
+    return f"- {str(source)}"
+
 def show_url_management():
     """URL management interface for WebRAG"""
     check_authentication()
@@ -307,46 +319,51 @@ def web_chat_interface():
             if sources:
                 with st.expander("📚 Sources"):
                     for source in sources:
-                        if isinstance(source, str):
-                            st.markdown(f"- [{source}]({source})")
-                        else:
-                            st.markdown(f"- {str(source)}")
+                        st.markdown(format_source(source))
 
     # User input
     if prompt := st.chat_input("Ask about your indexed web content..."):
         # Display user message
         st.chat_message("human").write(prompt)
         
-        # Get AI response
-        with st.spinner("Getting response..."):
-            response = send_web_chat_message(prompt, st.session_state.access_token)
-            
-            if response.status_code == 200:
-                result = response.json()
-                
-                # Display assistant response
-                with st.chat_message("assistant"):
-                    st.write(result.get('response', ''))
-                    
-                    # Show sources if available
-                    sources = result.get('sources', [])
-                    if sources:
-                        with st.expander("📚 Sources"):
-                            for source in sources:
-                                if isinstance(source, str):
-                                    st.markdown(f"- [{source}]({source})")
-                                else:
-                                    st.markdown(f"- {str(source)}")
+        # Stream AI response
+        result = {}
+        
+        def tokens():
+            for event, data in stream_web_chat_message(prompt, st.session_state.access_token):
+                if event == "token":
+                    yield data["content"]
+                elif event == "done":
+                    result.update(data)
+                elif event == "error":
+                    result["error"] = data.get("detail", "Unknown error")
+        
+        try:
+            # Display assistant response
+            with st.chat_message("assistant"):
+                st.write_stream(tokens())
+                if result.get('cached'):
+                    st.caption("⚡ Served from cache")
                 
-                # Update chat history
-                st.session_state.web_chat_history.append({
-                    'message': prompt,
-                    'response': result.get('response', ''),
-                    'sources': sources,
-                    'timestamp': datetime.now().isoformat()
-                })
-            else:
-                st.error("Failed to get response")
+                # Show sources if available
+                sources = result.get('sources', [])
+                if sources:
+                    with st.expander("📚 Sources"):
+                        for source in sources:
+                            st.markdown(format_source(source))
+        except Exception as e:
+            result["error"] = str(e)
+        
+        if result.get("error") or "response" not in result:
+            st.error("Failed to get response")
+        else:
+            # Update chat history
+            st.session_state.web_chat_history.append({
+                'message': prompt,
+                'response': result.get('response', ''),
+                'sources': result.get('sources', []),
+                'timestamp': datetime.now().isoformat()
+            })
 
     # Action buttons
     col1, col2, col3 = st.columns(3)
@@ -403,4 +420,4 @@ def web_chat_interface():
                 use_container_width=True
             )
         except Exception as e:
-            st.error(f"Export failed: {e}")
\ No newline at end of file
+            st.error(f"Export failed: {e}")
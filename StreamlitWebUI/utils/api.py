@@ -1,4 +1,5 @@
 import os
+import json
 import requests
 from dotenv import load_dotenv
 
@@ -39,6 +40,12 @@ def get_user_documents(token: str):
         headers={"Authorization": f"Bearer {token}"}
     )
 
+def get_document_status(document_id: int, token: str):
+    return requests.get(
+        f"{BACKEND_URL}/documents/{document_id}/status",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+
 def delete_document(document_id: int, token: str):
     return requests.delete(
         f"{BACKEND_URL}/documents/{document_id}",
@@ -53,6 +60,29 @@ def send_chat_message(document_id: int, message: str, token: str):
         headers={"Authorization": f"Bearer {token}"}
     )
 
+def _iter_sse(response):
+    """Yield (event, data) pairs from a Server-Sent Events response"""
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+def stream_chat_message(document_id: int, message: str, token: str):
+    response = requests.post(
+        f"{BACKEND_URL}/chat/stream",
+        json={"document_id": document_id, "message": message},
+        headers={"Authorization": f"Bearer {token}"},
+        stream=True
+    )
+    response.raise_for_status()
+    return _iter_sse(response)
+
 def get_chat_history(document_id: int, token: str):
     return requests.get(
         f"{BACKEND_URL}/chat/history/{document_id}",
@@ -125,6 +155,16 @@ def send_web_chat_message(message: str, token: str):
         headers={"Authorization": f"Bearer {token}"}
     )
 
+def stream_web_chat_message(message: str, token: str):
+    response = requests.post(
+        f"{BACKEND_URL}/webrag/chat/stream",
+        json={"message": message},
+        headers={"Authorization": f"Bearer {token}"},
+        stream=True
+    )
+    response.raise_for_status()
+    return _iter_sse(response)
+
 def get_web_chat_history(token: str, limit: int = 50, offset: int = 0):
     return requests.get(
         f"{BACKEND_URL}/webrag/chat/history",